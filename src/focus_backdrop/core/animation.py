@@ -0,0 +1,304 @@
+from focus_backdrop.core import logger
+from focus_backdrop.core import tracing
+from focus_backdrop.core.image_cache import shared_image_cache, shared_frame_cache
+from focus_backdrop.core.render_worker import AnimationFrameWorker
+
+from PySide6.QtCore import Qt, QSize, QTimer, QObject, QThreadPool, Signal
+
+from PySide6.QtGui import QImage, QPixmap, QImageReader
+
+
+def debug(*args, **kwargs):
+    return logger.debug(*args, **kwargs)
+
+
+DEFAULT_ANIMATION_MAX_FPS   = 30
+# like web browsers, frames without a usable delay are shown for 100 ms
+MIN_FRAME_DELAY_MSECS       = 11
+DEFAULT_FRAME_DELAY_MSECS   = 100
+
+
+def is_animated(image_key):
+    """Check whether an image file (by image_file_key()) has more than one frame.
+
+    Only answers from a header a worker has already read (see
+    ImageCache.read_header()), an image not read yet counts as still.
+    """
+    if image_key is None:
+        return False
+    header = shared_image_cache().known_header(image_key)
+    return header is not None and header[1] != 1
+
+
+def frame_display_msecs(delay_msecs):
+    if delay_msecs is None or delay_msecs < MIN_FRAME_DELAY_MSECS:
+        return DEFAULT_FRAME_DELAY_MSECS
+    return delay_msecs
+
+
+class FrameDecoder:
+    """Decodes the frames of an animation in order, for one worker thread at a time."""
+
+    def __init__(self, image_key):
+        self._image_key         = image_key
+        self._image_reader      = None
+        self._next_read_index   = 0
+        self.source_size        = QSize()
+        # 0 until known, not every format reports its frame count up front
+        self.frame_count        = None
+        self.loop_count         = -1
+        self._frame_delays      = {}
+
+    def _open_reader(self):
+        if self.frame_count is None:
+            # from the header the image cache has read already
+            self.frame_count = max(0, shared_image_cache().read_header(self._image_key)[1])
+        self._image_reader = QImageReader(self._image_key[0])
+        self.source_size = self._image_reader.size()
+        self.loop_count = self._image_reader.loopCount()
+        self._next_read_index = 0
+
+    def _read_frame(self, frame_index) -> QImage:
+        """Decode one frame, reading on from the previous one where possible."""
+        if self._image_reader is None or frame_index < self._next_read_index:
+            self._open_reader()
+        if frame_index > self._next_read_index and self._image_reader.jumpToImage(frame_index):
+            self._next_read_index = frame_index
+        # GIF frames build on each other, so reaching a later frame means
+        # decoding the ones before it
+        while self._next_read_index <= frame_index:
+            with tracing.span('animation_decode', index=self._next_read_index):
+                frame_image = self._image_reader.read()
+            if frame_image.isNull():
+                return None
+            self._frame_delays[self._next_read_index] = self._image_reader.nextImageDelay()
+            self._next_read_index += 1
+        return frame_image
+
+    def decode_shown_frame(self, frame_index, min_frame_msecs):
+        """Return (frame image, display msecs, next frame number), or None past the end.
+
+        Frames that would be on screen for less than min_frame_msecs are
+        skipped (decoded, but never scaled), and their time added to the
+        shown frame, so the animation keeps its speed. The next frame
+        number is 0 where a new loop begins.
+        """
+        frame_image = self._read_frame(frame_index)
+        if frame_image is None:
+            return None
+        display_msecs = frame_display_msecs(self._frame_delays.get(frame_index))
+        next_index = frame_index + 1
+        while display_msecs < min_frame_msecs:
+            if self.frame_count and next_index >= self.frame_count:
+                break
+            if next_index not in self._frame_delays and self._read_frame(next_index) is None:
+                self.frame_count = next_index
+                break
+            display_msecs += frame_display_msecs(self._frame_delays[next_index])
+            next_index += 1
+        if self.frame_count and next_index >= self.frame_count:
+            next_index = 0
+        return frame_image, max(display_msecs, min_frame_msecs), next_index
+
+
+class AnimationPlayer(QObject):
+    """Plays an animated GIF/WebP/APNG, scaling each frame once per screen size.
+
+    Frames are decoded in order and scaled like a still image on a worker
+    thread, one shown frame ahead of the one on screen, and kept in the
+    shared AnimationFrameCache, so later loops (and other windows of the
+    same size) only cost a setPixmap per tick. The decoder is dropped once
+    a loop is done, and reopened only if the cache budget was too small to
+    keep every frame.
+
+    The frame rate is capped: frames that would be shown for less than
+    1/max_fps are skipped (not slowed down), so the animation keeps its
+    speed. While paused (window hidden or obscured) no timer runs at all.
+    """
+
+    sig_frame_ready = Signal(QPixmap)
+    # generation, frame number, scaled frame, display msecs, next frame
+    # number, loop count (emitted from the worker thread)
+    sig_frame_rendered = Signal(int, int, QImage, int, int, int)
+
+    def __init__(self, max_fps=DEFAULT_ANIMATION_MAX_FPS, parent=None):
+        super().__init__(parent)
+        self._frame_cache       = shared_frame_cache()
+        self._frame_timer       = QTimer(self)
+        self._frame_timer.setSingleShot(True)
+        self._frame_timer.setTimerType(Qt.PreciseTimer)
+        self._frame_timer.timeout.connect(self.show_next_frame)
+        # one thread: the frames of an animation are decoded in order
+        self._thread_pool       = QThreadPool(self)
+        self._thread_pool.setMaxThreadCount(1)
+        self.generation         = 0
+        self._min_frame_msecs   = 0
+        self.set_max_fps(max_fps)
+        self._paused            = False
+        self._resume_msecs      = None
+        self._reset(None)
+        self._scaled_key        = None
+        self._scale_args        = None
+        self.sig_frame_rendered.connect(self._on_frame_rendered, Qt.QueuedConnection)
+
+    def _reset(self, image_key):
+        self._image_key         = image_key
+        self._frame_decoder     = None
+        self._frame_index       = 0
+        self._shown_index       = None
+        self._loop_count        = -1
+        self._loops_done        = 0
+        self._new_generation()
+
+    def _new_generation(self):
+        """Drop the frames requested so far (e.g. for another size)."""
+        self.generation += 1
+        self._thread_pool.clear()
+        self._requested_frames  = set()
+        # rendered frames not shown yet, also when the cache has no room
+        self._ready_frames      = {}
+        self._waiting           = False
+
+    def set_max_fps(self, max_fps):
+        self._min_frame_msecs = 1000 // max(1, int(max_fps))
+
+    def is_playing(self):
+        return self._image_key is not None
+
+    def play(self, image_key, scaled_key, scaling_option, desired_size: QSize, custom_scaling,
+                device_pixel_ratio=1.0):
+        """Show the animation scaled for a screen, from where it is if only the size changed."""
+        if scaled_key == self._scaled_key and image_key == self._image_key:
+            return
+        if image_key != self._image_key:
+            self._reset(image_key)
+        else:
+            self._new_generation()
+        self._scaled_key = scaled_key
+        self._scale_args = (scaling_option, QSize(desired_size), custom_scaling, device_pixel_ratio)
+        self._frame_timer.stop()
+        self._resume_msecs = None
+        self.show_next_frame()
+
+    def stop(self):
+        self._frame_timer.stop()
+        self._resume_msecs = None
+        self._reset(None)
+        self._scaled_key = None
+        self._scale_args = None
+
+    def set_paused(self, paused):
+        if paused == self._paused:
+            return
+        self._paused = paused
+        if paused:
+            if self._frame_timer.isActive():
+                self._resume_msecs = max(0, self._frame_timer.remainingTime())
+                self._frame_timer.stop()
+        elif self._resume_msecs is not None:
+            resume_msecs, self._resume_msecs = self._resume_msecs, None
+            self._frame_timer.start(resume_msecs)
+        elif self._waiting:
+            self.show_next_frame()
+
+    def _start_frame_timer(self, msecs):
+        if self._paused:
+            self._resume_msecs = msecs
+        else:
+            self._frame_timer.start(msecs)
+
+    def _frame_cache_key(self, frame_index):
+        return (self._scaled_key, self._min_frame_msecs, frame_index)
+
+    def _cached_frame(self, frame_index):
+        """Return (pixmap, display msecs, next frame number) if rendered, else None."""
+        ready_frame = self._ready_frames.pop(frame_index, None)
+        if ready_frame is not None:
+            return ready_frame
+        return self._frame_cache.lookup(self._frame_cache_key(frame_index))
+
+    def _request_frame(self, frame_index):
+        """Have a worker decode and scale a frame, unless it is rendered or on its way."""
+        if (frame_index in self._requested_frames or frame_index in self._ready_frames
+                or self._frame_cache.contains(self._frame_cache_key(frame_index))):
+            return
+        if self._frame_decoder is None:
+            self._frame_decoder = FrameDecoder(self._image_key)
+        self._requested_frames.add(frame_index)
+        self._thread_pool.start(AnimationFrameWorker(
+            self, self.generation, self._frame_decoder, frame_index, self._min_frame_msecs,
+            *self._scale_args))
+
+    def _on_frame_rendered(self, generation, frame_index, scaled_frame: QImage, display_msecs,
+                            next_index, loop_count):
+        if generation != self.generation:
+            return
+        self._requested_frames.discard(frame_index)
+        self._loop_count = loop_count
+        if scaled_frame.isNull():
+            self._on_frame_missing(frame_index)
+            return
+        rendered_frame = (QPixmap.fromImage(scaled_frame), display_msecs, next_index)
+        self._frame_cache.store(self._frame_cache_key(frame_index), rendered_frame)
+        self._ready_frames[frame_index] = rendered_frame
+        if self._waiting and frame_index == self._frame_index and not self._paused:
+            self.show_next_frame()
+
+    def _on_frame_missing(self, frame_index):
+        if frame_index == 0:
+            debug("Animation: cannot decode", self._image_key[0])
+            self.stop()
+            return
+        # ran past the last frame of a file that did not report its count,
+        # the frame shown before it ends the loop
+        if self._shown_index is not None:
+            shown_frame = self._frame_cache.lookup(self._frame_cache_key(self._shown_index))
+            if shown_frame is not None:
+                self._frame_cache.store(
+                    self._frame_cache_key(self._shown_index), (shown_frame[0], shown_frame[1], 0))
+        if frame_index != self._frame_index:
+            return
+        if not self._begin_next_loop():
+            # the last frame stays on screen
+            self._frame_timer.stop()
+            self._resume_msecs = None
+            self._waiting = False
+            return
+        if self._waiting and not self._paused:
+            self.show_next_frame()
+        else:
+            self._request_frame(0)
+
+    def _begin_next_loop(self):
+        """Wrap around to the first frame, return False once the loops are used up."""
+        self._loops_done += 1
+        # loopCount() is -1 for endless, otherwise the number of repeats
+        if 0 <= self._loop_count < self._loops_done:
+            debug(f"Animation: finished after {self._loops_done} loop(s)")
+            return False
+        self._frame_index = 0
+        # every frame is known (and cached, budget permitting), let go of
+        # the decoder and its file handle
+        self._frame_decoder = None
+        return True
+
+    def show_next_frame(self):
+        """Show the due frame if it is rendered, otherwise as soon as it is."""
+        if self._image_key is None:
+            return
+        rendered_frame = self._cached_frame(self._frame_index)
+        if rendered_frame is None:
+            self._waiting = True
+            self._request_frame(self._frame_index)
+            return
+        self._waiting = False
+        frame_pixmap, display_msecs, next_index = rendered_frame
+        self.sig_frame_ready.emit(frame_pixmap)
+        self._shown_index = self._frame_index
+        if next_index == 0:
+            if not self._begin_next_loop():
+                return
+        self._frame_index = next_index
+        self._start_frame_timer(display_msecs)
+        # the next frame is decoded and scaled while this one is on screen
+        self._request_frame(next_index)
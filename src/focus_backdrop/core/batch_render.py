@@ -0,0 +1,234 @@
+from focus_backdrop.core import logger
+from focus_backdrop.core.config import SCALE_TILE, SCALING_OPTIONS, PRESET_KEYS, Settings
+from focus_backdrop.core.render import aligned_image_rect, paint_backdrop
+from focus_backdrop.core.presets import preset_scaling_amount
+from focus_backdrop.core.image_cache import image_file_key
+from focus_backdrop.core.render_worker import render_scaled_image
+
+import os
+import re
+import time
+import argparse
+import multiprocessing
+
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from PySide6.QtCore import Qt, QRect, QSize
+
+from PySide6.QtGui import QColor, QImage, QPainter
+
+
+def debug(*args, **kwargs):
+    return logger.debug(*args, **kwargs)
+
+
+# `focus-backdrop render`: the composed backdrop as PNG files, no window.
+# Every size of every source is one job, run in a pool of processes that
+# each have their own offscreen QGuiApplication, and written to disk by the
+# worker as soon as it is done.
+
+RENDER_SIZE_PATTERN = re.compile(r'^(\d+)x(\d+)(?:@(\d+(?:\.\d+)?))?$')
+
+ANCHOR_NAMES = {
+    'top-left':         int(Qt.AlignTop       | Qt.AlignLeft),
+    'top-center':       int(Qt.AlignTop       | Qt.AlignHCenter),
+    'top-right':        int(Qt.AlignTop       | Qt.AlignRight),
+    'middle-left':      int(Qt.AlignVCenter   | Qt.AlignLeft),
+    'middle-center':    int(Qt.AlignVCenter   | Qt.AlignHCenter),
+    'middle-right':     int(Qt.AlignVCenter   | Qt.AlignRight),
+    'bottom-left':      int(Qt.AlignBottom    | Qt.AlignLeft),
+    'bottom-center':    int(Qt.AlignBottom    | Qt.AlignHCenter),
+    'bottom-right':     int(Qt.AlignBottom    | Qt.AlignRight),
+}
+
+_worker_app = None
+
+
+def parse_render_size(size_text):
+    """Parse 'WIDTHxHEIGHT' or 'WIDTHxHEIGHT@RATIO' (PNG pixels, device pixel ratio)."""
+    size_match = RENDER_SIZE_PATTERN.match(size_text.strip().lower())
+    if size_match is None:
+        raise ValueError(f"'{size_text}' is not a size like 1920x1080 or 3840x2160@2")
+    width, height = int(size_match.group(1)), int(size_match.group(2))
+    device_pixel_ratio = float(size_match.group(3) or 1)
+    if width < 1 or height < 1 or device_pixel_ratio <= 0:
+        raise ValueError(f"'{size_text}' is an empty size")
+    return width, height, device_pixel_ratio
+
+
+def current_look(cnfg: Settings):
+    return {key: getattr(cnfg, key) for key in PRESET_KEYS}
+
+
+def apply_overrides(look: dict, color=None, alpha=None, scaling_option=None, anchor_name=None):
+    """Return a copy of a look with the command line overrides applied."""
+    look = dict(look)
+    if scaling_option is not None and scaling_option not in SCALING_OPTIONS:
+        raise ValueError(f"unknown scaling option '{scaling_option}', "
+                            f"use one of: {', '.join(SCALING_OPTIONS)}")
+    if anchor_name is not None and anchor_name not in ANCHOR_NAMES:
+        raise ValueError(f"unknown anchor point '{anchor_name}', "
+                            f"use one of: {', '.join(ANCHOR_NAMES)}")
+    bg_color = QColor(look['bg_color'])
+    if color is not None:
+        new_color = QColor(color)
+        if not new_color.isValid():
+            raise ValueError(f"invalid color '{color}'")
+        # like --color on the overlay, #AARRGGBB sets the alpha too
+        if not (len(color) == 9 and color.startswith('#')):
+            new_color.setAlpha(bg_color.alpha())
+        bg_color = new_color
+    if alpha is not None:
+        bg_color.setAlpha(alpha)
+    look['bg_color'] = bg_color.name(QColor.HexArgb)
+    look['alpha_level'] = f"{bg_color.alpha():02X}"
+    if scaling_option is not None:
+        look['scaling_option'] = scaling_option
+    if anchor_name is not None:
+        look['anchor_point'] = ANCHOR_NAMES[anchor_name]
+    return look
+
+
+def unique_file_stems(look_names):
+    """Return a file name stem for each look, with -2, -3, ... where names would clash.
+
+    Two images named bg.png in different folders, or a preset named like
+    an image, would otherwise write over each other's files.
+    """
+    file_stems = []
+    used_stems = set()
+    for look_name in look_names:
+        base_stem = re.sub(r'[^\w.-]+', '_', look_name).strip('_') or 'backdrop'
+        file_stem = base_stem
+        clash_count = 1
+        # case-insensitive, for case-insensitive file systems
+        while file_stem.lower() in used_stems:
+            clash_count += 1
+            file_stem = f"{base_stem}-{clash_count}"
+        used_stems.add(file_stem.lower())
+        file_stems.append(file_stem)
+    return file_stems
+
+
+def output_file_name(file_stem, render_size):
+    width, height, device_pixel_ratio = render_size
+    ratio_suffix = '' if device_pixel_ratio == 1 else f"@{device_pixel_ratio:g}"
+    return f"{file_stem}-{width}x{height}{ratio_suffix}.png"
+
+
+def compose_backdrop_image(look: dict, render_size) -> QImage:
+    """Render a look (see PRESET_KEYS) as the backdrop of a screen, or None on failure.
+
+    The same decode, scale, alignment and painting code as the backdrop
+    window, on a QImage of WIDTHxHEIGHT device pixels.
+    """
+    width, height, device_pixel_ratio = render_size
+    desired_size = QSize(width, height)
+    scaled_image = QImage()
+    image_key = image_file_key(look['pixmap_path'])
+    if image_key is not None:
+        scaled_image = render_scaled_image(
+            image_key, look['scaling_option'], desired_size, preset_scaling_amount(look),
+            Qt.SmoothTransformation, device_pixel_ratio, anchor_point=look['anchor_point'])
+        if scaled_image.isNull():
+            return None
+    elif look['pixmap_path']:
+        return None
+
+    composed_image = QImage(desired_size, QImage.Format_ARGB32_Premultiplied)
+    composed_image.setDevicePixelRatio(device_pixel_ratio)
+    composed_image.fill(0)
+    # painting is in logical pixels, like on a screen with this ratio
+    area_rect = QRect(0, 0, round(width / device_pixel_ratio), round(height / device_pixel_ratio))
+    image_rect = QRect()
+    if not scaled_image.isNull():
+        image_rect = aligned_image_rect(
+            scaled_image.deviceIndependentSize().toSize(),
+            look['anchor_point'] or Qt.AlignCenter, area_rect)
+    painter = QPainter(composed_image)
+    paint_backdrop(
+        painter, area_rect, QColor(look['bg_color']), scaled_image, image_rect,
+        look['scaling_option'] == SCALE_TILE)
+    painter.end()
+    return composed_image
+
+
+def _init_worker():
+    """Give each worker process a GUI application that needs no display."""
+    global _worker_app
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide6.QtGui import QGuiApplication
+    _worker_app = QGuiApplication.instance() or QGuiApplication(['focus-backdrop-render'])
+
+
+def render_job(look: dict, render_size, output_path):
+    """Render and write one PNG, return (output path, milliseconds, error or None)."""
+    start_time = time.perf_counter()
+    composed_image = compose_backdrop_image(look, render_size)
+    if composed_image is None:
+        return output_path, 0, f"cannot decode '{look['pixmap_path']}'"
+    if not composed_image.save(output_path, 'PNG'):
+        return output_path, 0, f"cannot write '{output_path}'"
+    return output_path, (time.perf_counter() - start_time) * 1000, None
+
+
+def batch_looks(cnfg: Settings, preset_names=(), image_paths=()):
+    """Return [(name, look)] for the presets and images, or the current settings."""
+    looks = []
+    for preset_name in preset_names:
+        preset = cnfg.preset(preset_name)
+        if preset is None:
+            raise ValueError(f"no preset named '{preset_name}'")
+        looks.append((preset_name, preset))
+    for image_path in image_paths:
+        look = current_look(cnfg)
+        look['pixmap_path'] = str(Path(image_path).resolve())
+        looks.append((Path(image_path).stem, look))
+    if not looks:
+        looks.append(('current', current_look(cnfg)))
+    return looks
+
+
+def run_batch(jobs, max_workers=None):
+    """Render [(look, render size, output path)] across processes, return the failure count."""
+    failure_count = 0
+    # spawned, not forked: a forked copy of a process that has Qt loaded
+    # is not safe to use
+    spawn_context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers, mp_context=spawn_context,
+                                initializer=_init_worker) as executor:
+        pending_jobs = [executor.submit(render_job, *job) for job in jobs]
+        for finished_job in as_completed(pending_jobs):
+            output_path, render_msecs, render_error = finished_job.result()
+            if render_error is not None:
+                logger.error(f"Render: {render_error}")
+                failure_count += 1
+            else:
+                logger.info(f"{output_path} ({render_msecs:.0f} ms)")
+    return failure_count
+
+
+def render_from_args(args: argparse.Namespace):
+    """Run the render subcommand, return the exit status."""
+    cnfg = Settings()
+    try:
+        render_sizes = [parse_render_size(size_text) for size_text in args.size]
+        looks = [
+            (name, apply_overrides(look, args.color, args.alpha, args.scaling, args.anchor))
+            for name, look in batch_looks(cnfg, args.preset or (), args.image or ())
+        ]
+    except ValueError as look_error:
+        logger.error(f"Render: {look_error}")
+        return 2
+    output_directory = Path(args.output)
+    output_directory.mkdir(parents=True, exist_ok=True)
+    file_stems = unique_file_stems(name for name, _ in looks)
+    jobs = [
+        (look, render_size, str(output_directory / output_file_name(file_stem, render_size)))
+        for file_stem, (_, look) in zip(file_stems, looks)
+        for render_size in render_sizes
+    ]
+    debug(f"Render: {len(jobs)} file(s) into '{output_directory}'")
+    failure_count = run_batch(jobs, args.jobs)
+    return 1 if failure_count else 0
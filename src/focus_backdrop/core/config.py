@@ -1,8 +1,14 @@
 from focus_backdrop.core import logger
+from focus_backdrop.core import tracing
+from focus_backdrop.core.image_cache import (DEFAULT_IMAGE_CACHE_MB, DEFAULT_SCALED_CACHE_MB,
+                                            DEFAULT_ANIMATION_CACHE_MB)
+
+import os
+import atexit
 
 from pathlib import Path
 
-from PySide6.QtCore import (Qt, QPoint, QSettings)
+from PySide6.QtCore import (Qt, QPoint, QTimer, QSettings, QCoreApplication)
 
 # from PySide6.QtCore import (Qt, QRect, QSize, QEvent, QPoint, Signal, QSettings,
 #                             QCoreApplication, qInstallMessageHandler)
@@ -13,12 +19,77 @@ from PySide6.QtCore import (Qt, QPoint, QSettings)
 #                                 QMainWindow, QGridLayout, QRadioButton, QButtonGroup,
 #                                 QColorDialog, QApplication)
 
-logger.VERBOSE = True
 
 def debug(*args, **kwargs):
     return logger.debug(*args, **kwargs)
 
 
+# Constants for scale options (also available as attributes on Settings)
+SCALE_NO_SCALE          = 'original_no_scaling'
+SCALE_CUSTOM            = 'custom_scaling'
+SCALE_FILL_DISTORT      = 'fill_distort'
+SCALE_FILL_CROP         = 'fill_crop'
+SCALE_FIT_NOCROP        = 'fit_nocrop'
+SCALE_FIT_WIDTH         = 'fit_width'
+SCALE_FIT_HEIGHT        = 'fit_height'
+SCALE_TILE              = 'tile'
+
+SCALING_OPTIONS = (
+    SCALE_NO_SCALE,
+    SCALE_CUSTOM,
+    SCALE_FILL_DISTORT,
+    SCALE_FILL_CROP,
+    SCALE_FIT_NOCROP,
+    SCALE_FIT_WIDTH,
+    SCALE_FIT_HEIGHT,
+    SCALE_TILE,
+)
+
+# Settings that are stored on disk (attribute name == QSettings key)
+PERSISTED_SETTINGS_KEYS = (
+    'dark_theme',
+    'all_screens',
+    'bg_color',
+    'alpha_level',
+    'scaling_option',
+    'custom_scaling',
+    'tile_scale',
+    'anchor_point',
+    'pixmap_path',
+    'recent_image_path',
+    'dialog_position',
+    'image_cache_mb',
+    'scaled_cache_mb',
+    'animation_cache_mb',
+    'animation_max_fps',
+    'low_memory',
+    'rotation_enabled',
+    'rotation_directory',
+    'rotation_interval',
+    'rotation_order',
+    'rotation_prefetch',
+    'rotation_prefetch_mb',
+    'rotation_schedule',
+    'preset_warm_mb',
+    'focus_holes',
+)
+
+# Named presets live in QSettings groups 'presets/<name>', holding these keys
+PRESETS_GROUP = 'presets'
+PRESET_KEYS = (
+    'bg_color',
+    'alpha_level',
+    'pixmap_path',
+    'scaling_option',
+    'custom_scaling',
+    'tile_scale',
+    'anchor_point',
+)
+
+# Quiet period after the last change before dirty settings are written out
+SETTINGS_FLUSH_DELAY_MSECS = 1000
+
+
 def get_default_image_directory():
     """Get the default directory for image file dialogs."""
     if (Path.home() / 'Pictures' / 'Backdrops').exists():
@@ -29,17 +100,23 @@ def get_default_image_directory():
         return str(Path.home())
 
 
+def get_cache_directory():
+    """Get the per-user cache directory (XDG_CACHE_HOME, or ~/.cache)."""
+    return Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache')
+
+
 class Settings:
     def __init__(self) -> None:
         
         # Constants for scale options
-        self.SCALE_NO_SCALE     = 'original_no_scaling'
-        self.SCALE_CUSTOM       = 'custom_scaling'
-        self.SCALE_FILL_DISTORT = 'fill_distort'
-        self.SCALE_FILL_CROP    = 'fill_crop'
-        self.SCALE_FIT_NOCROP   = 'fit_nocrop'
-        self.SCALE_FIT_WIDTH    = 'fit_width'
-        self.SCALE_FIT_HEIGHT   = 'fit_height'
+        self.SCALE_NO_SCALE     = SCALE_NO_SCALE
+        self.SCALE_CUSTOM       = SCALE_CUSTOM
+        self.SCALE_FILL_DISTORT = SCALE_FILL_DISTORT
+        self.SCALE_FILL_CROP    = SCALE_FILL_CROP
+        self.SCALE_FIT_NOCROP   = SCALE_FIT_NOCROP
+        self.SCALE_FIT_WIDTH    = SCALE_FIT_WIDTH
+        self.SCALE_FIT_HEIGHT   = SCALE_FIT_HEIGHT
+        self.SCALE_TILE         = SCALE_TILE
         
         # Constants for anchor points
         self.ANCHOR_TOP_LEFT    = int(Qt.AlignTop       | Qt.AlignLeft)     # 'top-left'
@@ -57,28 +134,142 @@ class Settings:
         
         # Load settings or set defaults
         self.dark_theme         = self.qsettings.value("dark_theme", True, type=bool)
+        self.all_screens        = self.qsettings.value("all_screens", False, type=bool)
         self.bg_color           = self.qsettings.value("bg_color", "#80333333", type=str)
         self.alpha_level        = self.qsettings.value("alpha_level", "80", type=str)
         self.scaling_option     = self.qsettings.value("scaling_option", self.SCALE_FIT_NOCROP, type=str)
         self.custom_scaling     = self.qsettings.value("custom_scaling", 0, type=int)
+        self.tile_scale         = self.qsettings.value("tile_scale", 100, type=int)   # percent
         self.anchor_point       = self.qsettings.value("anchor_point", self.ANCHOR_MID_CENTER, type=int)
         self.pixmap_path        = self.qsettings.value("pixmap_path", "", type=str)
         self.recent_image_path  = self.qsettings.value("recent_image_path", "", type=str)
         self.dialog_position    = self.qsettings.value("dialog_position", QPoint(100, 100), type=QPoint)
+        self.image_cache_mb     = self.qsettings.value("image_cache_mb", DEFAULT_IMAGE_CACHE_MB, type=int)
+        self.scaled_cache_mb    = self.qsettings.value("scaled_cache_mb", DEFAULT_SCALED_CACHE_MB, type=int)
+
+        # Animated GIF/WebP/APNG playback, see core/animation.py
+        self.animation_cache_mb = self.qsettings.value("animation_cache_mb", DEFAULT_ANIMATION_CACHE_MB, type=int)
+        self.animation_max_fps  = self.qsettings.value("animation_max_fps", 30, type=int)
+
+        # Keep no decoded or scaled images beyond the one on screen, see core/memory.py
+        self.low_memory         = self.qsettings.value("low_memory", False, type=bool)
+
+        # Image rotation (slideshow), see core/rotation.py
+        self.rotation_enabled       = self.qsettings.value("rotation_enabled", False, type=bool)
+        self.rotation_directory     = self.qsettings.value("rotation_directory", "", type=str)
+        self.rotation_interval      = self.qsettings.value("rotation_interval", 300, type=int)
+        self.rotation_order         = self.qsettings.value("rotation_order", "name", type=str)
+        self.rotation_prefetch      = self.qsettings.value("rotation_prefetch", 1, type=int)
+        self.rotation_prefetch_mb   = self.qsettings.value("rotation_prefetch_mb", 256, type=int)
+        # 'HH:MM=directory;HH:MM=directory', a directory per part of the day
+        self.rotation_schedule      = self.qsettings.value("rotation_schedule", "", type=str)
+
+        # Memory cap for the renders of presets warmed at idle, see core/presets.py
+        self.preset_warm_mb         = self.qsettings.value("preset_warm_mb", 128, type=int)
+
+        # Cut-out rectangles in global coordinates, 'x,y,w,h;x,y,w,h', see core/holes.py
+        self.focus_holes            = self.qsettings.value("focus_holes", "", type=str)
+
+        # Write-behind state: save_settings() only records which keys changed,
+        # flush() writes them out after SETTINGS_FLUSH_DELAY_MSECS of quiet
+        self._saved_values      = self._current_values()
+        self._dirty_keys        = set()
+        self._flush_timer       = None
+        atexit.register(self.flush)
+
+    def _current_values(self):
+        return {key: getattr(self, key) for key in PERSISTED_SETTINGS_KEYS}
+
+    def scaling_amount(self, scaling_option=None):
+        """Return the value that goes with a scaling option into the render functions.
+
+        That is the custom slider value, or the tile scale (percent) in tile mode.
+        """
+        if (scaling_option or self.scaling_option) == SCALE_TILE:
+            return self.tile_scale
+        return self.custom_scaling
+
+    ###############################################################################
+    ##### Named presets
+
+    def preset_names(self):
+        """Return the preset names in shortcut order (Ctrl+1 is the first)."""
+        self.qsettings.beginGroup(PRESETS_GROUP)
+        names = self.qsettings.childGroups()
+        self.qsettings.endGroup()
+        return sorted(names, key=str.lower)
+
+    def preset(self, name):
+        """Return the values of a preset as a dict, or None if there is no such preset."""
+        if name not in self.preset_names():
+            return None
+        self.qsettings.beginGroup(f"{PRESETS_GROUP}/{name}")
+        preset = {
+            # same type as the setting, QSettings keeps INI values as strings
+            key: self.qsettings.value(key, getattr(self, key), type=type(getattr(self, key)))
+            for key in PRESET_KEYS
+        }
+        self.qsettings.endGroup()
+        return preset
+
+    def save_preset(self, name):
+        """Store the current look under a name, return the name as stored."""
+        # a slash would nest groups
+        name = name.strip().replace('/', '_').replace('\\', '_')
+        if not name:
+            return None
+        self.qsettings.beginGroup(f"{PRESETS_GROUP}/{name}")
+        for key in PRESET_KEYS:
+            self.qsettings.setValue(key, getattr(self, key))
+        self.qsettings.endGroup()
+        self.qsettings.sync()
+        debug(f"Preset saved: '{name}'")
+        return name
+
+    def delete_preset(self, name):
+        self.qsettings.remove(f"{PRESETS_GROUP}/{name}")
+        self.qsettings.sync()
+
+    def apply_preset(self, preset: dict):
+        """Take over the values of a preset() dict, saved like any other change."""
+        for key in PRESET_KEYS:
+            setattr(self, key, preset[key])
+        self.save_settings()
 
     def save_dialog_position(self, position: QPoint):
         self.dialog_position = position
-        self.qsettings.setValue("dialog_position", position)
-        self.qsettings.sync()
+        self.save_settings()
 
     def save_settings(self):
-        self.qsettings.setValue("dark_theme", self.dark_theme)
-        self.qsettings.setValue("bg_color", self.bg_color)
-        self.qsettings.setValue("alpha_level", self.alpha_level)
-        self.qsettings.setValue("scaling_option", self.scaling_option)
-        self.qsettings.setValue("custom_scaling", self.custom_scaling)
-        self.qsettings.setValue("anchor_point", self.anchor_point)
-        self.qsettings.setValue("pixmap_path", self.pixmap_path)
-        self.qsettings.setValue("recent_image_path", self.recent_image_path)
-        self.qsettings.setValue("dialog_position", self.dialog_position)
-        self.qsettings.sync()
+        """Mark changed settings dirty and schedule a debounced write to disk."""
+        for key, value in self._current_values().items():
+            if value != self._saved_values.get(key):
+                self._dirty_keys.add(key)
+        if not self._dirty_keys:
+            return
+        tracing.count('settings_save_requests')
+        if QCoreApplication.instance() is None:
+            # no event loop to run the timer (e.g. early startup), write now
+            self.flush()
+            return
+        if self._flush_timer is None:
+            self._flush_timer = QTimer()
+            self._flush_timer.setSingleShot(True)
+            self._flush_timer.setInterval(SETTINGS_FLUSH_DELAY_MSECS)
+            self._flush_timer.timeout.connect(self.flush)
+        self._flush_timer.start()
+
+    def flush(self):
+        """Write all dirty settings to disk now (called on idle, quit and exit)."""
+        if self._flush_timer is not None:
+            self._flush_timer.stop()
+        if not self._dirty_keys:
+            return
+        with tracing.span('settings_flush', lambda: {'keys': len(self._dirty_keys)}):
+            for key in sorted(self._dirty_keys):
+                value = getattr(self, key)
+                self.qsettings.setValue(key, value)
+                self._saved_values[key] = value
+            debug(f"Settings flushed: {', '.join(sorted(self._dirty_keys))}")
+            self._dirty_keys.clear()
+            self.qsettings.sync()
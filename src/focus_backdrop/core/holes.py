@@ -0,0 +1,56 @@
+from focus_backdrop.core import logger
+
+from PySide6.QtCore import QRect
+
+
+def debug(*args, **kwargs):
+    return logger.debug(*args, **kwargs)
+
+
+# Focus holes are rectangles in global screen coordinates (logical pixels)
+# where the backdrop is cut away, so the window underneath shows undimmed
+# and gets the mouse clicks. Only QtCore here, the command line parses
+# --hole before any GUI module is loaded. Stored as 'x,y,w,h;x,y,w,h'.
+
+MIN_HOLE_SIZE_PX = 8
+
+
+def parse_hole_rect(hole_text) -> QRect:
+    """Parse 'X,Y,WIDTH,HEIGHT' into a QRect, raise ValueError if it is not one."""
+    hole_parts = hole_text.replace(' ', '').split(',')
+    try:
+        left, top, width, height = (int(part) for part in hole_parts)
+    except ValueError:
+        raise ValueError(f"'{hole_text}' is not X,Y,WIDTH,HEIGHT") from None
+    if width <= 0 or height <= 0:
+        raise ValueError(f"'{hole_text}' has no area")
+    return QRect(left, top, width, height)
+
+
+def parse_hole_rects(holes_text):
+    """Parse the stored form of the holes, skipping entries that do not parse."""
+    hole_rects = []
+    for hole_text in (holes_text or '').split(';'):
+        if not hole_text.strip():
+            continue
+        try:
+            hole_rects.append(parse_hole_rect(hole_text))
+        except ValueError as hole_error:
+            debug(f"Holes: ignoring {hole_error}")
+    return hole_rects
+
+
+def format_hole_rects(hole_rects):
+    return ';'.join(
+        f"{rect.x()},{rect.y()},{rect.width()},{rect.height()}" for rect in hole_rects)
+
+
+def hole_rect_to_list(hole_rect: QRect):
+    """The JSON form of a hole, as sent to a running instance."""
+    return [hole_rect.x(), hole_rect.y(), hole_rect.width(), hole_rect.height()]
+
+
+def hole_rect_from_list(hole_values) -> QRect:
+    if not isinstance(hole_values, (list, tuple)) or len(hole_values) != 4:
+        raise ValueError(f"{hole_values!r} is not [x, y, width, height]")
+    return parse_hole_rect(','.join(str(value) for value in hole_values))
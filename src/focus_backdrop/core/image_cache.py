@@ -0,0 +1,360 @@
+from focus_backdrop.core import logger
+from focus_backdrop.core import tracing
+
+import threading
+
+from pathlib import Path
+from collections import OrderedDict
+
+from PySide6.QtCore import Qt, QRect, QSize
+
+from PySide6.QtGui import QImage, QPixmap, QImageReader
+
+
+def debug(*args, **kwargs):
+    return logger.debug(*args, **kwargs)
+
+
+DEFAULT_IMAGE_CACHE_MB      = 512
+DEFAULT_SCALED_CACHE_MB     = 256
+DEFAULT_ANIMATION_CACHE_MB  = 128
+# image headers kept (most recently used), a few dozen bytes each
+MAX_HEADER_ENTRIES          = 4096
+
+
+def image_file_key(image_path):
+    """Return (resolved path, mtime_ns, file size) for an image file, or None."""
+    if not image_path:
+        return None
+    try:
+        resolved_path = Path(image_path).expanduser().resolve()
+        file_stat = resolved_path.stat()
+    except (OSError, RuntimeError):
+        return None
+    return (str(resolved_path), file_stat.st_mtime_ns, file_stat.st_size)
+
+
+def pixmap_bytes(pixmap: QPixmap):
+    """Return the size of a pixmap's pixel buffer."""
+    if pixmap is None or pixmap.isNull():
+        return 0
+    return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+
+class ByteBudgetCache:
+    """Thread-safe LRU mapping bounded by the summed byte size of its values."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes      = max_bytes
+        self.hits           = 0
+        self.misses         = 0
+        self._entries       = OrderedDict()
+        self._total_bytes   = 0
+        self._lock          = threading.Lock()
+        self._miss_counter  = f'{type(self).__name__}.miss'
+        self._hit_counter   = f'{type(self).__name__}.hit'
+
+    def _size_of(self, value):
+        raise NotImplementedError
+
+    def lookup(self, key):
+        """Return the cached value for the key (and count a hit), or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                tracing.count(self._miss_counter)
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            tracing.count(self._hit_counter)
+            return value
+
+    def contains(self, key):
+        """Check for a key without touching the statistics or the LRU order."""
+        with self._lock:
+            return key in self._entries
+
+    def store(self, key, value):
+        value_bytes = self._size_of(value)
+        if value_bytes > self.max_bytes:
+            # larger than the whole budget, hand it out without keeping it
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= self._size_of(previous)
+            self._entries[key] = value
+            self._total_bytes += value_bytes
+            self._evict()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._total_bytes -= self._size_of(evicted)
+
+    def set_max_bytes(self, max_bytes):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits':         self.hits,
+                'misses':       self.misses,
+                'entries':      len(self._entries),
+                'bytes':        self._total_bytes,
+                'max_bytes':    self.max_bytes,
+            }
+
+
+class ImageCache(ByteBudgetCache):
+    """LRU cache of decoded QImage objects, bounded by a byte budget.
+
+    Entries are keyed by the image_file_key() of the file (resolved path,
+    modification time and file size, so an edited or replaced file is decoded
+    again instead of served stale) plus the size it was decoded at, None
+    meaning full resolution, and for a decode of only part of the file the
+    clip rectangle in source pixels.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_IMAGE_CACHE_MB * 1024 * 1024):
+        super().__init__(max_bytes)
+        # image_file_key() -> [decode lock, threads holding or waiting for it]
+        self._decode_locks = {}
+        # image_file_key() -> (full size, frame count), from the file header
+        self._headers = OrderedDict()
+
+    def _size_of(self, image: QImage):
+        return image.sizeInBytes()
+
+    def get(self, image_path, decode_size: QSize = None) -> QImage:
+        """Return the decoded image for the path (a null QImage if unreadable)."""
+        return self.get_by_key(image_file_key(image_path), decode_size)
+
+    def read_header(self, image_key):
+        """Return (full size, frame count) of an image, reading its header if needed.
+
+        Reads the file, so worker threads only. The frame count is 1 for
+        still images and 0 for animations that do not report their length;
+        for a GIF, counting the frames means scanning the whole file.
+        """
+        if image_key is None:
+            return QSize(), 1
+        header = self.known_header(image_key)
+        if header is None:
+            image_reader = QImageReader(image_key[0])
+            frame_count = image_reader.imageCount() if image_reader.supportsAnimation() else 1
+            header = (image_reader.size(), frame_count)
+            self.store_header(image_key, *header)
+        return QSize(header[0]), header[1]
+
+    def store_header(self, image_key, full_size: QSize, frame_count):
+        """Remember a header read earlier (e.g. stored with a snapshot)."""
+        with self._lock:
+            self._headers[image_key] = (QSize(full_size), frame_count)
+            self._headers.move_to_end(image_key)
+            while len(self._headers) > MAX_HEADER_ENTRIES:
+                self._headers.popitem(last=False)
+
+    def known_header(self, image_key):
+        """Return (full size, frame count) if a worker has read the header, else None.
+
+        Never touches the file, safe on the GUI thread.
+        """
+        with self._lock:
+            header = self._headers.get(image_key)
+            if header is not None:
+                self._headers.move_to_end(image_key)
+            return header
+
+    def source_size(self, image_key) -> QSize:
+        """Return the full size of an image from its header, without decoding it."""
+        return self.read_header(image_key)[0]
+
+    def get_by_key(self, image_key, decode_size: QSize = None, clip_rect: QRect = None) -> QImage:
+        """Return the decoded image, or only the clip_rect part of it if given."""
+        if image_key is None:
+            return QImage()
+
+        image = self._find_decoded(image_key, decode_size, clip_rect)
+        with self._lock:
+            if image is None:
+                self.misses += 1
+                tracing.count(self._miss_counter)
+            else:
+                self.hits += 1
+                tracing.count(self._hit_counter)
+        if image is not None:
+            return image
+
+        # decode outside the cache lock so other readers are not held up, but
+        # let concurrent requests for the same file wait for a single decode
+        with self._lock:
+            decode_lock = self._decode_locks.setdefault(image_key, [threading.Lock(), 0])
+            decode_lock[1] += 1
+        try:
+            with decode_lock[0]:
+                image = self._find_decoded(image_key, decode_size, clip_rect)
+                if image is None:
+                    image = self._decode(image_key[0], decode_size, clip_rect)
+                    if image.isNull():
+                        debug("Image cache: could not decode", image_key[0])
+                    else:
+                        self.store(self._entry_key(image_key, decode_size, clip_rect), image)
+        finally:
+            # the last one out drops the lock, a waiter that came in meanwhile
+            # must not end up with a lock of its own
+            with self._lock:
+                decode_lock[1] -= 1
+                if decode_lock[1] == 0:
+                    del self._decode_locks[image_key]
+        return image
+
+    @staticmethod
+    def _entry_key(image_key, decode_size: QSize = None, clip_rect: QRect = None):
+        entry_size = None if decode_size is None else (decode_size.width(), decode_size.height())
+        if clip_rect is None:
+            return (image_key, entry_size)
+        return (image_key, entry_size, clip_rect.getRect())
+
+    def _find_decoded(self, image_key, decode_size: QSize = None, clip_rect: QRect = None):
+        """Return a cached decode of the file that is good enough, or None.
+
+        A reduced decode can be served by any cached decode of the same file
+        that is at least as large (decodes always keep the aspect ratio), so
+        windows on differently sized screens share one decoded source. A
+        clipped decode can be cut from a full resolution one, and scaled to
+        the decode size.
+        """
+        with self._lock:
+            entry_key = self._entry_key(image_key, decode_size, clip_rect)
+            image = self._entries.get(entry_key)
+            if image is not None:
+                self._entries.move_to_end(entry_key)
+                return image
+            if clip_rect is not None:
+                # only take the reference here, QImage buffers are shared
+                # read only, the cut below leaves the cached image as it is
+                full_image = self._entries.get(self._entry_key(image_key))
+            elif decode_size is None:
+                return None
+            else:
+                return self._find_larger_decode(image_key, decode_size)
+        if full_image is None:
+            return None
+        region_image = full_image.copy(clip_rect)
+        if decode_size is not None:
+            # the region at the decode size, as the reader gives it
+            region_image = region_image.scaled(
+                decode_size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+        return region_image
+
+    def _find_larger_decode(self, image_key, decode_size: QSize):
+        """Return the smallest cached whole decode covering the size, or None (lock held)."""
+        best_key = None
+        best_pixels = None
+        for entry_key, entry_image in self._entries.items():
+            # clipped decodes (three part keys) only cover part of the file
+            if len(entry_key) != 2:
+                continue
+            entry_image_key, entry_size = entry_key
+            if entry_image_key != image_key:
+                continue
+            if (entry_image.width() < decode_size.width()
+                    or entry_image.height() < decode_size.height()):
+                continue
+            entry_pixels = entry_image.width() * entry_image.height()
+            if best_pixels is None or entry_pixels < best_pixels:
+                best_key, best_pixels = entry_key, entry_pixels
+        if best_key is None:
+            return None
+        self._entries.move_to_end(best_key)
+        return self._entries[best_key]
+
+    def _decode(self, image_path, decode_size: QSize = None, clip_rect: QRect = None) -> QImage:
+        image_reader = QImageReader(image_path)
+        if clip_rect is not None:
+            # only the rows and columns of the region are kept, the decode
+            # size then applies to the region
+            image_reader.setClipRect(clip_rect)
+        if decode_size is not None:
+            # JPEG decodes at a fraction of the size through DCT scaling,
+            # other formats are scaled right after decoding
+            image_reader.setScaledSize(decode_size)
+            image_reader.setQuality(100)
+        with tracing.span('decode', lambda: {
+                'path':     image_path,
+                'size':     None if decode_size is None else decode_size.toTuple(),
+                'clip':     None if clip_rect is None else clip_rect.getRect()}):
+            return image_reader.read()
+
+    def clear(self):
+        super().clear()
+        with self._lock:
+            self._headers.clear()
+
+
+class ScaledPixmapCache(ByteBudgetCache):
+    """LRU cache of scaled pixmaps ready for display, keyed by render.scaled_image_key()."""
+
+    def __init__(self, max_bytes=DEFAULT_SCALED_CACHE_MB * 1024 * 1024):
+        super().__init__(max_bytes)
+
+    def _size_of(self, pixmap: QPixmap):
+        return pixmap_bytes(pixmap)
+
+    def pixmap_cache_keys(self):
+        """Return the QPixmap.cacheKey() of every entry, to spot shared buffers."""
+        with self._lock:
+            return {pixmap.cacheKey() for pixmap in self._entries.values()}
+
+
+class AnimationFrameCache(ByteBudgetCache):
+    """LRU cache of scaled animation frames, as (pixmap, display msecs, next frame number).
+
+    Keyed by (render.scaled_image_key(), frame rate cap, frame number), with
+    a budget of its own so a playing animation cannot push still images out
+    of the scaled cache.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_ANIMATION_CACHE_MB * 1024 * 1024):
+        super().__init__(max_bytes)
+
+    def _size_of(self, frame):
+        return pixmap_bytes(frame[0])
+
+
+_shared_image_cache = None
+_shared_scaled_cache = None
+_shared_frame_cache = None
+
+
+def shared_image_cache() -> ImageCache:
+    """Return the process-wide image cache used by all windows and dialogs."""
+    global _shared_image_cache
+    if _shared_image_cache is None:
+        _shared_image_cache = ImageCache()
+    return _shared_image_cache
+
+
+def shared_scaled_cache() -> ScaledPixmapCache:
+    """Return the process-wide cache of scaled pixmaps (GUI thread only)."""
+    global _shared_scaled_cache
+    if _shared_scaled_cache is None:
+        _shared_scaled_cache = ScaledPixmapCache()
+    return _shared_scaled_cache
+
+
+def shared_frame_cache() -> AnimationFrameCache:
+    """Return the process-wide cache of scaled animation frames (GUI thread only)."""
+    global _shared_frame_cache
+    if _shared_frame_cache is None:
+        _shared_frame_cache = AnimationFrameCache()
+    return _shared_frame_cache
@@ -1,28 +1,126 @@
-VERBOSE = True
-FLUSH = True
+import os
+import sys
+import queue
+import atexit
+import logging
+import logging.handlers
 
-def debug(*args, ctx="DD"):
-    if not VERBOSE:
-        return
 
+# A call below the current level returns after a single level check. The
+# text of an enabled call is put together on the calling thread, and only
+# the finished record goes through the queue to the background thread that
+# writes it out.
+
+LOG_LEVEL_ENV_VAR       = 'FOCUS_BACKDROP_LOG_LEVEL'
+LOG_FILE_ENV_VAR        = 'FOCUS_BACKDROP_LOG_FILE'
+DEFAULT_LOG_LEVEL       = 'info'
+LOG_FILE_MAX_BYTES      = 1024 * 1024
+LOG_FILE_BACKUP_COUNT   = 3
+
+LOG_LEVELS = {
+    'debug':    logging.DEBUG,
+    'info':     logging.INFO,
+    'warning':  logging.WARNING,
+    'error':    logging.ERROR,
+}
+
+_logger = logging.getLogger('focus_backdrop')
+_logger.propagate = False
+_log_queue = queue.SimpleQueue()
+_listener = None
+
+
+class _ContextFormatter(logging.Formatter):
+    """Prefixes the context tag, e.g. '(DD) message', and keeps blank lines blank."""
+
+    def format(self, record):
+        if not record.ctx:
+            return ""
+        return super().format(record)
+
+
+def _console_handler():
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(_ContextFormatter('(%(ctx)s) %(message)s'))
+    return console_handler
+
+
+def _file_handler(log_file_path):
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file_path, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUP_COUNT)
+    file_handler.setFormatter(_ContextFormatter('%(asctime)s (%(ctx)s) %(message)s'))
+    return file_handler
+
+
+def _level_from_name(level_name):
+    return LOG_LEVELS.get(str(level_name).lower(), LOG_LEVELS[DEFAULT_LOG_LEVEL])
+
+
+def configure(level=None, log_file=None):
+    """Set the level and the outputs, from arguments or else the environment."""
+    global _listener
+    level = level or os.environ.get(LOG_LEVEL_ENV_VAR) or DEFAULT_LOG_LEVEL
+    log_file = log_file or os.environ.get(LOG_FILE_ENV_VAR)
+    _logger.setLevel(_level_from_name(level))
+
+    output_handlers = [_console_handler()]
+    if log_file:
+        try:
+            output_handlers.append(_file_handler(log_file))
+        except OSError as open_error:
+            print(f"(WW) Cannot open log file '{log_file}': {open_error}", flush=True)
+
+    if _listener is not None:
+        _listener.stop()
+    _listener = logging.handlers.QueueListener(_log_queue, *output_handlers)
+    _listener.start()
+
+
+def shutdown():
+    """Write out everything still queued (runs at exit)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def is_enabled(level_name):
+    return _logger.isEnabledFor(LOG_LEVELS[level_name])
+
+
+def _log(level, args, ctx):
     # allow blank lines without context
     if len(args) == 0 or (len(args) == 1 and args[0] == ""):
-        print("", flush=FLUSH)
-        return
-    print(f"({ctx})", *args, flush=FLUSH)
+        args, ctx = ("",), ""
+    # joined like print() does, here: str() of an argument may touch objects
+    # only this thread may use
+    _logger.log(level, ' '.join(str(arg) for arg in args), extra={'ctx': ctx})
+
+
+def debug(*args, ctx="DD"):
+    if _logger.isEnabledFor(logging.DEBUG):
+        _log(logging.DEBUG, args, ctx)
 
 
 def warn(*args, ctx="WW"):
-    print(f"({ctx})", *args, flush=FLUSH)
+    if _logger.isEnabledFor(logging.WARNING):
+        _log(logging.WARNING, args, ctx)
 
 
 def error(*args, ctx="EE"):
-    print(f"({ctx})", *args, flush=FLUSH)
+    if _logger.isEnabledFor(logging.ERROR):
+        _log(logging.ERROR, args, ctx)
 
 
 def log(*args, ctx="--"):
-    print(f"({ctx})", *args, flush=FLUSH)
+    if _logger.isEnabledFor(logging.INFO):
+        _log(logging.INFO, args, ctx)
 
 
 def info(*args, ctx="--"):
     log(*args, ctx=ctx)
+
+
+_logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+configure()
+atexit.register(shutdown)
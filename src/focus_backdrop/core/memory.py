@@ -0,0 +1,97 @@
+from focus_backdrop.core import logger
+from focus_backdrop.core.image_cache import (shared_image_cache, shared_scaled_cache,
+                                            shared_frame_cache)
+
+import ctypes
+import ctypes.util
+
+from PySide6.QtCore import QTimer
+
+from PySide6.QtGui import QPixmapCache
+
+
+def debug(*args, **kwargs):
+    return logger.debug(*args, **kwargs)
+
+
+# Low-memory mode (--low-memory or the low_memory setting): nothing decoded
+# or scaled is kept beyond the buffer on screen, a change of image decodes
+# again, and the C heap is trimmed after large swaps
+LOW_MEMORY = False
+
+LOW_MEMORY_PIXMAP_CACHE_KB  = 1024
+# swaps releasing at least this much are followed by a heap trim
+TRIM_MIN_BYTES              = 4 * 1024 * 1024
+# wait for the worker threads to drop their decode buffers too
+TRIM_DELAY_MSECS            = 500
+
+_malloc_trim = None
+_trim_timer = None
+
+
+def configure(cnfg, low_memory=None):
+    """Set the memory mode from the setting, or from a command line override."""
+    global LOW_MEMORY
+    LOW_MEMORY = cnfg.low_memory if low_memory is None else low_memory
+    if LOW_MEMORY:
+        debug("Low-memory mode: caches off, heap trimmed after image swaps")
+    apply_cache_budgets(cnfg)
+
+
+def apply_cache_budgets(cnfg):
+    if LOW_MEMORY:
+        # a zero budget keeps nothing, every entry is larger than the whole budget
+        shared_image_cache().set_max_bytes(0)
+        shared_scaled_cache().set_max_bytes(0)
+        shared_frame_cache().set_max_bytes(0)
+        QPixmapCache.setCacheLimit(LOW_MEMORY_PIXMAP_CACHE_KB)
+        QPixmapCache.clear()
+        return
+    shared_image_cache().set_max_bytes(cnfg.image_cache_mb * 1024 * 1024)
+    shared_scaled_cache().set_max_bytes(cnfg.scaled_cache_mb * 1024 * 1024)
+    shared_frame_cache().set_max_bytes(cnfg.animation_cache_mb * 1024 * 1024)
+
+
+def trim_heap():
+    """Hand freed C heap memory back to the system (glibc only, otherwise a no-op)."""
+    global _malloc_trim
+    if _malloc_trim is None:
+        try:
+            _malloc_trim = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6').malloc_trim
+            _malloc_trim.argtypes = (ctypes.c_size_t,)
+        except (OSError, AttributeError):
+            _malloc_trim = False
+    if not _malloc_trim:
+        return False
+    _malloc_trim(0)
+    debug("Heap trimmed")
+    return True
+
+
+def schedule_trim():
+    """Trim the heap shortly, several swaps in a row lead to a single trim."""
+    global _trim_timer
+    if _trim_timer is None:
+        _trim_timer = QTimer()
+        _trim_timer.setSingleShot(True)
+        _trim_timer.setInterval(TRIM_DELAY_MSECS)
+        _trim_timer.timeout.connect(trim_heap)
+    _trim_timer.start()
+
+
+def cache_buffer_bytes():
+    """Return the bytes held by each shared image cache."""
+    return {
+        'image_cache':          shared_image_cache().stats()['bytes'],
+        'scaled_cache':         shared_scaled_cache().stats()['bytes'],
+        'animation_frames':     shared_frame_cache().stats()['bytes'],
+    }
+
+
+def log_report(buffer_bytes):
+    """Log an image_buffer_bytes() style dict in MB."""
+    mode_name = "low-memory" if LOW_MEMORY else "normal"
+    logger.info(f"Image buffers ({mode_name} mode, Qt pixmap cache limit "
+                f"{QPixmapCache.cacheLimit()} KB):")
+    for name, byte_count in buffer_bytes.items():
+        logger.info(f"  {name:<20} {byte_count / (1024 * 1024):9.2f} MB")
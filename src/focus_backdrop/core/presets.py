@@ -0,0 +1,127 @@
+from focus_backdrop.core import logger
+from focus_backdrop.core import memory
+from focus_backdrop.core.config import SCALE_TILE, Settings
+from focus_backdrop.core.render import scaled_image_key
+from focus_backdrop.core.animation import is_animated
+from focus_backdrop.core.image_cache import (image_file_key, shared_image_cache,
+                                                shared_scaled_cache, ScaledPixmapCache)
+from focus_backdrop.core.render_worker import HeaderReader, PrefetchWorker
+
+from PySide6.QtCore import Qt, QTimer, QThread, QObject, QThreadPool, Signal
+
+from PySide6.QtGui import QImage, QPixmap
+
+
+def debug(*args, **kwargs):
+    return logger.debug(*args, **kwargs)
+
+
+# warm only once startup (and whatever the user just did) has settled
+PRESET_WARM_IDLE_MSECS = 3000
+
+
+def preset_scaling_amount(preset: dict):
+    """Like Settings.scaling_amount(), for the values of a preset."""
+    if preset['scaling_option'] == SCALE_TILE:
+        return preset['tile_scale']
+    return preset['custom_scaling']
+
+
+class PresetWarmer(QObject):
+    """Renders every preset for every render target in the background.
+
+    Runs a while after the last request to warm (startup, a preset saved,
+    a screen added), on a single lowest-priority thread, and keeps the
+    results in a cache with its own memory cap. Applying a preset hands its
+    results over to the shared scaled cache first, so the switch is a cache
+    hit: a setPixmap and a repaint. Nothing is warmed in low-memory mode.
+    """
+
+    # generation, scaled key, scaled image (emitted from worker threads)
+    sig_prefetch_finished = Signal(int, object, QImage)
+
+    def __init__(self, cnfg: Settings, render_targets, parent=None):
+        """render_targets() returns [(device size, device pixel ratio)] to warm for."""
+        super().__init__(parent)
+        self._cnfg                  = cnfg
+        self._render_targets        = render_targets
+        self.prefetch_generation    = 0
+        self._warm_cache            = ScaledPixmapCache(cnfg.preset_warm_mb * 1024 * 1024)
+        self._thread_pool           = QThreadPool(self)
+        self._thread_pool.setMaxThreadCount(1)
+        self._thread_pool.setThreadPriority(QThread.LowestPriority)
+        self._header_reader         = HeaderReader(self)
+        self._header_reader.sig_header_read.connect(self._on_header_read)
+        self._idle_timer            = QTimer(self)
+        self._idle_timer.setSingleShot(True)
+        self._idle_timer.setInterval(PRESET_WARM_IDLE_MSECS)
+        self._idle_timer.timeout.connect(self.warm_now)
+        self.sig_prefetch_finished.connect(self._on_prefetch_finished, Qt.QueuedConnection)
+
+    def schedule_warm(self):
+        if memory.LOW_MEMORY:
+            return
+        self._idle_timer.start()
+
+    def stop(self):
+        self._idle_timer.stop()
+        self.prefetch_generation += 1
+        self._thread_pool.clear()
+
+    def _target_keys(self, preset: dict):
+        image_key = image_file_key(preset['pixmap_path'])
+        if image_key is None:
+            return
+        for desired_size, device_pixel_ratio in self._render_targets():
+            scaled_key = scaled_image_key(
+                image_key, preset['scaling_option'], desired_size,
+                preset_scaling_amount(preset), preset['anchor_point'], device_pixel_ratio)
+            yield image_key, scaled_key, desired_size, device_pixel_ratio
+
+    def warm_now(self):
+        """Queue decode and scale of every preset that is not cached yet."""
+        self.stop()
+        scaled_cache = shared_scaled_cache()
+        queued_count = 0
+        for name in self._cnfg.preset_names():
+            preset = self._cnfg.preset(name)
+            image_key = image_file_key(preset['pixmap_path'])
+            if image_key is not None and shared_image_cache().known_header(image_key) is None:
+                # the scaled keys depend on the image size, warmed again once read
+                self._header_reader.request(image_key)
+                continue
+            for image_key, scaled_key, desired_size, device_pixel_ratio in self._target_keys(preset):
+                # animations are scaled a frame at a time by their player
+                if is_animated(image_key):
+                    break
+                if self._warm_cache.contains(scaled_key) or scaled_cache.contains(scaled_key):
+                    continue
+                self._thread_pool.start(PrefetchWorker(
+                    self, self.prefetch_generation, image_key, scaled_key,
+                    preset['scaling_option'], desired_size, preset_scaling_amount(preset),
+                    device_pixel_ratio, preset['anchor_point']))
+                queued_count += 1
+        if queued_count:
+            debug(f"Presets: warming {queued_count} render(s)")
+
+    def _on_header_read(self, image_key):
+        self.schedule_warm()
+
+    def is_prefetch_stale(self, generation, scaled_key):
+        return generation != self.prefetch_generation
+
+    def _on_prefetch_finished(self, generation, scaled_key, image: QImage):
+        if self.is_prefetch_stale(generation, scaled_key):
+            return
+        self._warm_cache.store(scaled_key, QPixmap.fromImage(image))
+
+    def promote(self, preset: dict):
+        """Hand the warmed results of a preset over to the shared scaled cache."""
+        scaled_cache = shared_scaled_cache()
+        for _, scaled_key, _, _ in self._target_keys(preset):
+            scaled_pixmap = self._warm_cache.lookup(scaled_key)
+            if scaled_pixmap is not None:
+                scaled_cache.store(scaled_key, scaled_pixmap)
+
+    def warm_stats(self):
+        return self._warm_cache.stats()
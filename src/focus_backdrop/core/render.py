@@ -0,0 +1,367 @@
+from focus_backdrop.core import tracing
+from focus_backdrop.core.image_cache import shared_image_cache
+from focus_backdrop.core.config import (SCALE_NO_SCALE, SCALE_CUSTOM, SCALE_FILL_DISTORT,
+                                        SCALE_FILL_CROP, SCALE_FIT_NOCROP, SCALE_FIT_WIDTH,
+                                        SCALE_FIT_HEIGHT, SCALE_TILE)
+
+import math
+
+from PySide6.QtCore import Qt, QRect, QSize, QSizeF, QPoint
+
+from PySide6.QtGui import QBrush, QColor, QImage, QRegion, QPainter
+
+
+# Only decode at a reduced size when it saves at least half of the pixels
+DECODE_REDUCTION_MIN_RATIO = 2
+# extra source pixels around a visible region, so the smooth filter sees
+# the same neighbours at the region edges as in a full scale
+REGION_MARGIN_PX = 2
+# a result that overflows the screen by less than this many times the
+# screen pixels is scaled whole and cut, the same pixels as the whole image
+# on screen; above it only the visible region is decoded and scaled
+REGION_RENDER_MIN_RATIO = 4
+
+
+def custom_scale_factor(custom_scaling):
+    """Convert the custom scaling slider value (-999 to 999) to a scale factor."""
+    if custom_scaling < 0:
+        # Scaling down from 100% to 1%
+        scale_factor = 1 + (custom_scaling / 999)
+    else:
+        # Scaling up from 100% to 200% (2 times the original size)
+        scale_factor = 1 + (2 * custom_scaling / 999)
+
+    if scale_factor < 0.02:     # stop downscaling at 2% of original size
+        scale_factor = 0.02
+    return scale_factor
+
+
+def device_size(logical_size: QSize, device_pixel_ratio) -> QSize:
+    """Convert a size in logical pixels to device pixels."""
+    return QSize(
+        round(logical_size.width() * device_pixel_ratio),
+        round(logical_size.height() * device_pixel_ratio))
+
+
+def tile_scale_factor(tile_scale):
+    """Convert the tile scale setting (percent) to a scale factor."""
+    return max(1, tile_scale) / 100
+
+
+def scaled_image_key(image_key, scaling_option, target_size: QSize, custom_scaling,
+                        anchor_point, device_pixel_ratio, keep_anchor=False):
+    """Build the key for a scaled result from every input that affects its pixels.
+
+    target_size is in device pixels, together with the device pixel ratio
+    this gives every ratio of a mixed-DPR setup its own entry.
+
+    The custom slider value only matters in custom scaling mode (and carries
+    the tile scale in tile mode), so the other modes ignore it and a mode
+    toggle can hit results made at any slider position.
+
+    keep_anchor gives the key as it is before the image size is known (the
+    snapshot files are named by it).
+    """
+    if scaling_option not in (SCALE_CUSTOM, SCALE_TILE):
+        custom_scaling = 0
+    # the anchor only positions an image that fits the screen, but it picks
+    # the visible part of one that does not (only that part is rendered).
+    # The source size comes from an image header a worker has read, never
+    # from the file here; while it is unknown the anchor stays in the key.
+    header = None if keep_anchor else shared_image_cache().known_header(image_key)
+    if header is not None and visible_region_for(
+            QSize(header[0]), scaling_option, target_size, custom_scaling,
+            anchor_point, device_pixel_ratio) is None:
+        anchor_point = None
+    else:
+        anchor_point = int(anchor_point or Qt.AlignCenter)
+    return (
+        image_key,
+        scaling_option,
+        (target_size.width(), target_size.height()),
+        custom_scaling,
+        anchor_point,
+        round(float(device_pixel_ratio), 3),
+    )
+
+
+def scaled_output_size(source_size: QSize, scaling_option, desired_size: QSize,
+                        custom_scaling=0, device_pixel_ratio=1.0) -> QSize:
+    """Return the size a source image ends up at for a scaling option.
+
+    All sizes are in device (physical) pixels. The no scaling, custom and
+    tile options size the image relative to its own pixels, which count as
+    logical pixels, so they grow with the device pixel ratio. For the tile
+    option custom_scaling is the tile scale in percent.
+    """
+    source_width, source_height = source_size.width(), source_size.height()
+    output_size = QSize(source_size)
+
+    ###############################################################################
+    ##### Show the image at the original size, no scaling
+    if scaling_option == SCALE_NO_SCALE:
+        output_size = QSize(
+            max(1, round(source_width * device_pixel_ratio)),
+            max(1, round(source_height * device_pixel_ratio)))
+    ###############################################################################
+    ##### Scale to the size specified by custom scale slider, keep aspect ratio
+    if scaling_option == SCALE_CUSTOM:
+        scale_factor = custom_scale_factor(custom_scaling) * device_pixel_ratio
+        output_size = QSize(
+            max(1, round(source_width * scale_factor)),
+            max(1, round(source_height * scale_factor)))
+    ###############################################################################
+    ##### Scale a single tile by the tile scale, the painter repeats it across
+    ##### the screen (only the one tile is ever kept in memory)
+    if scaling_option == SCALE_TILE:
+        scale_factor = tile_scale_factor(custom_scaling) * device_pixel_ratio
+        output_size = QSize(
+            max(1, round(source_width * scale_factor)),
+            max(1, round(source_height * scale_factor)))
+    ###############################################################################
+    ##### Scale to the size of the window/widget/screen, ignoring aspect ratio
+    ##### (fill screen by modifying both dimensions separately as needed)
+    if scaling_option == SCALE_FILL_DISTORT:
+        output_size = QSize(desired_size)
+    ###############################################################################
+    ##### Scale smaller dimension to the size of the window/widget/screen,
+    ##### with cropping of spillover (fill screen by cropping, keep aspect)
+    if scaling_option == SCALE_FILL_CROP:
+        output_size = source_size.scaled(desired_size, Qt.KeepAspectRatioByExpanding)
+    ###############################################################################
+    ##### Fit within the window/widget/screen dimensions
+    ##### (no cropping, allow leaving blank bars in smaller dimension)
+    if scaling_option == SCALE_FIT_NOCROP:
+        output_size = source_size.scaled(desired_size, Qt.KeepAspectRatio)
+    ###############################################################################
+    ##### Fit the width of the image to the size of the window/widget/screen,
+    ##### ignoring whether the height would crop or leave blank bars
+    if scaling_option == SCALE_FIT_WIDTH:
+        output_size = QSize(
+            desired_size.width(),
+            max(1, round(source_height * desired_size.width() / source_width)))
+    ###############################################################################
+    ##### Fit the height of the image to the size of the window/widget/screen,
+    ##### ignoring whether the width would crop or leave blank bars
+    if scaling_option == SCALE_FIT_HEIGHT:
+        output_size = QSize(
+            max(1, round(source_width * desired_size.height() / source_height)),
+            desired_size.height())
+
+    return output_size
+
+
+def decode_size_for(source_size: QSize, scaling_option, desired_size: QSize, custom_scaling=0,
+                    device_pixel_ratio=1.0):
+    """Return a reduced size to decode the source at, or None for full resolution.
+
+    Decoding straight to the output size lets JPEG use DCT scaling and keeps
+    a 60 MP photo from ever existing in memory at full size. Full resolution
+    is only needed when the output is not smaller than the source in both
+    dimensions (no scaling, custom or tile upscaling), and small reductions
+    are not worth a separate decode.
+    """
+    if not source_size.isValid() or source_size.isEmpty():
+        return None
+    output_size = scaled_output_size(
+        source_size, scaling_option, desired_size, custom_scaling, device_pixel_ratio)
+    return reduced_decode_size(source_size, output_size)
+
+
+def reduced_decode_size(source_size: QSize, output_size: QSize):
+    """Return the size to decode a source (or a region of it) at for an output size.
+
+    None means full resolution, see decode_size_for().
+    """
+    # keep the source aspect ratio (fill_distort stretches after decoding),
+    # so a decode can be reused for any output it covers
+    decode_size = source_size.scaled(output_size, Qt.KeepAspectRatioByExpanding)
+    if (decode_size.width() >= source_size.width()
+            or decode_size.height() >= source_size.height()):
+        return None
+    source_pixels = source_size.width() * source_size.height()
+    decode_pixels = decode_size.width() * decode_size.height()
+    if decode_pixels * DECODE_REDUCTION_MIN_RATIO > source_pixels:
+        return None
+    return decode_size
+
+
+def visible_output_rect(output_size: QSize, desired_size: QSize, anchor_point,
+                        device_pixel_ratio=1.0) -> QRect:
+    """Return the part of a scaled image that lands on screen, or None if all of it does.
+
+    A result larger than the screen is placed by the anchor point exactly
+    like BackdropWidget places the whole image (aligned_image_rect() in
+    logical pixels), so a cropped render shows the same pixels in the same
+    place as the whole image would.
+    """
+    if (output_size.width() <= desired_size.width()
+            and output_size.height() <= desired_size.height()):
+        return None
+    alignment = int(anchor_point) if anchor_point else int(Qt.AlignCenter)
+    # the whole image on the window, as the widget would paint it
+    logical_output_size = (QSizeF(output_size) / device_pixel_ratio).toSize()
+    logical_area_size = (QSizeF(desired_size) / device_pixel_ratio).toSize()
+    image_rect = aligned_image_rect(
+        logical_output_size, alignment, QRect(QPoint(0, 0), logical_area_size))
+
+    def visible_span(output_length, desired_length, image_start):
+        overflow = output_length - desired_length
+        if overflow <= 0:
+            return 0, output_length
+        offset = round(-image_start * device_pixel_ratio)
+        return min(max(0, offset), overflow), desired_length
+
+    left, width = visible_span(output_size.width(), desired_size.width(), image_rect.x())
+    top, height = visible_span(output_size.height(), desired_size.height(), image_rect.y())
+    return QRect(left, top, width, height)
+
+
+def visible_region_for(source_size: QSize, scaling_option, desired_size: QSize,
+                        custom_scaling=0, anchor_point=None, device_pixel_ratio=1.0):
+    """Return (source rect, rendered rect, visible rect) for a cropped result, or None.
+
+    The source rect holds the source pixels to decode, rounded outwards.
+    The rendered rect is where those pixels land in the full scaled output.
+    The visible rect is the part of the output that is on screen. Both are
+    in output (device pixel) coordinates. None means the whole image shows
+    (or is repeated, in tile mode) and is rendered as a whole.
+
+    A result that overflows the screen by less than REGION_RENDER_MIN_RATIO
+    has no source rect: it is scaled whole (the rendered rect is the full
+    output) and the visible rect is cut out of it.
+    """
+    if scaling_option == SCALE_TILE or not source_size.isValid() or source_size.isEmpty():
+        return None
+    output_size = scaled_output_size(
+        source_size, scaling_option, desired_size, custom_scaling, device_pixel_ratio)
+    visible_rect = visible_output_rect(
+        output_size, desired_size, anchor_point, device_pixel_ratio)
+    if visible_rect is None:
+        return None
+    if (output_size.width() * output_size.height()
+            < REGION_RENDER_MIN_RATIO * visible_rect.width() * visible_rect.height()):
+        return None, QRect(QPoint(0, 0), output_size), visible_rect
+    scale_x = output_size.width() / source_size.width()
+    scale_y = output_size.height() / source_size.height()
+    left    = max(0, math.floor(visible_rect.x() / scale_x) - REGION_MARGIN_PX)
+    top     = max(0, math.floor(visible_rect.y() / scale_y) - REGION_MARGIN_PX)
+    right   = min(source_size.width(),
+                    math.ceil((visible_rect.x() + visible_rect.width()) / scale_x) + REGION_MARGIN_PX)
+    bottom  = min(source_size.height(),
+                    math.ceil((visible_rect.y() + visible_rect.height()) / scale_y) + REGION_MARGIN_PX)
+    source_rect = QRect(left, top, right - left, bottom - top)
+    rendered_left, rendered_top = round(left * scale_x), round(top * scale_y)
+    rendered_rect = QRect(
+        rendered_left, rendered_top,
+        round(right * scale_x) - rendered_left, round(bottom * scale_y) - rendered_top)
+    return source_rect, rendered_rect, visible_rect
+
+
+def scale_region(region_image: QImage, rendered_rect: QRect, visible_rect: QRect,
+                    transform_mode=Qt.SmoothTransformation, device_pixel_ratio=1.0) -> QImage:
+    """Scale a decoded source region (see visible_region_for) and keep the visible part."""
+    if region_image.size() == rendered_rect.size():
+        scaled_region = region_image
+    else:
+        with tracing.span('scale', lambda: {
+                'mode':     'region',
+                'size':     rendered_rect.size().toTuple(),
+                'smooth':   transform_mode == Qt.SmoothTransformation}):
+            scaled_region = region_image.scaled(
+                rendered_rect.size(), Qt.IgnoreAspectRatio, transform_mode)
+    visible_image = scaled_region.copy(visible_rect.translated(-rendered_rect.topLeft()))
+    visible_image.setDevicePixelRatio(device_pixel_ratio)
+    return visible_image
+
+
+def scale_image(image: QImage, scaling_option, desired_size: QSize, custom_scaling=0,
+                transform_mode=Qt.SmoothTransformation, source_size: QSize = None,
+                device_pixel_ratio=1.0) -> QImage:
+    """Scale a decoded image for display in an area of the desired size.
+
+    desired_size is in device pixels and the result is tagged with the device
+    pixel ratio, so Qt draws it 1:1 on HiDPI screens instead of resampling it
+    a second time. source_size is the size of the file on disk, when the
+    image was decoded at a reduced size (see decode_size_for) the output
+    size is still worked out from the original dimensions.
+    """
+    if source_size is None or not source_size.isValid():
+        source_size = image.size()
+    output_size = scaled_output_size(
+        source_size, scaling_option, desired_size, custom_scaling, device_pixel_ratio)
+    if image.size() == output_size:
+        scaled_image = QImage(image)
+    else:
+        with tracing.span('scale', lambda: {
+                'mode':     scaling_option,
+                'size':     output_size.toTuple(),
+                'smooth':   transform_mode == Qt.SmoothTransformation}):
+            scaled_image = image.scaled(output_size, Qt.IgnoreAspectRatio, transform_mode)
+    scaled_image.setDevicePixelRatio(device_pixel_ratio)
+    return scaled_image
+
+
+###############################################################################
+##### Painting the backdrop, shared by BackdropWidget and headless rendering
+
+def aligned_image_rect(image_size: QSize, alignment, area_rect: QRect,
+                        layout_direction=Qt.LeftToRight) -> QRect:
+    """Place an image of a logical size in an area, like QStyle.alignedRect() does."""
+    alignment = int(alignment)
+    if layout_direction == Qt.RightToLeft and not alignment & int(Qt.AlignAbsolute):
+        # left and right mean leading and trailing unless made absolute
+        if alignment & int(Qt.AlignLeft):
+            alignment = (alignment & ~int(Qt.AlignLeft)) | int(Qt.AlignRight)
+        elif alignment & int(Qt.AlignRight):
+            alignment = (alignment & ~int(Qt.AlignRight)) | int(Qt.AlignLeft)
+    width, height = image_size.width(), image_size.height()
+    left, top = area_rect.x(), area_rect.y()
+    if alignment & int(Qt.AlignVCenter):
+        top += area_rect.height() // 2 - height // 2
+    elif alignment & int(Qt.AlignBottom):
+        top += area_rect.height() - height
+    if alignment & int(Qt.AlignRight):
+        left += area_rect.width() - width
+    elif alignment & int(Qt.AlignHCenter):
+        left += area_rect.width() // 2 - width // 2
+    return QRect(left, top, width, height)
+
+
+def paint_backdrop(painter: QPainter, exposed_rect: QRect, bg_color: QColor, image,
+                    image_rect: QRect, tiled=False, hole_region: QRegion = None):
+    """Paint the color fill and the anchored image (or its tiles) over the exposed rect.
+
+    image is a QPixmap on screen or a QImage when rendering headless, and
+    image_rect is where aligned_image_rect() put it, in logical pixels.
+    The hole region (focus holes) is left fully transparent.
+    """
+    if hole_region is None or not hole_region.intersects(exposed_rect):
+        _paint_backdrop_layers(painter, exposed_rect, bg_color, image, image_rect, tiled)
+        return
+    painter.save()
+    painter.setClipRegion(QRegion(exposed_rect).subtracted(hole_region), Qt.IntersectClip)
+    _paint_backdrop_layers(painter, exposed_rect, bg_color, image, image_rect, tiled)
+    painter.restore()
+    painter.save()
+    painter.setCompositionMode(QPainter.CompositionMode_Clear)
+    for hole_rect in hole_region.intersected(exposed_rect):
+        painter.fillRect(hole_rect, Qt.transparent)
+    painter.restore()
+
+
+def _paint_backdrop_layers(painter: QPainter, exposed_rect: QRect, bg_color: QColor, image,
+                            image_rect: QRect, tiled):
+    painter.fillRect(exposed_rect, bg_color)
+    if image.isNull():
+        return
+    if tiled:
+        # the brush origin is in logical pixels, Qt applies the image's
+        # device pixel ratio to the texture itself
+        painter.setBrushOrigin(image_rect.topLeft())
+        painter.fillRect(exposed_rect, QBrush(image))
+    elif image_rect.intersects(exposed_rect):
+        if isinstance(image, QImage):
+            painter.drawImage(image_rect, image)
+        else:
+            painter.drawPixmap(image_rect, image)
@@ -0,0 +1,76 @@
+from focus_backdrop.core import tracing
+
+from contextlib import contextmanager
+
+from PySide6.QtCore import QTimer, QObject
+
+
+# Render stages, as dirty flags: the decoded source, the scaled result, where
+# the result is placed on the window, the backdrop color, and the focus holes
+DIRTY_SOURCE    = 0x1
+DIRTY_SCALE     = 0x2
+DIRTY_ALIGN     = 0x4
+DIRTY_COLOR     = 0x8
+DIRTY_HOLES     = 0x10
+DIRTY_IMAGE     = DIRTY_SOURCE | DIRTY_SCALE | DIRTY_ALIGN
+DIRTY_ALL       = DIRTY_IMAGE | DIRTY_COLOR | DIRTY_HOLES
+
+
+class RenderScheduler(QObject):
+    """Collects invalidated render stages and runs one render for all of them.
+
+    Every invalidate() ORs its stages into the dirty flags and queues a run
+    for the next event loop turn, so a burst of changes (one dialog click,
+    or the move, screen and geometry signals of a single screen change)
+    ends up as one call of run_render(dirty_flags). Inside transaction()
+    nothing is queued until the outermost transaction ends.
+    """
+
+    def __init__(self, run_render, parent=None):
+        super().__init__(parent)
+        self._run_render        = run_render
+        self._dirty_flags       = 0
+        self._transaction_depth = 0
+        self._run_timer         = QTimer(self)
+        self._run_timer.setSingleShot(True)
+        self._run_timer.setInterval(0)
+        self._run_timer.timeout.connect(self.run_pending)
+
+    def dirty_flags(self):
+        return self._dirty_flags
+
+    def is_pending(self):
+        return self._dirty_flags != 0
+
+    def invalidate(self, dirty_flags):
+        if not dirty_flags:
+            return
+        self._dirty_flags |= dirty_flags
+        tracing.count('render_invalidations')
+        if self._transaction_depth == 0 and not self._run_timer.isActive():
+            self._run_timer.start()
+
+    @contextmanager
+    def transaction(self):
+        """Batch several changes into a single render: `with scheduler.transaction():`."""
+        self._transaction_depth += 1
+        try:
+            yield self
+        finally:
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0 and self._dirty_flags:
+                self._run_timer.start()
+
+    def run_pending(self):
+        """Run the queued render now (e.g. before the first paint)."""
+        self._run_timer.stop()
+        if self._transaction_depth or not self._dirty_flags:
+            return
+        dirty_flags, self._dirty_flags = self._dirty_flags, 0
+        tracing.count('render_runs')
+        with tracing.span('render_run', dirty=dirty_flags):
+            self._run_render(dirty_flags)
+
+    def cancel(self):
+        self._run_timer.stop()
+        self._dirty_flags = 0
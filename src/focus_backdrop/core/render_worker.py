@@ -0,0 +1,290 @@
+from focus_backdrop.core import logger
+from focus_backdrop.core import tracing
+from focus_backdrop.core.render import (scale_image, scale_region, decode_size_for,
+                                        reduced_decode_size, visible_region_for)
+from focus_backdrop.core.image_cache import shared_image_cache, shared_scaled_cache
+
+from PySide6.QtCore import Qt, QSize, QObject, QRunnable, QThreadPool, Signal
+
+from PySide6.QtGui import QImage, QPixmap
+
+
+def debug(*args, **kwargs):
+    return logger.debug(*args, **kwargs)
+
+
+def render_scaled_image(image_key, scaling_option, desired_size: QSize, custom_scaling,
+                        transform_mode=Qt.SmoothTransformation, device_pixel_ratio=1.0,
+                        is_stale=None, anchor_point=None):
+    """Decode (through the shared image cache) and scale one image.
+
+    Safe to call from any thread. Returns a null QImage if the file cannot
+    be decoded, or None if is_stale() reports the work is no longer wanted.
+    A result larger than the screen comes back cropped to the part the
+    anchor point puts on screen.
+    """
+    image_cache = shared_image_cache()
+    # only the header is read here, the decoder is then asked for no more
+    # pixels than the scaling option will actually show
+    source_size = image_cache.source_size(image_key)
+    visible_region = visible_region_for(
+        source_size, scaling_option, desired_size, custom_scaling, anchor_point,
+        device_pixel_ratio)
+    if visible_region is not None and visible_region[0] is not None:
+        # crop and upscale modes: decode and scale only the region that
+        # lands on screen, so memory is bounded by the screen size
+        source_rect, rendered_rect, visible_rect = visible_region
+        region_decode_size = reduced_decode_size(source_rect.size(), rendered_rect.size())
+        region_image = image_cache.get_by_key(image_key, region_decode_size, source_rect)
+        if is_stale is not None and is_stale():
+            return None
+        if region_image.isNull():
+            return region_image
+        return scale_region(
+            region_image, rendered_rect, visible_rect, transform_mode, device_pixel_ratio)
+    decode_size = decode_size_for(
+        source_size, scaling_option, desired_size, custom_scaling, device_pixel_ratio)
+    image = image_cache.get_by_key(image_key, decode_size)
+    if is_stale is not None and is_stale():
+        return None
+    if image.isNull():
+        return image
+    scaled_image = scale_image(
+        image, scaling_option, desired_size, custom_scaling, transform_mode, source_size,
+        device_pixel_ratio)
+    if visible_region is not None:
+        # a result a little larger than the screen, scaled whole: only the
+        # part on screen is kept
+        scaled_image = scaled_image.copy(visible_region[2])
+        scaled_image.setDevicePixelRatio(device_pixel_ratio)
+    return scaled_image
+
+
+class RenderWorker(QRunnable):
+    """Decode and scale one image on a thread pool thread.
+
+    Works on QImage only (QPixmap must stay on the GUI thread) and gives up
+    between stages as soon as a newer request has superseded it.
+    """
+
+    def __init__(self, renderer: 'AsyncRenderer', generation, image_key, scaled_key,
+                    scaling_option, desired_size: QSize, custom_scaling, transform_mode,
+                    device_pixel_ratio, anchor_point=None):
+        super().__init__()
+        self._renderer          = renderer
+        self.generation         = generation
+        self.image_key          = image_key
+        self.scaled_key         = scaled_key
+        self.scaling_option     = scaling_option
+        self.desired_size       = QSize(desired_size)
+        self.custom_scaling     = custom_scaling
+        self.transform_mode     = transform_mode
+        self.device_pixel_ratio = device_pixel_ratio
+        self.anchor_point       = anchor_point
+
+    def is_stale(self):
+        return self.generation != self._renderer.generation
+
+    def run(self):
+        if self.is_stale():
+            return
+        image = render_scaled_image(
+            self.image_key, self.scaling_option, self.desired_size, self.custom_scaling,
+            self.transform_mode, self.device_pixel_ratio, is_stale=self.is_stale,
+            anchor_point=self.anchor_point)
+        if image is None:
+            return
+        self._renderer.sig_worker_finished.emit(self.generation, self.scaled_key, image)
+
+
+class PrefetchWorker(QRunnable):
+    """Decode and scale an image ahead of time for one render target.
+
+    The engine (rotation, preset warming) provides prefetch_generation,
+    is_prefetch_stale(generation, scaled key) and
+    sig_prefetch_finished(generation, scaled key, image).
+    """
+
+    def __init__(self, engine: QObject, generation, image_key, scaled_key,
+                    scaling_option, desired_size: QSize, custom_scaling, device_pixel_ratio,
+                    anchor_point=None):
+        super().__init__()
+        self._engine            = engine
+        self.generation         = generation
+        self.image_key          = image_key
+        self.scaled_key         = scaled_key
+        self.scaling_option     = scaling_option
+        self.desired_size       = QSize(desired_size)
+        self.custom_scaling     = custom_scaling
+        self.device_pixel_ratio = device_pixel_ratio
+        self.anchor_point       = anchor_point
+
+    def is_stale(self):
+        return self._engine.is_prefetch_stale(self.generation, self.scaled_key)
+
+    def run(self):
+        if self.is_stale():
+            return
+        image = render_scaled_image(
+            self.image_key, self.scaling_option, self.desired_size, self.custom_scaling,
+            Qt.SmoothTransformation, self.device_pixel_ratio, is_stale=self.is_stale,
+            anchor_point=self.anchor_point)
+        if image is None or image.isNull():
+            return
+        self._engine.sig_prefetch_finished.emit(self.generation, self.scaled_key, image)
+
+
+class AnimationFrameWorker(QRunnable):
+    """Decode and scale the next shown frame of an animation on a thread pool thread.
+
+    The frame decoder keeps its reader between frames, so the player runs
+    these on a single thread. The player provides generation and
+    sig_frame_rendered(generation, frame number, image, display msecs,
+    next frame number, loop count); a failed decode comes back as a null image.
+    """
+
+    def __init__(self, player: QObject, generation, frame_decoder, frame_index,
+                    min_frame_msecs, scaling_option, desired_size: QSize, custom_scaling,
+                    device_pixel_ratio):
+        super().__init__()
+        self._player            = player
+        self.generation         = generation
+        self.frame_decoder      = frame_decoder
+        self.frame_index        = frame_index
+        self.min_frame_msecs    = min_frame_msecs
+        self.scaling_option     = scaling_option
+        self.desired_size       = QSize(desired_size)
+        self.custom_scaling     = custom_scaling
+        self.device_pixel_ratio = device_pixel_ratio
+
+    def is_stale(self):
+        return self.generation != self._player.generation
+
+    def run(self):
+        if self.is_stale():
+            return
+        shown_frame = self.frame_decoder.decode_shown_frame(self.frame_index, self.min_frame_msecs)
+        if shown_frame is None:
+            self._player.sig_frame_rendered.emit(
+                self.generation, self.frame_index, QImage(), 0, 0, self.frame_decoder.loop_count)
+            return
+        frame_image, display_msecs, next_index = shown_frame
+        if self.is_stale():
+            return
+        scaled_frame = scale_image(
+            frame_image, self.scaling_option, self.desired_size, self.custom_scaling,
+            Qt.SmoothTransformation, self.frame_decoder.source_size, self.device_pixel_ratio)
+        self._player.sig_frame_rendered.emit(
+            self.generation, self.frame_index, scaled_frame, display_msecs, next_index,
+            self.frame_decoder.loop_count)
+
+
+class HeaderWorker(QRunnable):
+    """Read the header of an image file (size, frame count) into the shared image cache."""
+
+    def __init__(self, reader: 'HeaderReader', image_key):
+        super().__init__()
+        self._reader    = reader
+        self.image_key  = image_key
+
+    def run(self):
+        shared_image_cache().read_header(self.image_key)
+        self._reader.sig_header_read.emit(self.image_key)
+
+
+class HeaderReader(QObject):
+    """Reads image headers off the GUI thread, one request per file at a time.
+
+    Scaled keys depend on the image size, so the window, rotation and
+    preset warming ask for the header first and build their keys once
+    sig_header_read arrives. Header reads are never cancelled.
+    """
+
+    # image key, once its header is in the shared image cache
+    sig_header_read = Signal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._thread_pool = QThreadPool(self)
+        self._thread_pool.setMaxThreadCount(1)
+        self._pending_headers = set()
+        self.sig_header_read.connect(self._on_header_read, Qt.QueuedConnection)
+
+    def request(self, image_key):
+        """Read the header of an image, sig_header_read tells when."""
+        if image_key in self._pending_headers:
+            return
+        self._pending_headers.add(image_key)
+        self._thread_pool.start(HeaderWorker(self, image_key))
+
+    def _on_header_read(self, image_key):
+        self._pending_headers.discard(image_key)
+
+    def wait_for_done(self, msecs=-1):
+        return self._thread_pool.waitForDone(msecs)
+
+
+class AsyncRenderer(QObject):
+    """Runs decode and scale requests off the GUI thread, newest request wins.
+
+    Every request gets a new generation number. Queued work from earlier
+    generations is dropped, running work bails out at its next check, and a
+    result that still arrives late is discarded instead of being displayed.
+    Only the current result is converted to a QPixmap, on the GUI thread.
+    """
+
+    # generation, scaled key, scaled image (emitted from worker threads)
+    sig_worker_finished = Signal(int, object, QImage)
+
+    sig_render_finished = Signal(object, QPixmap)
+    sig_render_failed = Signal(object)
+    # image key, once its header is in the shared image cache
+    sig_header_read = Signal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.generation = 0
+        self._cache_result = True
+        self._scaled_cache = shared_scaled_cache()
+        self._thread_pool = QThreadPool(self)
+        self._thread_pool.setMaxThreadCount(2)
+        # header reads are never cancelled by a newer render request
+        self._header_reader = HeaderReader(self)
+        self._header_reader.sig_header_read.connect(self.sig_header_read)
+        self.sig_worker_finished.connect(self._on_worker_finished, Qt.QueuedConnection)
+
+    def cancel_pending(self):
+        """Invalidate everything requested so far."""
+        self.generation += 1
+        self._thread_pool.clear()
+
+    def request(self, image_key, scaled_key, scaling_option, desired_size, custom_scaling,
+                transform_mode=Qt.SmoothTransformation, device_pixel_ratio=1.0, anchor_point=None):
+        self.cancel_pending()
+        tracing.count('render_requests')
+        # fast previews are replaced moments later, keep them out of the cache
+        self._cache_result = transform_mode == Qt.SmoothTransformation
+        worker = RenderWorker(
+            self, self.generation, image_key, scaled_key, scaling_option,
+            desired_size, custom_scaling, transform_mode, device_pixel_ratio, anchor_point)
+        self._thread_pool.start(worker)
+        return self.generation
+
+    def request_header(self, image_key):
+        """Read the header of an image off the GUI thread, sig_header_read tells when."""
+        self._header_reader.request(image_key)
+
+    def wait_for_done(self, msecs=-1):
+        return self._thread_pool.waitForDone(msecs) and self._header_reader.wait_for_done(msecs)
+
+    def _on_worker_finished(self, generation, scaled_key, image: QImage):
+        if generation != self.generation:
+            debug("Dropping stale render result, generation", generation)
+            return
+        if image.isNull():
+            self.sig_render_failed.emit(scaled_key)
+            return
+        scaled_pixmap = QPixmap.fromImage(image)
+        if self._cache_result:
+            self._scaled_cache.store(scaled_key, scaled_pixmap)
+        self.sig_render_finished.emit(scaled_key, scaled_pixmap)
@@ -0,0 +1,311 @@
+from focus_backdrop.core import logger
+from focus_backdrop.core import memory
+from focus_backdrop.core.config import Settings, get_default_image_directory
+from focus_backdrop.core.render import scaled_image_key
+from focus_backdrop.core.image_cache import (image_file_key, shared_image_cache,
+                                                shared_scaled_cache, ScaledPixmapCache)
+from focus_backdrop.core.render_worker import HeaderReader, PrefetchWorker
+
+import os
+import time
+import random
+
+from pathlib import Path
+from datetime import datetime, timedelta
+
+from PySide6.QtCore import Qt, QTimer, QObject, QThreadPool, Signal
+
+from PySide6.QtGui import QImage, QPixmap
+
+
+def debug(*args, **kwargs):
+    return logger.debug(*args, **kwargs)
+
+
+ROTATION_ORDER_NAME     = 'name'
+ROTATION_ORDER_MODIFIED = 'modified'
+ROTATION_ORDER_SHUFFLE  = 'shuffle'
+
+ROTATION_IMAGE_SUFFIXES = ('.png', '.apng', '.jpg', '.jpeg', '.gif', '.bmp', '.webp')
+
+
+def list_rotation_images(directory, order=ROTATION_ORDER_NAME):
+    """Return the image files directly inside a directory, in rotation order."""
+    try:
+        entries = [
+            entry for entry in os.scandir(directory)
+            if entry.is_file() and entry.name.lower().endswith(ROTATION_IMAGE_SUFFIXES)
+        ]
+    except OSError as scan_error:
+        debug(f"Rotation: cannot list '{directory}': {scan_error}")
+        return []
+    if order == ROTATION_ORDER_MODIFIED:
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+    else:
+        entries.sort(key=lambda entry: entry.name.lower())
+    image_paths = [entry.path for entry in entries]
+    if order == ROTATION_ORDER_SHUFFLE:
+        random.shuffle(image_paths)
+    return image_paths
+
+
+def parse_rotation_schedule(schedule_text):
+    """Parse 'HH:MM=directory;HH:MM=directory' into [(minute of day, directory)]."""
+    schedule = []
+    for schedule_entry in (schedule_text or '').split(';'):
+        if '=' not in schedule_entry:
+            continue
+        time_text, directory = schedule_entry.split('=', 1)
+        try:
+            hours, minutes = (int(part) for part in time_text.strip().split(':'))
+        except ValueError:
+            debug(f"Rotation: ignoring bad schedule entry '{schedule_entry}'")
+            continue
+        schedule.append(((hours * 60 + minutes) % (24 * 60), directory.strip()))
+    return sorted(schedule)
+
+
+class RotationEngine(QObject):
+    """Cycles the backdrop through the images of a directory.
+
+    The next images (prefetch depth) are decoded and scaled for every render
+    target in the background and parked in a prefetch cache with its own
+    memory cap, so switching is a cache hit. The interval and an optional
+    time-of-day schedule (a different directory per part of the day) are
+    driven by a single timer that always sleeps until the nearest due event.
+    """
+
+    sig_image_changed = Signal(str)
+    # generation, scaled key, scaled image (emitted from worker threads)
+    sig_prefetch_finished = Signal(int, object, QImage)
+
+    def __init__(self, cnfg: Settings, render_targets, directory=None, interval=None,
+                    parent=None):
+        """render_targets() returns [(device size, device pixel ratio)] to prefetch for.
+
+        directory and interval (seconds) override the settings for this run,
+        an explicit directory also the time-of-day schedule.
+        """
+        super().__init__(parent)
+        self._cnfg                  = cnfg
+        self._render_targets        = render_targets
+        self._base_directory        = (directory or cnfg.rotation_directory
+                                        or get_default_image_directory())
+        self._interval              = (interval if interval is not None
+                                        else cnfg.rotation_interval)
+        self._images                = []
+        self._index                 = -1
+        self._directory             = None
+        # a directory given for this run (--rotate DIR) wins over the schedule
+        self._schedule              = ([] if directory
+                                        else parse_rotation_schedule(cnfg.rotation_schedule))
+        self._next_rotation_at      = None
+        self.prefetch_generation    = 0
+        # scaled keys of the upcoming images, and the ones queued for them
+        self._wanted_keys           = frozenset()
+        self._queued_keys           = set()
+        self._prefetch_cache        = ScaledPixmapCache(cnfg.rotation_prefetch_mb * 1024 * 1024)
+        self._thread_pool           = QThreadPool(self)
+        self._thread_pool.setMaxThreadCount(1)
+        self._header_reader         = HeaderReader(self)
+        self._header_reader.sig_header_read.connect(self._on_header_read)
+        self._timer                 = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._on_timer)
+        self.sig_prefetch_finished.connect(self._on_prefetch_finished, Qt.QueuedConnection)
+
+    def images(self):
+        return list(self._images)
+
+    def base_directory(self):
+        return self._base_directory
+
+    def interval(self):
+        return self._interval
+
+    def current_image(self):
+        if 0 <= self._index < len(self._images):
+            return self._images[self._index]
+        return None
+
+    def start(self):
+        self._load_directory(self._scheduled_directory())
+        self.step(1)
+
+    def stop(self):
+        self._timer.stop()
+        self.stop_prefetch()
+
+    def set_interval(self, interval):
+        """Use a new interval (seconds) from now on, for this run."""
+        self._interval = interval
+        self._next_rotation_at = time.monotonic() + max(1, self._interval)
+        self._reschedule()
+
+    def stop_prefetch(self):
+        """Drop queued and prefetched renders (e.g. on a switch to low-memory mode)."""
+        self._drop_queued_prefetch()
+        self._prefetch_cache.clear()
+
+    def next_image(self):
+        self.step(1)
+
+    def previous_image(self):
+        self.step(-1)
+
+    def step(self, offset):
+        """Show the image offset places away and restart the interval."""
+        if not self._images:
+            self._reschedule()
+            return
+        self._index = (self._index + offset) % len(self._images)
+        if self._index == 0 and offset > 0 and self._cnfg.rotation_order == ROTATION_ORDER_SHUFFLE:
+            random.shuffle(self._images)
+        image_path = self._images[self._index]
+        self._promote_prefetched(image_path)
+        self._next_rotation_at = time.monotonic() + max(1, self._interval)
+        self._reschedule()
+        self.sig_image_changed.emit(image_path)
+        self.prefetch_upcoming()
+
+    ###############################################################################
+    ##### Directory and schedule
+
+    def _scheduled_directory(self):
+        if not self._schedule:
+            return self._base_directory
+        now = datetime.now()
+        minute_of_day = now.hour * 60 + now.minute
+        # the latest entry at or before now, wrapping to yesterday's last one
+        current_directory = self._schedule[-1][1]
+        for start_minute, directory in self._schedule:
+            if start_minute <= minute_of_day:
+                current_directory = directory
+        return current_directory
+
+    def _seconds_to_next_schedule_change(self):
+        if len(self._schedule) < 2:
+            return None
+        now = datetime.now()
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        for day_offset in (0, 1):
+            for start_minute, _ in self._schedule:
+                start_time = midnight + timedelta(days=day_offset, minutes=start_minute)
+                if start_time > now:
+                    return (start_time - now).total_seconds()
+        return None
+
+    def _load_directory(self, directory):
+        self._directory = directory
+        self._images = list_rotation_images(directory, self._cnfg.rotation_order) if directory else []
+        self._index = -1
+        current_path = str(Path(self._cnfg.pixmap_path)) if self._cnfg.pixmap_path else None
+        if current_path in self._images:
+            # resume after the image shown last time
+            self._index = self._images.index(current_path)
+        debug(f"Rotation: {len(self._images)} images in '{directory}'")
+
+    ###############################################################################
+    ##### Single coalesced timer
+
+    def _reschedule(self):
+        """Sleep until whichever comes first, the next rotation or schedule change."""
+        delays = []
+        if self._next_rotation_at is not None and self._images:
+            delays.append(self._next_rotation_at - time.monotonic())
+        schedule_delay = self._seconds_to_next_schedule_change()
+        if schedule_delay is not None:
+            delays.append(schedule_delay)
+        if not delays:
+            self._timer.stop()
+            return
+        self._timer.start(max(0, int(min(delays) * 1000)))
+
+    def _on_timer(self):
+        scheduled_directory = self._scheduled_directory()
+        if scheduled_directory != self._directory:
+            self._drop_queued_prefetch()
+            self._load_directory(scheduled_directory)
+            self.step(1)
+        elif self._next_rotation_at is not None and time.monotonic() >= self._next_rotation_at:
+            self.step(1)
+        else:
+            # woke up early (e.g. a clock change), just sleep again
+            self._reschedule()
+
+    ###############################################################################
+    ##### Background prefetch
+
+    def _target_keys(self, image_key):
+        for desired_size, device_pixel_ratio in self._render_targets():
+            scaled_key = scaled_image_key(
+                image_key, self._cnfg.scaling_option, desired_size,
+                self._cnfg.scaling_amount(), self._cnfg.anchor_point, device_pixel_ratio)
+            yield scaled_key, desired_size, device_pixel_ratio
+
+    def _drop_queued_prefetch(self):
+        self.prefetch_generation += 1
+        self._thread_pool.clear()
+        self._wanted_keys = frozenset()
+        self._queued_keys.clear()
+
+    def prefetch_upcoming(self):
+        """Queue decode and scale of the next images for every render target.
+
+        Work already queued for images that are still upcoming is kept, work
+        for images that left the prefetch window is dropped by its worker.
+        """
+        upcoming_targets = {}
+        # low-memory mode keeps nothing but the image on screen
+        prefetch_depth = 0 if memory.LOW_MEMORY else self._cnfg.rotation_prefetch
+        depth = min(prefetch_depth, len(self._images) - 1)
+        for offset in range(1, depth + 1):
+            image_path = self._images[(self._index + offset) % len(self._images)]
+            image_key = image_file_key(image_path)
+            if image_key is None:
+                continue
+            if shared_image_cache().known_header(image_key) is None:
+                # the scaled keys depend on the image size, see _on_header_read()
+                self._header_reader.request(image_key)
+                continue
+            for scaled_key, desired_size, device_pixel_ratio in self._target_keys(image_key):
+                upcoming_targets[scaled_key] = (image_key, desired_size, device_pixel_ratio)
+        # read by the workers, so replaced rather than changed in place
+        self._wanted_keys = frozenset(upcoming_targets)
+        self._queued_keys &= self._wanted_keys
+        scaled_cache = shared_scaled_cache()
+        for scaled_key, (image_key, desired_size, device_pixel_ratio) in upcoming_targets.items():
+            if (scaled_key in self._queued_keys or self._prefetch_cache.contains(scaled_key)
+                    or scaled_cache.contains(scaled_key)):
+                continue
+            self._queued_keys.add(scaled_key)
+            self._thread_pool.start(PrefetchWorker(
+                self, self.prefetch_generation, image_key, scaled_key,
+                self._cnfg.scaling_option, desired_size, self._cnfg.scaling_amount(),
+                device_pixel_ratio, self._cnfg.anchor_point))
+
+    def _on_header_read(self, image_key):
+        self.prefetch_upcoming()
+
+    def is_prefetch_stale(self, generation, scaled_key):
+        return generation != self.prefetch_generation or scaled_key not in self._wanted_keys
+
+    def _on_prefetch_finished(self, generation, scaled_key, image: QImage):
+        self._queued_keys.discard(scaled_key)
+        if self.is_prefetch_stale(generation, scaled_key):
+            return
+        self._prefetch_cache.store(scaled_key, QPixmap.fromImage(image))
+
+    def _promote_prefetched(self, image_path):
+        """Hand prefetched results for the image over to the shared scaled cache."""
+        image_key = image_file_key(image_path)
+        if image_key is None:
+            return
+        scaled_cache = shared_scaled_cache()
+        for scaled_key, _, _ in self._target_keys(image_key):
+            scaled_pixmap = self._prefetch_cache.lookup(scaled_key)
+            if scaled_pixmap is not None:
+                scaled_cache.store(scaled_key, scaled_pixmap)
+
+    def prefetch_stats(self):
+        return self._prefetch_cache.stats()
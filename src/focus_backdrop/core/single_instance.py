@@ -0,0 +1,114 @@
+from focus_backdrop.core import logger
+
+import os
+import json
+import getpass
+
+from PySide6.QtCore import QObject, Signal
+
+from PySide6.QtNetwork import QLocalServer, QLocalSocket
+
+
+def debug(*args, **kwargs):
+    return logger.debug(*args, **kwargs)
+
+
+# only QtCore and QtNetwork are needed here, so a second launch can hand its
+# command over and exit before any GUI module is loaded
+CONNECT_TIMEOUT_MSECS   = 200
+REPLY_TIMEOUT_MSECS     = 1000
+COMMAND_REPLY_OK        = b'ok\n'
+
+
+def server_name():
+    """One server per user (and per display, so separate sessions stay apart)."""
+    try:
+        user_name = getpass.getuser()
+    except (KeyError, OSError):
+        user_name = str(os.getuid()) if hasattr(os, 'getuid') else 'user'
+    display_name = os.environ.get('WAYLAND_DISPLAY') or os.environ.get('DISPLAY') or ''
+    display_name = display_name.replace(':', '').replace('/', '_')
+    return f"focus-backdrop-{user_name}-{display_name}" if display_name else f"focus-backdrop-{user_name}"
+
+
+def instance_is_running():
+    """Return True if an instance is listening, without sending it anything."""
+    local_socket = QLocalSocket()
+    local_socket.connectToServer(server_name())
+    if not local_socket.waitForConnected(CONNECT_TIMEOUT_MSECS):
+        return False
+    local_socket.disconnectFromServer()
+    return True
+
+
+def forward_to_running_instance(command: dict):
+    """Send a command to the running instance, return False if there is none."""
+    local_socket = QLocalSocket()
+    local_socket.connectToServer(server_name())
+    if not local_socket.waitForConnected(CONNECT_TIMEOUT_MSECS):
+        return False
+    local_socket.write(json.dumps(command).encode('utf-8') + b'\n')
+    # no event loop runs here, waitForReadyRead() also sends the command
+    while local_socket.bytesAvailable() < len(COMMAND_REPLY_OK):
+        if not local_socket.waitForReadyRead(REPLY_TIMEOUT_MSECS):
+            break
+    delivered = bytes(local_socket.readAll()) == COMMAND_REPLY_OK
+    local_socket.disconnectFromServer()
+    return delivered
+
+
+class InstanceServer(QObject):
+    """Listens for commands from later launches (one JSON object per line)."""
+
+    sig_command_received = Signal(dict)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._server = QLocalServer(self)
+        self._server.setSocketOptions(QLocalServer.UserAccessOption)
+        self._server.newConnection.connect(self.on_new_connection)
+
+    def listen(self):
+        """Start listening, return False if another instance already does (or on error)."""
+        name = server_name()
+        # listen() may replace the socket file of a live instance (Qt 6 does
+        # on Unix), so ask first: a launch at the same moment, or an instance
+        # too busy to answer a forwarded command in time, keeps its socket
+        if instance_is_running():
+            debug(f"Single instance: '{name}' is taken by a running instance")
+            return False
+        if not self._server.listen(name):
+            # a socket file left behind by a crashed instance, nobody
+            # answered on it above, so reclaim it
+            QLocalServer.removeServer(name)
+            if not self._server.listen(name):
+                logger.warn(f"Single instance: cannot listen on '{name}': "
+                            f"{self._server.errorString()}")
+                return False
+        debug(f"Single instance: listening on '{self._server.fullServerName()}'")
+        return True
+
+    def close(self):
+        self._server.close()
+
+    def on_new_connection(self):
+        while self._server.hasPendingConnections():
+            client_socket = self._server.nextPendingConnection()
+            client_socket.readyRead.connect(
+                lambda client_socket=client_socket: self.on_ready_read(client_socket))
+            client_socket.disconnected.connect(client_socket.deleteLater)
+
+    def on_ready_read(self, client_socket: QLocalSocket):
+        while client_socket.canReadLine():
+            command_line = bytes(client_socket.readLine())
+            try:
+                command = json.loads(command_line.decode('utf-8'))
+            except ValueError:
+                logger.warn(f"Single instance: ignoring malformed command {command_line!r}")
+                continue
+            if not isinstance(command, dict):
+                continue
+            client_socket.write(COMMAND_REPLY_OK)
+            client_socket.flush()
+            debug(f"Single instance: received {command}")
+            self.sig_command_received.emit(command)
@@ -0,0 +1,111 @@
+from focus_backdrop.core import logger
+from focus_backdrop.core.config import get_cache_directory
+
+import os
+import mmap
+import struct
+import hashlib
+import tempfile
+
+from pathlib import Path
+
+from PySide6.QtCore import QSize
+
+from PySide6.QtGui import QImage, QPixmap
+
+
+def debug(*args, **kwargs):
+    return logger.debug(*args, **kwargs)
+
+
+# magic, width, height, bytes per line, QImage format, device pixel ratio,
+# and the header of the source image: width, height, frame count
+SNAPSHOT_MAGIC          = b'FBSNAP02'
+SNAPSHOT_HEADER         = struct.Struct('<8siiiidiii')
+
+
+def snapshot_dir() -> Path:
+    return get_cache_directory() / 'focus_backdrop' / 'snapshots'
+
+
+def _geometry_prefix(scaled_key):
+    (width, height), device_pixel_ratio = scaled_key[2], scaled_key[5]
+    return f"{width}x{height}@{device_pixel_ratio:g}"
+
+
+def snapshot_path_for(scaled_key) -> Path:
+    """One file per scaled result, named by screen geometry and a hash of the key.
+
+    The key is the one built before the image size is known (see
+    render.scaled_image_key(keep_anchor=True)), so it can be looked up at
+    startup before any header has been read.
+    """
+    key_hash = hashlib.sha1(repr(scaled_key).encode('utf-8')).hexdigest()
+    return snapshot_dir() / f"{_geometry_prefix(scaled_key)}-{key_hash}.raw"
+
+
+def save_snapshot(scaled_key, image: QImage, source_header):
+    """Store a scaled result as raw pixels, replacing older ones for the same geometry.
+
+    source_header is the (full size, frame count) of the source image.
+    """
+    if image.isNull():
+        return
+    snapshot_path = snapshot_path_for(scaled_key)
+    if snapshot_path.exists():
+        return
+    source_size, frame_count = source_header
+    header = SNAPSHOT_HEADER.pack(
+        SNAPSHOT_MAGIC, image.width(), image.height(), image.bytesPerLine(),
+        image.format().value, image.devicePixelRatio(),
+        source_size.width(), source_size.height(), frame_count)
+    try:
+        snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=str(snapshot_path.parent))
+        with os.fdopen(temp_fd, 'wb') as snapshot_file:
+            snapshot_file.write(header)
+            snapshot_file.write(image.constBits())
+        os.replace(temp_path, str(snapshot_path))
+    except OSError as write_error:
+        debug(f"Snapshot: cannot write '{snapshot_path}': {write_error}")
+        return
+    # keep only the last snapshot per screen geometry
+    for old_path in snapshot_path.parent.glob(f"{_geometry_prefix(scaled_key)}-*.raw"):
+        if old_path != snapshot_path:
+            old_path.unlink(missing_ok=True)
+    debug(f"Snapshot: saved '{snapshot_path.name}'")
+
+
+def load_snapshot(scaled_key):
+    """Return (QPixmap, source header) of a stored snapshot, or None if there is none."""
+    snapshot_path = snapshot_path_for(scaled_key)
+    try:
+        with open(snapshot_path, 'rb') as snapshot_file:
+            mapped_file = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        if len(mapped_file) < SNAPSHOT_HEADER.size:
+            return None
+        (magic, width, height, bytes_per_line, image_format, device_pixel_ratio,
+            source_width, source_height, frame_count) = SNAPSHOT_HEADER.unpack_from(mapped_file, 0)
+        if (magic != SNAPSHOT_MAGIC
+                or len(mapped_file) != SNAPSHOT_HEADER.size + bytes_per_line * height):
+            debug(f"Snapshot: ignoring damaged '{snapshot_path.name}'")
+            return None
+        snapshot_image = QImage(width, height, QImage.Format(image_format))
+        if snapshot_image.isNull() or snapshot_image.bytesPerLine() != bytes_per_line:
+            debug(f"Snapshot: ignoring '{snapshot_path.name}', its row layout does not fit")
+            return None
+        # the one copy, straight from the mapped pages into the image
+        with memoryview(mapped_file) as mapped_view:
+            memoryview(snapshot_image.bits())[:] = mapped_view[SNAPSHOT_HEADER.size:]
+    finally:
+        mapped_file.close()
+    snapshot_image.setDevicePixelRatio(device_pixel_ratio)
+    # a raster QPixmap takes over the image buffer as it is
+    snapshot_pixmap = QPixmap.fromImage(snapshot_image)
+    del snapshot_image
+    if snapshot_pixmap.isNull():
+        return None
+    return snapshot_pixmap, (QSize(source_width, source_height), frame_count)
@@ -0,0 +1,40 @@
+import os
+import time
+
+
+# (phase name, perf_counter) marks, recorded always (cheap) and only
+# printed when --profile-startup is given
+_marks = [('main module loaded', time.perf_counter())]
+
+
+def process_age():
+    """Seconds since the process was started, or None where /proc is missing."""
+    try:
+        with open('/proc/self/stat') as stat_file:
+            stat_fields = stat_file.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as uptime_file:
+            uptime = float(uptime_file.read().split()[0])
+        return uptime - int(stat_fields[19]) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# interpreter start and everything imported before focus_backdrop.main
+_startup_age = process_age()
+
+
+def mark(phase):
+    _marks.append((phase, time.perf_counter()))
+
+
+def report():
+    """Print the time spent in each phase, from process start to the last mark."""
+    print("Startup profile (ms):", flush=True)
+    total_msecs = 0.0
+    if _startup_age is not None:
+        total_msecs = _startup_age * 1000
+        print(f"  {total_msecs:9.1f}  {total_msecs:9.1f}  interpreter start and imports", flush=True)
+    for (_, previous_time), (phase, phase_time) in zip(_marks, _marks[1:]):
+        phase_msecs = (phase_time - previous_time) * 1000
+        total_msecs += phase_msecs
+        print(f"  {phase_msecs:9.1f}  {total_msecs:9.1f}  {phase}", flush=True)
@@ -1,9 +1,16 @@
+from focus_backdrop.core import tracing
+
 from PySide6.QtCore import Qt, QCoreApplication
 from PySide6.QtGui import QColor, QPalette
 from PySide6.QtWidgets import QApplication
 
 
 def apply_theme(config_object):
+    with tracing.span('apply_theme', dark=config_object.dark_theme):
+        _apply_theme(config_object)
+
+
+def _apply_theme(config_object):
     app: QApplication = QCoreApplication.instance()
     if not config_object.dark_theme:
         light_theme_palette = QPalette()
@@ -0,0 +1,310 @@
+from focus_backdrop.core import logger
+from focus_backdrop.core.config import get_cache_directory
+from focus_backdrop.core.rotation import ROTATION_IMAGE_SUFFIXES
+
+import os
+import json
+import hashlib
+import tempfile
+
+from pathlib import Path
+
+from PySide6.QtCore import Qt, QSize, QObject, QRunnable, QThreadPool, Signal
+
+from PySide6.QtGui import QImage, QImageReader
+
+
+def debug(*args, **kwargs):
+    return logger.debug(*args, **kwargs)
+
+
+# freedesktop.org thumbnail spec: 'normal' thumbnails fit in 128x128
+THUMBNAIL_SIZE          = 128
+THUMBNAIL_FLAVOR        = 'normal'
+# failed decodes are recorded per application, so they are not retried
+FAIL_RECORD_APP_NAME    = 'focus-backdrop'
+
+INDEX_FORMAT_VERSION    = 1
+
+
+def thumbnail_dir() -> Path:
+    return get_cache_directory() / 'thumbnails' / THUMBNAIL_FLAVOR
+
+
+def fail_record_dir() -> Path:
+    return get_cache_directory() / 'thumbnails' / 'fail' / FAIL_RECORD_APP_NAME
+
+
+def _thumbnail_file_name(image_path):
+    file_uri = Path(image_path).absolute().as_uri()
+    return hashlib.md5(file_uri.encode('utf-8')).hexdigest() + '.png'
+
+
+def thumbnail_path_for(image_path) -> Path:
+    """Return the spec location of the thumbnail: md5 of the file URI, as PNG."""
+    return thumbnail_dir() / _thumbnail_file_name(image_path)
+
+
+def fail_record_path_for(image_path) -> Path:
+    return fail_record_dir() / _thumbnail_file_name(image_path)
+
+
+def has_fail_record(image_path, image_mtime) -> bool:
+    """Check if this version of the file failed to decode before."""
+    fail_record_path = fail_record_path_for(image_path)
+    if not fail_record_path.exists():
+        return False
+    return QImage(str(fail_record_path)).text('Thumb::MTime') == str(int(image_mtime))
+
+
+def load_valid_thumbnail(image_path, image_mtime) -> QImage:
+    """Return the cached thumbnail if it was made from this version of the file."""
+    cached_path = thumbnail_path_for(image_path)
+    if not cached_path.exists():
+        return QImage()
+    thumbnail = QImage(str(cached_path))
+    if thumbnail.isNull() or thumbnail.text('Thumb::MTime') != str(int(image_mtime)):
+        return QImage()
+    return thumbnail
+
+
+def create_thumbnail(image_path, image_mtime, image_file_size):
+    """Decode a reduced copy of the image, store it per the spec, return it with its header.
+
+    Returns (thumbnail, (width, height, format)), or a null thumbnail and an
+    empty header when the file cannot be decoded.
+    """
+    image_reader = QImageReader(str(image_path))
+    full_size = image_reader.size()
+    image_format = bytes(image_reader.format()).decode('ascii', 'replace')
+    if full_size.isValid() and (full_size.width() > THUMBNAIL_SIZE
+                                or full_size.height() > THUMBNAIL_SIZE):
+        image_reader.setScaledSize(
+            full_size.scaled(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE), Qt.KeepAspectRatio))
+    thumbnail = image_reader.read()
+    if thumbnail.isNull():
+        # the spec's fail record: a tiny PNG with the same keys, so this
+        # version of the file is not decoded again
+        fail_record = QImage(1, 1, QImage.Format_ARGB32)
+        fail_record.fill(0)
+        fail_record.setText('Thumb::URI', Path(image_path).absolute().as_uri())
+        fail_record.setText('Thumb::MTime', str(int(image_mtime)))
+        fail_record.setText('Software', 'Focus Backdrop')
+        _store_png(fail_record, fail_record_path_for(image_path), image_path)
+        return thumbnail, ()
+    if not full_size.isValid():
+        full_size = thumbnail.size()
+        thumbnail = thumbnail.scaled(
+            THUMBNAIL_SIZE, THUMBNAIL_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+    thumbnail.setText('Thumb::URI', Path(image_path).absolute().as_uri())
+    thumbnail.setText('Thumb::MTime', str(int(image_mtime)))
+    thumbnail.setText('Thumb::Size', str(image_file_size))
+    thumbnail.setText('Thumb::Image::Width', str(full_size.width()))
+    thumbnail.setText('Thumb::Image::Height', str(full_size.height()))
+    thumbnail.setText('Software', 'Focus Backdrop')
+
+    _store_png(thumbnail, thumbnail_path_for(image_path), image_path)
+    return thumbnail, (full_size.width(), full_size.height(), image_format)
+
+
+def _store_png(image: QImage, cached_path: Path, image_path):
+    # write to a temporary file and rename, so readers never see a partial file
+    try:
+        cached_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        temp_fd, temp_path = tempfile.mkstemp(suffix='.png', dir=str(cached_path.parent))
+        os.close(temp_fd)
+        if image.save(temp_path, 'PNG'):
+            os.chmod(temp_path, 0o600)
+            os.replace(temp_path, str(cached_path))
+        else:
+            os.unlink(temp_path)
+    except OSError as write_error:
+        debug(f"Thumbnails: cannot store '{cached_path.name}' for '{image_path}': {write_error}")
+
+
+class ImageIndex:
+    """Persistent index of the images in browsed directories.
+
+    Each record holds mtime, file size, dimensions and format. A rescan only
+    stats the directory, records whose mtime and size are unchanged are kept
+    as they are and only new or changed files are returned for a header read.
+    """
+
+    def __init__(self, index_path=None):
+        self.index_path = Path(index_path or get_cache_directory() / 'focus_backdrop' / 'image_index.json')
+        self._directories = {}
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            index_data = json.loads(self.index_path.read_text())
+        except (OSError, ValueError):
+            return
+        if index_data.get('version') == INDEX_FORMAT_VERSION:
+            self._directories = index_data.get('directories', {})
+
+    def save(self):
+        if not self._dirty:
+            return
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.index_path.with_suffix('.tmp')
+            temp_path.write_text(json.dumps(
+                {'version': INDEX_FORMAT_VERSION, 'directories': self._directories}))
+            os.replace(str(temp_path), str(self.index_path))
+            self._dirty = False
+        except OSError as write_error:
+            debug(f"Image index: cannot save '{self.index_path}': {write_error}")
+
+    def scan(self, directory):
+        """Return ([records in name order], [paths that are new or changed])."""
+        directory = str(Path(directory).resolve())
+        known_records = self._directories.get(directory, {})
+        records = {}
+        changed_paths = []
+        try:
+            dir_entries = list(os.scandir(directory))
+        except OSError as scan_error:
+            debug(f"Image index: cannot list '{directory}': {scan_error}")
+            dir_entries = []
+        for dir_entry in dir_entries:
+            if not dir_entry.name.lower().endswith(ROTATION_IMAGE_SUFFIXES):
+                continue
+            try:
+                if not dir_entry.is_file():
+                    continue
+                entry_stat = dir_entry.stat()
+            except OSError:
+                continue
+            record = known_records.get(dir_entry.name)
+            if (record is None or record['mtime'] != entry_stat.st_mtime
+                    or record['size'] != entry_stat.st_size):
+                record = {
+                    'path':     dir_entry.path,
+                    'mtime':    entry_stat.st_mtime,
+                    'size':     entry_stat.st_size,
+                    'width':    None,
+                    'height':   None,
+                    'format':   None,
+                }
+                changed_paths.append(dir_entry.path)
+            records[dir_entry.name] = record
+        if records.keys() != known_records.keys() or changed_paths:
+            self._directories[directory] = records
+            self._dirty = True
+        ordered_records = [records[name] for name in sorted(records, key=str.lower)]
+        return ordered_records, changed_paths
+
+    def update_header(self, image_path, width, height, image_format):
+        directory = str(Path(image_path).parent.resolve())
+        record = self._directories.get(directory, {}).get(Path(image_path).name)
+        if record is None:
+            return
+        record['width'], record['height'], record['format'] = width, height, image_format
+        self._dirty = True
+
+    def record(self, image_path):
+        directory = str(Path(image_path).parent.resolve())
+        return self._directories.get(directory, {}).get(Path(image_path).name)
+
+
+class ThumbnailWorker(QRunnable):
+    """Load a valid cached thumbnail, or create one, on a pool thread."""
+
+    def __init__(self, loader: 'ThumbnailLoader', generation, image_path, image_mtime,
+                    image_file_size, needs_header):
+        super().__init__()
+        self._loader            = loader
+        self.generation         = generation
+        self.image_path         = image_path
+        self.image_mtime        = image_mtime
+        self.image_file_size    = image_file_size
+        self.needs_header       = needs_header
+
+    def run(self):
+        if self.generation != self._loader.generation:
+            return
+        header = ()
+        thumbnail = load_valid_thumbnail(self.image_path, self.image_mtime)
+        if not thumbnail.isNull() and self.needs_header:
+            header = (
+                int(thumbnail.text('Thumb::Image::Width') or 0),
+                int(thumbnail.text('Thumb::Image::Height') or 0),
+                bytes(QImageReader(self.image_path).format()).decode('ascii', 'replace'),
+            )
+        if thumbnail.isNull():
+            thumbnail, header = create_thumbnail(
+                self.image_path, self.image_mtime, self.image_file_size)
+        self._loader.sig_worker_finished.emit(
+            self.generation, self.image_path, thumbnail, header)
+
+
+class ThumbnailLoader(QObject):
+    """Produces thumbnails for index records on a pool of worker threads.
+
+    cancel() only bumps the generation and drops the queued workers, one
+    still running finishes in the background and its result is ignored.
+    """
+
+    # generation, image path, thumbnail, (width, height, format) or () if unchanged
+    sig_worker_finished = Signal(int, str, QImage, object)
+    sig_thumbnail_ready = Signal(str, QImage)
+
+    def __init__(self, image_index: ImageIndex, parent=None):
+        super().__init__(parent)
+        self.generation = 0
+        self._image_index = image_index
+        self._thread_pool = QThreadPool(self)
+        self._thread_pool.setMaxThreadCount(max(2, QThreadPool.globalInstance().maxThreadCount()))
+        self.sig_worker_finished.connect(self._on_worker_finished, Qt.QueuedConnection)
+
+    def cancel(self):
+        self.generation += 1
+        self._thread_pool.clear()
+
+    def request(self, records, changed_paths):
+        self.cancel()
+        changed_paths = set(changed_paths)
+        for record in records:
+            if has_fail_record(record['path'], record['mtime']):
+                continue
+            self._thread_pool.start(ThumbnailWorker(
+                self, self.generation, record['path'], record['mtime'], record['size'],
+                record['path'] in changed_paths or record['width'] is None))
+
+    def wait_for_done(self, msecs=-1):
+        return self._thread_pool.waitForDone(msecs)
+
+    def _on_worker_finished(self, generation, image_path, thumbnail: QImage, header):
+        if generation != self.generation:
+            return
+        if header:
+            self._image_index.update_header(image_path, *header)
+        if not thumbnail.isNull():
+            self.sig_thumbnail_ready.emit(image_path, thumbnail)
+
+
+_shared_image_index = None
+_shared_thumbnail_loader = None
+
+
+def shared_image_index() -> ImageIndex:
+    """Return the process wide image index, loaded from disk on first use."""
+    global _shared_image_index
+    if _shared_image_index is None:
+        _shared_image_index = ImageIndex()
+    return _shared_image_index
+
+
+def shared_thumbnail_loader() -> ThumbnailLoader:
+    """Return the process wide thumbnail loader (GUI thread only).
+
+    It outlives the dialogs using it, so closing one never waits for a
+    decode still running on a worker thread.
+    """
+    global _shared_thumbnail_loader
+    if _shared_thumbnail_loader is None:
+        _shared_thumbnail_loader = ThumbnailLoader(shared_image_index())
+    return _shared_thumbnail_loader
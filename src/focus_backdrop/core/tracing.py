@@ -0,0 +1,203 @@
+from focus_backdrop.core import logger
+
+import os
+import json
+import time
+import atexit
+import threading
+
+from collections import deque
+
+
+def debug(*args, **kwargs):
+    return logger.debug(*args, **kwargs)
+
+
+# FOCUS_BACKDROP_TRACE=PATH (or --trace PATH) turns tracing on, a path
+# ending in .json gets Chrome trace format (chrome://tracing, Perfetto),
+# anything else JSON lines
+TRACE_ENV_VAR           = 'FOCUS_BACKDROP_TRACE'
+TRACE_BUFFER_ENV_VAR    = 'FOCUS_BACKDROP_TRACE_BUFFER'
+TRACE_BUFFER_SIZE       = 100000
+
+ENABLED = False
+
+# (phase, name, start ns, duration ns or counter value, thread id, args)
+_events = deque(maxlen=TRACE_BUFFER_SIZE)
+_output_path = None
+_start_ns = time.perf_counter_ns()
+
+
+class _NullSpan:
+    """Returned by span() while tracing is off, entering and leaving do nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('name', 'args', 'start_ns')
+
+    def __init__(self, name, args):
+        self.name       = name
+        self.args       = args
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        end_ns = time.perf_counter_ns()
+        # deque.append is atomic, spans can end on any thread
+        _events.append(
+            ('X', self.name, self.start_ns, end_ns - self.start_ns, threading.get_ident(), self.args))
+        return False
+
+
+def span(name, lazy_args=None, **args):
+    """Time a block: `with tracing.span('decode', path=path):`.
+
+    Arguments that take work to build go in lazy_args, a callable returning
+    a dict, which is only called while tracing is on.
+    """
+    if not ENABLED:
+        return _NULL_SPAN
+    if lazy_args is not None:
+        args.update(lazy_args())
+    return _Span(name, args)
+
+
+def count(name, value=1):
+    """Record a counter sample, e.g. a cache hit."""
+    if ENABLED:
+        _events.append(('C', name, time.perf_counter_ns(), value, threading.get_ident(), None))
+
+
+def enable(output_path=None, buffer_size=None):
+    """Start recording into the ring buffer, export and summarize at exit."""
+    global ENABLED, _events, _output_path
+    if buffer_size:
+        _events = deque(_events, maxlen=buffer_size)
+    _output_path = output_path
+    if not ENABLED:
+        ENABLED = True
+        atexit.register(dump_at_exit)
+
+
+def configure(trace_path=None):
+    """Enable tracing from the --trace argument or the environment variable."""
+    trace_path = trace_path or os.environ.get(TRACE_ENV_VAR)
+    if not trace_path:
+        return
+    buffer_size = int(os.environ.get(TRACE_BUFFER_ENV_VAR) or TRACE_BUFFER_SIZE)
+    enable(trace_path, buffer_size)
+    debug(f"Tracing to '{trace_path}' (ring buffer of {buffer_size} events)")
+
+
+def events():
+    return list(_events)
+
+
+def summary():
+    """Return {span name: {count, p50, p95, max}} with times in milliseconds."""
+    durations = {}
+    for phase, name, _, duration_ns, _, _ in list(_events):
+        if phase == 'X':
+            durations.setdefault(name, []).append(duration_ns / 1e6)
+    span_stats = {}
+    for name, span_durations in durations.items():
+        span_durations.sort()
+        last_index = len(span_durations) - 1
+        span_stats[name] = {
+            'count':    len(span_durations),
+            'p50':      span_durations[round(0.50 * last_index)],
+            'p95':      span_durations[round(0.95 * last_index)],
+            'max':      span_durations[-1],
+        }
+    return span_stats
+
+
+def export_jsonl(output_path):
+    with open(output_path, 'w') as output_file:
+        for phase, name, timestamp_ns, value, thread_id, args in list(_events):
+            event = {
+                'type':     'span' if phase == 'X' else 'counter',
+                'name':     name,
+                'ts_ms':    (timestamp_ns - _start_ns) / 1e6,
+                'thread':   thread_id,
+            }
+            if phase == 'X':
+                event['dur_ms'] = value / 1e6
+            else:
+                event['value'] = value
+            if args:
+                event['args'] = args
+            output_file.write(json.dumps(event, default=str) + '\n')
+
+
+def export_chrome_trace(output_path):
+    process_id = os.getpid()
+    trace_events = []
+    # Chrome plots counters as levels, so export running totals
+    counter_totals = {}
+    for phase, name, timestamp_ns, value, thread_id, args in list(_events):
+        trace_event = {
+            'name':     name,
+            'ph':       phase,
+            'ts':       (timestamp_ns - _start_ns) / 1000,
+            'pid':      process_id,
+            'tid':      thread_id,
+        }
+        if phase == 'X':
+            trace_event['dur'] = value / 1000
+            trace_event['args'] = args or {}
+        else:
+            counter_totals[name] = counter_totals.get(name, 0) + value
+            trace_event['args'] = {name: counter_totals[name]}
+        trace_events.append(trace_event)
+    with open(output_path, 'w') as output_file:
+        json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, output_file, default=str)
+
+
+def export(output_path):
+    if str(output_path).endswith('.json'):
+        export_chrome_trace(output_path)
+    else:
+        export_jsonl(output_path)
+
+
+def counter_totals():
+    totals = {}
+    for phase, name, _, value, _, _ in list(_events):
+        if phase == 'C':
+            totals[name] = totals.get(name, 0) + value
+    return totals
+
+
+def print_summary():
+    span_stats = summary()
+    if span_stats:
+        logger.info("Trace summary (ms):")
+        logger.info(f"  {'span':<28} {'count':>7} {'p50':>9} {'p95':>9} {'max':>9}")
+        for name, stats in sorted(span_stats.items()):
+            logger.info(f"  {name:<28} {stats['count']:>7} {stats['p50']:>9.3f} "
+                        f"{stats['p95']:>9.3f} {stats['max']:>9.3f}")
+    for name, total in sorted(counter_totals().items()):
+        logger.info(f"  {name:<28} {total:>7}")
+
+
+def dump_at_exit():
+    if _output_path:
+        try:
+            export(_output_path)
+        except OSError as write_error:
+            logger.warn(f"Cannot write trace to '{_output_path}': {write_error}")
+    print_summary()
@@ -0,0 +1,364 @@
+from focus_backdrop.core import logger
+from focus_backdrop.core import memory
+from focus_backdrop.core.config import Settings
+from focus_backdrop.core.holes import format_hole_rects, hole_rect_from_list
+from focus_backdrop.core.presets import PresetWarmer
+from focus_backdrop.core.image_cache import pixmap_bytes, shared_scaled_cache
+from focus_backdrop.core.themes import apply_theme
+from focus_backdrop.gui.main_window import MainWindow
+
+from functools import partial
+from contextlib import ExitStack, contextmanager
+
+from PySide6.QtCore import QObject, QTimer
+
+from PySide6.QtGui import QColor, QScreen, QGuiApplication
+
+
+def debug(*args, **kwargs):
+    return logger.debug(*args, **kwargs)
+
+
+def _screen_area(screen: QScreen):
+    screen_size = screen.availableGeometry().size()
+    return screen_size.width() * screen_size.height()
+
+
+class BackdropManager(QObject):
+    """Owns the backdrop windows and keeps them in sync with the settings.
+
+    In all-screens mode there is one window pinned to each QScreen, added and
+    removed as screens come and go, so a hotplug only renders the affected
+    screen. All windows render from the shared image cache (one decoded
+    source) and keep their own size-specific results in the scaled cache.
+    Otherwise a single window follows whichever screen it is on.
+    """
+
+    def __init__(self, cnfg: Settings, all_screens=None, rotate_directory=None,
+                    rotate_interval=None, low_memory=None, parent=None):
+        super().__init__(parent)
+        self._cnfg = cnfg
+        self._windows = []
+        self._rotation = None
+        self._prefs_dialog = None
+        self._editing_holes = False
+        # a command line override is used for this run only, not saved
+        self.all_screens = cnfg.all_screens if all_screens is None else all_screens
+        # cache budgets are set before the first window renders anything
+        memory.configure(cnfg, low_memory)
+
+        app = QGuiApplication.instance()
+        app.screenAdded.connect(self.on_screen_added)
+        app.screenRemoved.connect(self.on_screen_removed)
+        app.aboutToQuit.connect(partial(self._for_each_window, 'save_snapshot'))
+
+        # the only theme application at startup, before any widget exists
+        apply_theme(cnfg)
+
+        if self.all_screens:
+            # biggest screen first, so smaller screens can reuse its decode
+            for screen in sorted(app.screens(), key=_screen_area, reverse=True):
+                self._add_window(screen)
+        else:
+            self._add_window(None)
+
+        # rotate_directory ('' for the configured one) enables rotation for this run
+        if rotate_directory is not None or cnfg.rotation_enabled:
+            self._create_rotation(rotate_directory, rotate_interval)
+
+        self._preset_warmer = PresetWarmer(cnfg, self.render_targets, parent=self)
+
+    def windows(self):
+        return list(self._windows)
+
+    def primary_window(self) -> MainWindow:
+        primary_screen = QGuiApplication.primaryScreen()
+        for window in self._windows:
+            if window.target_screen() == primary_screen:
+                return window
+        return self._windows[0] if self._windows else None
+
+    def window_for_screen(self, screen: QScreen):
+        for window in self._windows:
+            if window.pinned_screen() == screen:
+                return window
+        return None
+
+    def _add_window(self, screen: QScreen = None) -> MainWindow:
+        window = MainWindow(self._cnfg, screen=screen)
+        window.sig_preferences_requested.connect(self.show_preferences_dialog)
+        window.sig_close_requested.connect(self.close_all)
+        window.sig_next_image_requested.connect(self.next_image)
+        window.sig_previous_image_requested.connect(self.previous_image)
+        window.sig_preset_requested.connect(self.apply_preset)
+        window.sig_hole_editing_requested.connect(self.set_hole_editing)
+        window.sig_focus_holes_edited.connect(self.set_focus_holes)
+        window.set_hole_editing(self._editing_holes)
+        self._windows.append(window)
+        return window
+
+    def _remove_window(self, window: MainWindow):
+        self._windows.remove(window)
+        window.close()
+        window.deleteLater()
+
+    def render_targets(self):
+        return [window.render_target() for window in self._windows]
+
+    def show(self):
+        for window in self._windows:
+            window.show()
+        if self._rotation is not None:
+            self._rotation.start()
+        self._preset_warmer.schedule_warm()
+
+    def rotation(self):
+        return self._rotation
+
+    def _create_rotation(self, directory=None, interval=None):
+        from focus_backdrop.core.rotation import RotationEngine
+        self._rotation = RotationEngine(
+            self._cnfg, self.render_targets, directory=directory, interval=interval, parent=self)
+        self._rotation.sig_image_changed.connect(self.on_rotation_image_changed)
+
+    def start_rotation(self, directory='', interval=None):
+        """(Re)start rotating through a directory ('' is the configured one) for this run."""
+        if self._rotation is not None:
+            if interval is None:
+                interval = self._rotation.interval()
+            self._rotation.stop()
+            self._rotation.deleteLater()
+        self._create_rotation(directory, interval)
+        self._rotation.start()
+
+    def next_image(self):
+        if self._rotation is not None:
+            self._rotation.next_image()
+
+    def previous_image(self):
+        if self._rotation is not None:
+            self._rotation.previous_image()
+
+    def on_rotation_image_changed(self, image_path):
+        self._for_each_window(
+            'update_image', image_path, self._cnfg.scaling_option, self._cnfg.anchor_point)
+
+    def close_all(self):
+        for window in list(self._windows):
+            window.close()
+
+    def on_screen_added(self, screen: QScreen):
+        if not self.all_screens or self.window_for_screen(screen) is not None:
+            return
+        debug(f"Screen added: '{screen.name()}', creating a backdrop window for it")
+        self._add_window(screen).show()
+        self._preset_warmer.schedule_warm()
+
+    def on_screen_removed(self, screen: QScreen):
+        window = self.window_for_screen(screen)
+        if window is None:
+            return
+        debug(f"Screen removed: '{screen.name()}', closing its backdrop window")
+        if len(self._windows) == 1:
+            # never drop the last window, let it follow the remaining screen
+            window.pin_to_screen(None)
+            return
+        self._remove_window(window)
+
+    def set_all_screens(self, enabled: bool, save=True):
+        """Switch between one window per screen and a single window."""
+        if enabled == self.all_screens:
+            return
+        self.all_screens = enabled
+        if save:
+            self._cnfg.all_screens = enabled
+            self._cnfg.save_settings()
+
+        # keep the window the user is looking at, add or drop the others
+        kept_window = self.primary_window()
+        if enabled:
+            kept_window.pin_to_screen(kept_window.target_screen())
+            for screen in QGuiApplication.screens():
+                if self.window_for_screen(screen) is None:
+                    self._add_window(screen).show()
+        else:
+            for window in list(self._windows):
+                if window is not kept_window:
+                    self._remove_window(window)
+            kept_window.pin_to_screen(None)
+
+    @contextmanager
+    def render_transaction(self):
+        """Batch changes to every window, each window renders once at the end."""
+        with ExitStack() as window_transactions:
+            for window in self._windows:
+                window_transactions.enter_context(window.render_transaction())
+            yield
+
+    def handle_command(self, command: dict):
+        """Apply a command from the command line of this or a later launch."""
+        if command.get('quit'):
+            self.close_all()
+            return
+        with self.render_transaction():
+            self._apply_command(command)
+
+    def _apply_command(self, command: dict):
+        # a preset first, so colors or an image on the same command line win
+        if 'preset' in command:
+            self.apply_preset(command['preset'])
+        if 'color' in command:
+            self.set_color(command['color'])
+        if 'alpha' in command:
+            self._for_each_window('update_alpha_level', f"{int(command['alpha']):02X}")
+        if 'holes' in command:
+            self._apply_holes_command(command['holes'])
+        # command line overrides for this run only, like at startup
+        if command.get('all_screens'):
+            self.set_all_screens(True, save=False)
+        if command.get('low_memory'):
+            self.set_low_memory(True)
+        if 'rotate' in command or 'rotate_interval' in command:
+            self._apply_rotate_command(command.get('rotate'), command.get('rotate_interval'))
+        if 'image' in command:
+            self._for_each_window(
+                'update_image', command['image'], self._cnfg.scaling_option,
+                self._cnfg.anchor_point)
+        if command.get('next_image'):
+            self.next_image()
+        if command.get('previous_image'):
+            self.previous_image()
+        if command.get('memory_report'):
+            memory.log_report(self.image_buffer_bytes())
+        if command.get('preferences'):
+            # the dialog runs its own event loop, start it after this handler
+            QTimer.singleShot(0, self.show_preferences_dialog)
+
+    def _apply_rotate_command(self, directory, interval):
+        if directory is not None:
+            self.start_rotation(directory, interval)
+        elif self._rotation is not None:
+            self._rotation.set_interval(interval)
+        else:
+            logger.warn("Ignoring --rotate-interval, no rotation is running (add --rotate)")
+
+    def set_low_memory(self, enabled: bool):
+        """Switch the memory mode for this run (not saved)."""
+        memory.configure(self._cnfg, enabled)
+        if enabled:
+            self._preset_warmer.stop()
+            if self._rotation is not None:
+                self._rotation.stop_prefetch()
+
+    def apply_preset(self, name):
+        """Switch every window to a named preset, from its warmed renders if ready."""
+        preset = self._cnfg.preset(name)
+        if preset is None:
+            logger.warn(f"No preset named '{name}'")
+            return
+        debug(f"Applying preset '{name}'")
+        self._preset_warmer.promote(preset)
+        self._cnfg.apply_preset(preset)
+        with self.render_transaction():
+            self._for_each_window('reload_settings')
+
+    def _apply_holes_command(self, holes_values):
+        """Set the focus holes from [[x, y, width, height], ...], [] clears them."""
+        hole_rects = []
+        for hole_values in holes_values:
+            try:
+                hole_rects.append(hole_rect_from_list(hole_values))
+            except ValueError as hole_error:
+                logger.warn(f"Ignoring focus hole: {hole_error}")
+        self.set_focus_holes(hole_rects)
+
+    def set_focus_holes(self, hole_rects):
+        """Cut these rects (global coordinates) out of the backdrop on every screen."""
+        self._cnfg.focus_holes = format_hole_rects(hole_rects)
+        self._cnfg.save_settings()
+        self._for_each_window('set_focus_holes', hole_rects)
+
+    def set_hole_editing(self, enabled: bool):
+        self._editing_holes = enabled
+        self._for_each_window('set_hole_editing', enabled)
+
+    def on_presets_changed(self):
+        self._preset_warmer.schedule_warm()
+
+    def set_color(self, color_text):
+        """Set the backdrop color, keeping the current alpha unless one is given."""
+        color = QColor(color_text)
+        if not color.isValid():
+            logger.warn(f"Ignoring invalid color '{color_text}'")
+            return
+        if len(color_text) == 9 and color_text.startswith('#'):
+            self._for_each_window('update_bg_color', color.name(QColor.HexArgb))
+            self._for_each_window('update_alpha_level', f"{color.alpha():02X}")
+        else:
+            self._for_each_window(
+                'update_bg_color', color.name().replace('#', f'#{self._cnfg.alpha_level}'))
+
+    def image_buffer_bytes(self):
+        """Return the bytes of image data held right now, by where they are held."""
+        buffer_bytes = memory.cache_buffer_bytes()
+        if self._rotation is not None:
+            buffer_bytes['rotation_prefetch'] = self._rotation.prefetch_stats()['bytes']
+        buffer_bytes['preset_warm'] = self._preset_warmer.warm_stats()['bytes']
+        # a pixmap on screen usually also sits in the scaled cache, count
+        # each buffer once
+        counted_keys = shared_scaled_cache().pixmap_cache_keys()
+        on_screen_bytes = 0
+        for window in self._windows:
+            shown_pixmap = window.backdrop.pixmap()
+            if shown_pixmap.isNull() or shown_pixmap.cacheKey() in counted_keys:
+                continue
+            counted_keys.add(shown_pixmap.cacheKey())
+            on_screen_bytes += pixmap_bytes(shown_pixmap)
+        buffer_bytes['on_screen_uncached'] = on_screen_bytes
+        buffer_bytes['total'] = sum(buffer_bytes.values())
+        return buffer_bytes
+
+    def _for_each_window(self, method_name, *args):
+        for window in self._windows:
+            getattr(window, method_name)(*args)
+
+    def update_theme(self):
+        apply_theme(self._cnfg)
+
+    def show_preferences_dialog(self):
+        # the preferences UI (and the image browser behind it) is only
+        # imported the first time it is opened
+        from focus_backdrop.gui.dialogs import PreferencesDialog
+        if self._prefs_dialog is not None:
+            self._prefs_dialog.raise_()
+            self._prefs_dialog.activateWindow()
+            return
+        prefs_dialog = PreferencesDialog(self.primary_window(), cnfg=self._cnfg)
+
+        prefs_dialog.sig_dark_theme_toggled.connect(self.update_theme)
+        prefs_dialog.sig_all_screens_toggled.connect(self.set_all_screens)
+        prefs_dialog.sig_anchor_point_changed.connect(
+            partial(self._for_each_window, 'on_emit_anchor_point_changed'))
+        prefs_dialog.sig_scaling_opt_changed.connect(
+            partial(self._for_each_window, 'update_image_and_scaling_progressive'))
+        prefs_dialog.sig_custom_scaling_changed.connect(
+            partial(self._for_each_window, 'update_image_and_scaling_progressive'))
+        prefs_dialog.sig_custom_scaling_released.connect(
+            partial(self._for_each_window, 'refine_now'))
+        prefs_dialog.sig_tile_scale_changed.connect(
+            partial(self._for_each_window, 'update_image_and_scaling_progressive'))
+        prefs_dialog.sig_new_color_selected.connect(
+            partial(self._for_each_window, 'update_bg_color'))
+        prefs_dialog.sig_clear_image_display.connect(
+            partial(self._for_each_window, 'clear_image'))
+        prefs_dialog.sig_new_image_selected.connect(
+            partial(self._for_each_window, 'update_image'))
+        prefs_dialog.sig_alpha_value_changed.connect(
+            partial(self._for_each_window, 'update_alpha_level'))
+        prefs_dialog.sig_presets_changed.connect(self.on_presets_changed)
+
+        self._prefs_dialog = prefs_dialog
+        try:
+            prefs_dialog.exec()
+        finally:
+            self._prefs_dialog = None
@@ -0,0 +1,151 @@
+from focus_backdrop.core import tracing
+from focus_backdrop.core.render import aligned_image_rect, paint_backdrop
+
+from PySide6.QtCore import Qt, QRect
+
+from PySide6.QtGui import QPen, QColor, QPixmap, QRegion, QPainter, QPaintEvent
+
+from PySide6.QtWidgets import QWidget
+
+
+HOLE_OUTLINE_PX     = 2
+HOLE_OUTLINE_COLOR  = QColor('#0C90EE')
+
+
+class BackdropWidget(QWidget):
+    """Paints the backdrop color and the anchored image directly.
+
+    Replaces a style-sheet background plus a QLabel: the color is kept as a
+    QColor, so an alpha change is one repaint without any style sheet parsing,
+    and image or anchor changes only invalidate the area the image covers.
+
+    In tiled mode the pixmap is a single tile, repeated across the widget
+    by a texture brush whose origin is the anchored tile position.
+
+    Focus holes are left transparent. Moving or resizing a hole only
+    repaints the area that changes between the old and new holes (plus
+    their outlines while editing), never the whole widget.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._bg_color      = QColor(0, 0, 0, 0)
+        self._pixmap        = QPixmap()
+        self._alignment     = Qt.AlignCenter
+        self._tiled         = False
+        self._holes         = []
+        self._hole_outlines = False
+
+    def color(self) -> QColor:
+        return QColor(self._bg_color)
+
+    def set_color(self, color: QColor):
+        if color == self._bg_color:
+            return
+        self._bg_color = QColor(color)
+        self.update()
+
+    def set_alpha(self, alpha: int):
+        if alpha == self._bg_color.alpha():
+            return
+        self._bg_color.setAlpha(alpha)
+        self.update()
+
+    def pixmap(self) -> QPixmap:
+        return self._pixmap
+
+    def set_pixmap(self, pixmap: QPixmap):
+        with tracing.span('set_pixmap'):
+            previous_rect = self.pixmap_rect()
+            self._pixmap = QPixmap() if pixmap is None else pixmap
+            self.update_image_area(previous_rect)
+
+    def clear_pixmap(self):
+        self.set_pixmap(QPixmap())
+
+    def alignment(self):
+        return self._alignment
+
+    def set_alignment(self, alignment):
+        alignment = Qt.Alignment(alignment)
+        if alignment == self._alignment:
+            return
+        previous_rect = self.pixmap_rect()
+        self._alignment = alignment
+        self.update_image_area(previous_rect)
+
+    def is_tiled(self):
+        return self._tiled
+
+    def set_tiled(self, tiled: bool):
+        if tiled == self._tiled:
+            return
+        self._tiled = tiled
+        self.update()
+
+    def holes(self):
+        return [QRect(hole_rect) for hole_rect in self._holes]
+
+    def set_holes(self, hole_rects):
+        """Cut these rects (widget coordinates) out of the backdrop."""
+        hole_rects = [QRect(hole_rect) for hole_rect in hole_rects]
+        if hole_rects == self._holes:
+            return
+        damaged_region = self.hole_region().xored(self.hole_region(hole_rects))
+        if self._hole_outlines:
+            damaged_region = damaged_region.united(self._outline_region(self._holes))
+            damaged_region = damaged_region.united(self._outline_region(hole_rects))
+        self._holes = hole_rects
+        self.update(damaged_region)
+
+    def hole_region(self, hole_rects=None) -> QRegion:
+        hole_region = QRegion()
+        for hole_rect in self._holes if hole_rects is None else hole_rects:
+            hole_region = hole_region.united(hole_rect)
+        return hole_region
+
+    def set_hole_outlines(self, shown: bool):
+        """Outline the holes (while editing them)."""
+        if shown == self._hole_outlines:
+            return
+        self._hole_outlines = shown
+        self.update(self._outline_region(self._holes))
+
+    def _outline_region(self, hole_rects) -> QRegion:
+        outline_region = QRegion()
+        for hole_rect in hole_rects:
+            # a band of the pen width on both sides of the hole edges
+            outer_rect = hole_rect.adjusted(
+                -HOLE_OUTLINE_PX, -HOLE_OUTLINE_PX, HOLE_OUTLINE_PX, HOLE_OUTLINE_PX)
+            inner_rect = hole_rect.adjusted(
+                HOLE_OUTLINE_PX, HOLE_OUTLINE_PX, -HOLE_OUTLINE_PX, -HOLE_OUTLINE_PX)
+            outline_region = outline_region.united(QRegion(outer_rect).subtracted(inner_rect))
+        return outline_region
+
+    def update_image_area(self, previous_rect: QRect):
+        # tiles cover the whole widget, a single image only its own rect
+        if self._tiled:
+            self.update()
+        else:
+            self.update(previous_rect.united(self.pixmap_rect()))
+
+    def pixmap_rect(self) -> QRect:
+        """Return where the pixmap is drawn, in widget coordinates."""
+        if self._pixmap.isNull():
+            return QRect()
+        pixmap_size = self._pixmap.deviceIndependentSize().toSize()
+        return aligned_image_rect(
+            pixmap_size, self._alignment, self.rect(), self.layoutDirection())
+
+    def paintEvent(self, event: QPaintEvent):
+        # the same painting as the headless render command, see core/render.py
+        painter = QPainter(self)
+        paint_backdrop(
+            painter, event.rect(), self._bg_color, self._pixmap, self.pixmap_rect(), self._tiled,
+            self.hole_region() if self._holes else None)
+        if self._hole_outlines:
+            painter.setPen(QPen(HOLE_OUTLINE_COLOR, HOLE_OUTLINE_PX, Qt.DashLine))
+            painter.setBrush(Qt.NoBrush)
+            for hole_rect in self._holes:
+                painter.drawRect(hole_rect)
+        painter.end()
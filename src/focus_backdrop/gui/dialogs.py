@@ -1,14 +1,23 @@
+from focus_backdrop.core import logger
+from focus_backdrop.core import tracing
 from focus_backdrop.core.config import Settings, get_default_image_directory
+from focus_backdrop.gui.image_browser import ImageBrowserDialog
 
 from pathlib import Path
 
-from PySide6.QtCore import Qt, Signal
+from PySide6.QtCore import Qt, Signal, QSignalBlocker
 
-from PySide6.QtGui import QCloseEvent, QColor, QFont, QKeySequence, QMoveEvent, QShortcut
+from PySide6.QtGui import (QCloseEvent, QColor, QFont, QImageReader, QKeySequence, QMoveEvent,
+                            QShortcut)
 
-from PySide6.QtWidgets import ( QButtonGroup, QCheckBox, QColorDialog, QDialog, QFileDialog,
+from PySide6.QtWidgets import ( QButtonGroup, QCheckBox, QColorDialog, QComboBox, QDialog,
+                                QFileDialog,
                                 QGridLayout, QHBoxLayout, QLabel, QPushButton, QRadioButton,
-                                QSlider, QVBoxLayout, QWidget)
+                                QSlider, QSpinBox, QVBoxLayout, QWidget)
+
+
+def debug(*args, **kwargs):
+    return logger.debug(*args, **kwargs)
 
 
 default_image_dir_path = get_default_image_directory()
@@ -28,21 +37,26 @@ class FileDialog(QFileDialog):
 
 class PreferencesDialog(QDialog):
     sig_dark_theme_toggled = Signal()
+    sig_all_screens_toggled = Signal(bool)
 
     sig_new_image_selected = Signal(str, str, int)
     sig_scaling_opt_changed = Signal(str, str, int)
     sig_anchor_point_changed = Signal(str, str, int)
     sig_custom_scaling_changed = Signal(str, str, int)
+    sig_custom_scaling_released = Signal()
+    sig_tile_scale_changed = Signal(str, str, int)
 
     sig_new_color_selected = Signal(str)
     sig_alpha_value_changed = Signal(str)
     sig_clear_image_display = Signal()
+    sig_presets_changed = Signal()
 
     def __init__(self, parent=None, cnfg: Settings = None):
-        super().__init__(parent)
-        self._cnfg = cnfg
-        self.move(self._cnfg.dialog_position)
-        self.setup_ui()
+        with tracing.span('preferences_dialog_init'):
+            super().__init__(parent)
+            self._cnfg = cnfg
+            self.move(self._cnfg.dialog_position)
+            self.setup_ui()
 
     def closeEvent(self, event: QCloseEvent):
         self._cnfg.save_dialog_position(self.pos())
@@ -71,7 +85,14 @@ class PreferencesDialog(QDialog):
         dark_theme_switch.stateChanged.connect(self.toggle_dark_theme)
         dark_theme_switch.setFont(QFont('Arial', 10, weight=QFont.Bold))
 
+        # One backdrop window per screen switch
+        all_screens_switch = QCheckBox("Cover All Screens")
+        all_screens_switch.setChecked(self._cnfg.all_screens)
+        all_screens_switch.toggled.connect(self.sig_all_screens_toggled)
+        all_screens_switch.setFont(QFont('Arial', 10, weight=QFont.Bold))
+
         top_layout = QHBoxLayout()
+        top_layout.addWidget(all_screens_switch, 0, Qt.AlignLeft)
         top_layout.addWidget(dark_theme_switch, 0, Qt.AlignRight)
         main_prefs_dialog_layout.addLayout(top_layout)
 
@@ -202,6 +223,17 @@ class PreferencesDialog(QDialog):
         self.fit_width_to_screen_btn    = QRadioButton("Fit width to screen (crop any excess height)")
         self.fit_height_to_screen_btn   = QRadioButton("Fit height to screen (crop any excess width)")
 
+        tile_opts_group_label           = QLabel("Tile:")
+        self.tile_btn                   = QRadioButton("Tile (repeat from the anchor point, scale:)")
+        self.tile_scale_spinbox         = QSpinBox()
+        self.tile_scale_spinbox.setRange(10, 800)
+        self.tile_scale_spinbox.setSingleStep(10)
+        self.tile_scale_spinbox.setSuffix(" %")
+        self.tile_scale_spinbox.setValue(self._cnfg.tile_scale)
+        tile_opts_layout = QHBoxLayout()
+        tile_opts_layout.addWidget(self.tile_btn)
+        tile_opts_layout.addWidget(self.tile_scale_spinbox)
+
         # main_prefs_dialog_layout.addWidget(orig_size_group_label)
         scaling_opts_layout.addWidget(self.original_no_scaling_btn)
         scaling_opts_layout.addWidget(self.custom_scaling_btn)
@@ -212,11 +244,14 @@ class PreferencesDialog(QDialog):
         scaling_opts_layout.addWidget(self.fit_within_screen_btn)
         scaling_opts_layout.addWidget(self.fit_width_to_screen_btn)
         scaling_opts_layout.addWidget(self.fit_height_to_screen_btn)
+        # main_prefs_dialog_layout.addWidget(tile_opts_group_label)
+        scaling_opts_layout.addLayout(tile_opts_layout)
         
         scaling_opt_radio_btns = [
             orig_size_group_label, self.original_no_scaling_btn, self.custom_scaling_btn,
             fill_opts_group_label, self.fill_ignore_aspect_btn, self.fill_keep_aspect_crop_btn, 
-            fit_opts_group_label, self.fit_within_screen_btn, self.fit_width_to_screen_btn, self.fit_height_to_screen_btn
+            fit_opts_group_label, self.fit_within_screen_btn, self.fit_width_to_screen_btn, self.fit_height_to_screen_btn,
+            tile_opts_group_label, self.tile_btn, self.tile_scale_spinbox
         ]
         radio_font = QFont('Arial', 10, weight=QFont.Bold)
         for _button in scaling_opt_radio_btns:
@@ -229,6 +264,7 @@ class PreferencesDialog(QDialog):
         scaling_opts_btns_grp.addButton(self.fit_within_screen_btn)
         scaling_opts_btns_grp.addButton(self.fit_width_to_screen_btn)
         scaling_opts_btns_grp.addButton(self.fit_height_to_screen_btn)
+        scaling_opts_btns_grp.addButton(self.tile_btn)
 
         # main_prefs_dialog_layout.addWidget(scaling_opts_widget)
         middle_items_vbox_left_layout.addWidget(scaling_opts_widget)
@@ -277,6 +313,8 @@ class PreferencesDialog(QDialog):
             self.fit_width_to_screen_btn.setChecked(True)
         elif self._cnfg.scaling_option == self._cnfg.SCALE_FIT_HEIGHT:
             self.fit_height_to_screen_btn.setChecked(True)
+        elif self._cnfg.scaling_option == self._cnfg.SCALE_TILE:
+            self.tile_btn.setChecked(True)
 
         image_path_desc_label = QLabel("Image to Display")
         image_path_desc_label.setFont(QFont('Arial', 12, weight=QFont.Bold))
@@ -346,6 +384,35 @@ class PreferencesDialog(QDialog):
 
         main_prefs_dialog_layout.addLayout(alpha_slider_layout)
 
+        presets_label = QLabel("Presets (Ctrl+1 to Ctrl+9 on the backdrop)")
+        presets_label.setAlignment(Qt.AlignCenter)
+        presets_label.setContentsMargins(*label_contents_margins)
+        presets_label.setFont(label_font)
+        main_prefs_dialog_layout.addWidget(presets_label)
+
+        presets_layout = QHBoxLayout()
+
+        # type a new name, or pick an existing preset to overwrite or delete
+        self.preset_name_combo = QComboBox()
+        self.preset_name_combo.setEditable(True)
+        self.preset_name_combo.setInsertPolicy(QComboBox.NoInsert)
+        self.preset_name_combo.setFont(QFont('Arial', 12))
+        self.preset_name_combo.lineEdit().setPlaceholderText("Preset name")
+        self.refresh_preset_names()
+        presets_layout.addWidget(self.preset_name_combo, 1)
+
+        save_preset_button = QPushButton("Save Preset")
+        save_preset_button.setFont(QFont('Arial', 12, weight=QFont.Bold))
+        save_preset_button.setFixedSize(160, 50)
+        presets_layout.addWidget(save_preset_button)
+
+        delete_preset_button = QPushButton("Delete Preset")
+        delete_preset_button.setFont(QFont('Arial', 12, weight=QFont.Bold))
+        delete_preset_button.setFixedSize(160, 50)
+        presets_layout.addWidget(delete_preset_button)
+
+        main_prefs_dialog_layout.addLayout(presets_layout)
+
         self.anchor_point_btn_top_left.toggled.connect(self.on_anchor_point_changed)
         self.anchor_point_btn_top_center.toggled.connect(self.on_anchor_point_changed)
         self.anchor_point_btn_top_right.toggled.connect(self.on_anchor_point_changed)
@@ -363,8 +430,11 @@ class PreferencesDialog(QDialog):
         self.fit_within_screen_btn.toggled.connect(self.on_scaling_option_changed)
         self.fit_width_to_screen_btn.toggled.connect(self.on_scaling_option_changed)
         self.fit_height_to_screen_btn.toggled.connect(self.on_scaling_option_changed)
+        self.tile_btn.toggled.connect(self.on_scaling_option_changed)
 
         self.custom_scaling_slider.valueChanged.connect(self.on_custom_scaling_value_changed)
+        self.custom_scaling_slider.sliderReleased.connect(self.sig_custom_scaling_released)
+        self.tile_scale_spinbox.valueChanged.connect(self.on_tile_scale_value_changed)
 
         color_picker_button.clicked.connect(self.choose_color)
 
@@ -374,6 +444,9 @@ class PreferencesDialog(QDialog):
 
         alpha_slider.valueChanged.connect(self.on_alpha_value_changed)
 
+        save_preset_button.clicked.connect(self.save_preset)
+        delete_preset_button.clicked.connect(self.delete_preset)
+
     def toggle_dark_theme(self):
         if self._cnfg.dark_theme:
             self._cnfg.dark_theme = False
@@ -400,7 +473,9 @@ class PreferencesDialog(QDialog):
     def on_custom_scaling_value_changed(self, value):
         self._cnfg.custom_scaling = value
         self._cnfg.scaling_option = self._cnfg.SCALE_CUSTOM
-        self.custom_scaling_btn.setChecked(True)
+        # one change, one signal: checking the button must not announce it again
+        with QSignalBlocker(self.custom_scaling_btn):
+            self.custom_scaling_btn.setChecked(True)
         self.sig_custom_scaling_changed.emit(
             self._cnfg.pixmap_path, 
             self._cnfg.scaling_option, 
@@ -408,6 +483,40 @@ class PreferencesDialog(QDialog):
         )
         self._cnfg.save_settings()
 
+    def on_tile_scale_value_changed(self, value):
+        self._cnfg.tile_scale = value
+        self._cnfg.scaling_option = self._cnfg.SCALE_TILE
+        with QSignalBlocker(self.tile_btn):
+            self.tile_btn.setChecked(True)
+        self.sig_tile_scale_changed.emit(
+            self._cnfg.pixmap_path,
+            self._cnfg.scaling_option,
+            self._cnfg.anchor_point
+        )
+        self._cnfg.save_settings()
+
+    def refresh_preset_names(self, current_name=""):
+        self.preset_name_combo.clear()
+        self.preset_name_combo.addItems(self._cnfg.preset_names())
+        self.preset_name_combo.setEditText(current_name)
+
+    def save_preset(self):
+        # the write-behind buffer does not matter here, presets store the
+        # current attribute values
+        saved_name = self._cnfg.save_preset(self.preset_name_combo.currentText())
+        if saved_name is None:
+            return
+        self.refresh_preset_names(saved_name)
+        self.sig_presets_changed.emit()
+
+    def delete_preset(self):
+        preset_name = self.preset_name_combo.currentText().strip()
+        if preset_name not in self._cnfg.preset_names():
+            return
+        self._cnfg.delete_preset(preset_name)
+        self.refresh_preset_names()
+        self.sig_presets_changed.emit()
+
     def emit_clear_image_signal(self):
         self._cnfg.pixmap_path = ""
         self.image_path_label.setText(None)
@@ -424,10 +533,14 @@ class PreferencesDialog(QDialog):
                 browse_path = str(Path(self._cnfg.pixmap_path).parent)
             except AttributeError:
                 browse_path = str(default_image_dir_path)
-        new_image_file_path, _ = QFileDialog.getOpenFileName(
-            self, "Open Image", f"{browse_path}",
-            "Image Files (*.png *.jpg *.gif *.bmp)"
-        )
+        image_browser = ImageBrowserDialog(self, browse_path)
+        if image_browser.exec() != QDialog.Accepted:
+            return
+        new_image_file_path = image_browser.selected_path()
+        # only read the header here, the main window decodes off the GUI thread
+        if new_image_file_path and not QImageReader(new_image_file_path).canRead():
+            debug(f"Not a readable image file: '{new_image_file_path}'")
+            return
         if new_image_file_path:
             current_scaling = self._cnfg.scaling_option
             current_anchor_point = self._cnfg.anchor_point
@@ -436,7 +549,10 @@ class PreferencesDialog(QDialog):
             self._cnfg.recent_image_path = str(Path(new_image_file_path).parent)
             self._cnfg.save_settings()
 
-    def on_anchor_point_changed(self):
+    def on_anchor_point_changed(self, checked):
+        # the button that lost its check reports in too
+        if not checked:
+            return
         if self.anchor_point_btn_top_left.isChecked():
             self._cnfg.anchor_point = self._cnfg.ANCHOR_TOP_LEFT
         elif self.anchor_point_btn_top_center.isChecked():
@@ -461,36 +577,34 @@ class PreferencesDialog(QDialog):
             self._cnfg.anchor_point)
         self._cnfg.save_settings()
 
-    def on_scaling_option_changed(self):
+    def on_scaling_option_changed(self, checked):
+        # the button that lost its check reports in too
+        if not checked:
+            return
         if self.original_no_scaling_btn.isChecked():
             self._cnfg.scaling_option = self._cnfg.SCALE_NO_SCALE
-            self.custom_scaling_slider.setValue(0)
-            self.original_no_scaling_btn.setChecked(True)
         elif self.custom_scaling_btn.isChecked():
             self._cnfg.scaling_option = self._cnfg.SCALE_CUSTOM
-            self.custom_scaling_btn.setChecked(True)
         elif self.fill_ignore_aspect_btn.isChecked():
             self._cnfg.scaling_option = self._cnfg.SCALE_FILL_DISTORT
-            self.custom_scaling_slider.setValue(0)
-            self.fill_ignore_aspect_btn.setChecked(True)
         elif self.fill_keep_aspect_crop_btn.isChecked():
             self._cnfg.scaling_option = self._cnfg.SCALE_FILL_CROP
-            self.custom_scaling_slider.setValue(0)
-            self.fill_keep_aspect_crop_btn.setChecked(True)
         elif self.fit_within_screen_btn.isChecked():
             self._cnfg.scaling_option = self._cnfg.SCALE_FIT_NOCROP
-            self.custom_scaling_slider.setValue(0)
-            self.fit_within_screen_btn.setChecked(True)
         elif self.fit_width_to_screen_btn.isChecked():
             self._cnfg.scaling_option = self._cnfg.SCALE_FIT_WIDTH
-            self.custom_scaling_slider.setValue(0)
-            self.fit_width_to_screen_btn.setChecked(True)
         elif self.fit_height_to_screen_btn.isChecked():
             self._cnfg.scaling_option = self._cnfg.SCALE_FIT_HEIGHT
-            self.custom_scaling_slider.setValue(0)
-            self.fit_height_to_screen_btn.setChecked(True)
+        elif self.tile_btn.isChecked():
+            self._cnfg.scaling_option = self._cnfg.SCALE_TILE
+        if self._cnfg.scaling_option != self._cnfg.SCALE_CUSTOM:
+            # reset the slider quietly, its handler would switch back to
+            # custom scaling and render a second time
+            self._cnfg.custom_scaling = 0
+            with QSignalBlocker(self.custom_scaling_slider):
+                self.custom_scaling_slider.setValue(0)
         self.sig_scaling_opt_changed.emit(
             str(self._cnfg.pixmap_path),
             self._cnfg.scaling_option,
             self._cnfg.anchor_point)
-        self._cnfg.save_settings()
\ No newline at end of file
+        self._cnfg.save_settings()
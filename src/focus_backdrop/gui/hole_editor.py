@@ -0,0 +1,166 @@
+from focus_backdrop.core import logger
+from focus_backdrop.core.holes import MIN_HOLE_SIZE_PX
+from focus_backdrop.gui.backdrop_widget import BackdropWidget
+
+from PySide6.QtCore import Qt, QRect, QEvent, QPoint, QObject, Signal
+
+from PySide6.QtGui import QMouseEvent
+
+
+def debug(*args, **kwargs):
+    return logger.debug(*args, **kwargs)
+
+
+# how close to a hole edge the mouse must be to resize instead of move
+EDGE_GRAB_PX = 8
+
+EDGE_LEFT   = 0x1
+EDGE_TOP    = 0x2
+EDGE_RIGHT  = 0x4
+EDGE_BOTTOM = 0x8
+
+EDGE_CURSORS = {
+    EDGE_LEFT:                  Qt.SizeHorCursor,
+    EDGE_RIGHT:                 Qt.SizeHorCursor,
+    EDGE_TOP:                   Qt.SizeVerCursor,
+    EDGE_BOTTOM:                Qt.SizeVerCursor,
+    EDGE_LEFT | EDGE_TOP:       Qt.SizeFDiagCursor,
+    EDGE_RIGHT | EDGE_BOTTOM:   Qt.SizeFDiagCursor,
+    EDGE_RIGHT | EDGE_TOP:      Qt.SizeBDiagCursor,
+    EDGE_LEFT | EDGE_BOTTOM:    Qt.SizeBDiagCursor,
+}
+
+
+def grabbed_edges(hole_rect: QRect, position: QPoint):
+    """Return the EDGE_* flags of the hole edges within reach of a position."""
+    edges = 0
+    if abs(position.x() - hole_rect.left()) <= EDGE_GRAB_PX:
+        edges |= EDGE_LEFT
+    elif abs(position.x() - hole_rect.right()) <= EDGE_GRAB_PX:
+        edges |= EDGE_RIGHT
+    if abs(position.y() - hole_rect.top()) <= EDGE_GRAB_PX:
+        edges |= EDGE_TOP
+    elif abs(position.y() - hole_rect.bottom()) <= EDGE_GRAB_PX:
+        edges |= EDGE_BOTTOM
+    return edges
+
+
+class HoleEditor(QObject):
+    """Edits the focus holes of a BackdropWidget with the mouse.
+
+    Drag on the backdrop to draw a new hole, drag a hole to move it, or
+    drag its edges and corners to resize it; a double-click removes it.
+    The widget is updated on every mouse move (it only repaints what
+    changed), sig_holes_edited(widget rects) is emitted once per edit.
+    """
+
+    sig_holes_edited = Signal(list)
+
+    def __init__(self, backdrop: BackdropWidget, parent=None):
+        super().__init__(parent)
+        self._backdrop      = backdrop
+        self._drag_index    = None
+        self._drag_edges    = 0
+        self._drag_start    = QPoint()
+        self._drag_rect     = QRect()
+        self._was_tracking  = backdrop.hasMouseTracking()
+        backdrop.setMouseTracking(True)
+        backdrop.setCursor(Qt.CrossCursor)
+        backdrop.set_hole_outlines(True)
+        backdrop.installEventFilter(self)
+
+    def close(self):
+        self._backdrop.removeEventFilter(self)
+        self._backdrop.set_hole_outlines(False)
+        self._backdrop.unsetCursor()
+        self._backdrop.setMouseTracking(self._was_tracking)
+
+    def _hole_at(self, position: QPoint):
+        # the topmost (last drawn) hole wins, with some room around the edges
+        hole_rects = self._backdrop.holes()
+        for hole_index in reversed(range(len(hole_rects))):
+            grab_rect = hole_rects[hole_index].adjusted(
+                -EDGE_GRAB_PX, -EDGE_GRAB_PX, EDGE_GRAB_PX, EDGE_GRAB_PX)
+            if grab_rect.contains(position):
+                return hole_index
+        return None
+
+    def eventFilter(self, watched, event: QEvent):
+        event_type = event.type()
+        if event_type == QEvent.MouseButtonDblClick and event.button() == Qt.LeftButton:
+            self._remove_hole_at(event.position().toPoint())
+            return True
+        if event_type == QEvent.MouseButtonPress and event.button() == Qt.LeftButton:
+            self._begin_drag(event.position().toPoint())
+            return True
+        if event_type == QEvent.MouseMove:
+            self._on_mouse_move(event)
+            return True
+        if event_type == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            self._end_drag()
+            return True
+        return False
+
+    def _begin_drag(self, position: QPoint):
+        hole_rects = self._backdrop.holes()
+        self._drag_start = position
+        self._drag_index = self._hole_at(position)
+        if self._drag_index is None:
+            # draw a new hole, from the press position to the mouse
+            self._drag_index = len(hole_rects)
+            self._drag_edges = EDGE_RIGHT | EDGE_BOTTOM
+            self._drag_rect = QRect(position, position)
+            self._backdrop.set_holes(hole_rects + [self._drag_rect])
+            return
+        self._drag_rect = hole_rects[self._drag_index]
+        self._drag_edges = grabbed_edges(self._drag_rect, position)
+
+    def _on_mouse_move(self, event: QMouseEvent):
+        position = event.position().toPoint()
+        if self._drag_index is None:
+            hover_index = self._hole_at(position)
+            if hover_index is None:
+                self._backdrop.setCursor(Qt.CrossCursor)
+            else:
+                hover_edges = grabbed_edges(self._backdrop.holes()[hover_index], position)
+                self._backdrop.setCursor(EDGE_CURSORS.get(hover_edges, Qt.SizeAllCursor))
+            return
+        offset = position - self._drag_start
+        dragged_rect = QRect(self._drag_rect)
+        if not self._drag_edges:
+            dragged_rect.translate(offset)
+        else:
+            if self._drag_edges & EDGE_LEFT:
+                dragged_rect.setLeft(dragged_rect.left() + offset.x())
+            if self._drag_edges & EDGE_RIGHT:
+                dragged_rect.setRight(dragged_rect.right() + offset.x())
+            if self._drag_edges & EDGE_TOP:
+                dragged_rect.setTop(dragged_rect.top() + offset.y())
+            if self._drag_edges & EDGE_BOTTOM:
+                dragged_rect.setBottom(dragged_rect.bottom() + offset.y())
+            # dragging an edge past the opposite one flips the hole
+            dragged_rect = dragged_rect.normalized()
+        hole_rects = self._backdrop.holes()
+        hole_rects[self._drag_index] = dragged_rect
+        self._backdrop.set_holes(hole_rects)
+
+    def _end_drag(self):
+        if self._drag_index is None:
+            return
+        hole_rects = self._backdrop.holes()
+        dragged_rect = hole_rects[self._drag_index]
+        if dragged_rect.width() < MIN_HOLE_SIZE_PX or dragged_rect.height() < MIN_HOLE_SIZE_PX:
+            # a click, or a hole too small to grab again
+            del hole_rects[self._drag_index]
+            self._backdrop.set_holes(hole_rects)
+        self._drag_index = None
+        self.sig_holes_edited.emit(hole_rects)
+
+    def _remove_hole_at(self, position: QPoint):
+        hole_index = self._hole_at(position)
+        if hole_index is None:
+            return
+        hole_rects = self._backdrop.holes()
+        del hole_rects[hole_index]
+        self._backdrop.set_holes(hole_rects)
+        self.sig_holes_edited.emit(hole_rects)
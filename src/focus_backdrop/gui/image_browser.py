@@ -0,0 +1,142 @@
+from focus_backdrop.core import logger
+from focus_backdrop.core import tracing
+from focus_backdrop.core.thumbnails import (THUMBNAIL_SIZE, shared_image_index,
+                                            shared_thumbnail_loader)
+
+from pathlib import Path
+
+from PySide6.QtCore import Qt, QSize
+
+from PySide6.QtGui import QIcon, QImage, QPixmap
+
+from PySide6.QtWidgets import ( QDialog, QDialogButtonBox, QFileDialog, QHBoxLayout, QLabel,
+                                QListView, QListWidget, QListWidgetItem, QPushButton,
+                                QVBoxLayout)
+
+
+def debug(*args, **kwargs):
+    return logger.debug(*args, **kwargs)
+
+
+class ImageBrowserDialog(QDialog):
+    """Image picker showing a thumbnail grid of one directory.
+
+    The directory listing comes from the persistent image index (a stat per
+    file, headers only for new or changed files) and the thumbnails from the
+    shared freedesktop.org thumbnail cache, both filled in by worker threads,
+    so reopening the picker on a large folder shows it right away.
+    """
+
+    def __init__(self, parent=None, directory=None):
+        super().__init__(parent)
+        self._image_index = shared_image_index()
+        self._loader = shared_thumbnail_loader()
+        self._loader.sig_thumbnail_ready.connect(self.on_thumbnail_ready)
+        self._items = {}
+        self._selected_path = None
+        with tracing.span('image_browser_init'):
+            self.setup_ui()
+            self.show_directory(directory)
+
+    def setup_ui(self):
+        self.setWindowTitle("Open Image")
+        self.resize(820, 560)
+
+        browser_layout = QVBoxLayout(self)
+
+        directory_layout = QHBoxLayout()
+        self.directory_label = QLabel()
+        self.directory_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        change_directory_btn = QPushButton("Folder...")
+        change_directory_btn.clicked.connect(self.choose_directory)
+        directory_layout.addWidget(self.directory_label, 1)
+        directory_layout.addWidget(change_directory_btn)
+        browser_layout.addLayout(directory_layout)
+
+        self.image_list = QListWidget()
+        self.image_list.setViewMode(QListView.IconMode)
+        self.image_list.setResizeMode(QListView.Adjust)
+        self.image_list.setMovement(QListView.Static)
+        self.image_list.setUniformItemSizes(True)
+        self.image_list.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self.image_list.setGridSize(QSize(THUMBNAIL_SIZE + 24, THUMBNAIL_SIZE + 40))
+        self.image_list.setWordWrap(True)
+        self.image_list.itemActivated.connect(lambda _item: self.accept())
+        browser_layout.addWidget(self.image_list)
+
+        button_box = QDialogButtonBox(QDialogButtonBox.Open | QDialogButtonBox.Cancel)
+        other_file_btn = button_box.addButton("Other File...", QDialogButtonBox.ActionRole)
+        other_file_btn.clicked.connect(self.choose_other_file)
+        button_box.accepted.connect(self.accept)
+        button_box.rejected.connect(self.reject)
+        browser_layout.addWidget(button_box)
+
+    def directory(self):
+        return self._directory
+
+    def show_directory(self, directory):
+        self._directory = str(directory)
+        self.directory_label.setText(self._directory)
+        self._loader.cancel()
+        self.image_list.clear()
+        self._items.clear()
+
+        records, changed_paths = self._image_index.scan(self._directory)
+        debug(f"Image browser: {len(records)} images in '{self._directory}', "
+                f"{len(changed_paths)} new or changed")
+        for record in records:
+            list_item = QListWidgetItem(Path(record['path']).name)
+            list_item.setData(Qt.UserRole, record['path'])
+            list_item.setSizeHint(self.image_list.gridSize())
+            self._set_item_tooltip(list_item, record)
+            self.image_list.addItem(list_item)
+            self._items[record['path']] = list_item
+        self._loader.request(records, changed_paths)
+
+    def _set_item_tooltip(self, list_item: QListWidgetItem, record):
+        if record.get('width'):
+            list_item.setToolTip(
+                f"{record['path']}\n{record['width']} x {record['height']} {record['format'] or ''}")
+        else:
+            list_item.setToolTip(record['path'])
+
+    def on_thumbnail_ready(self, image_path, thumbnail: QImage):
+        list_item = self._items.get(image_path)
+        if list_item is None:
+            return
+        list_item.setIcon(QIcon(QPixmap.fromImage(thumbnail)))
+        record = self._image_index.record(image_path)
+        if record is not None:
+            self._set_item_tooltip(list_item, record)
+
+    def choose_directory(self):
+        new_directory = QFileDialog.getExistingDirectory(self, "Choose Image Folder", self._directory)
+        if new_directory:
+            self.show_directory(new_directory)
+
+    def choose_other_file(self):
+        new_image_file_path, _ = QFileDialog.getOpenFileName(
+            self, "Open Image", self._directory,
+            "Image Files (*.png *.apng *.jpg *.jpeg *.gif *.bmp *.webp)"
+        )
+        if new_image_file_path:
+            self._selected_path = new_image_file_path
+            super().accept()
+
+    def accept(self):
+        current_item = self.image_list.currentItem()
+        if current_item is None:
+            return
+        self._selected_path = current_item.data(Qt.UserRole)
+        super().accept()
+
+    def done(self, result):
+        # the shared loader drops the queued workers and ignores the ones
+        # still running, no need to wait for them here
+        self._loader.cancel()
+        self._loader.sig_thumbnail_ready.disconnect(self.on_thumbnail_ready)
+        self._image_index.save()
+        super().done(result)
+
+    def selected_path(self):
+        return self._selected_path
@@ -1,25 +1,79 @@
-import re
-
+from focus_backdrop.core import memory
 from focus_backdrop.core.config import Settings
-from focus_backdrop.core.themes import apply_theme
-from focus_backdrop.gui.dialogs import PreferencesDialog
+from focus_backdrop.core.holes import parse_hole_rects
+from focus_backdrop.core.animation import AnimationPlayer, is_animated
+from focus_backdrop.core.render import device_size, scaled_image_key
+from focus_backdrop.core.render_worker import AsyncRenderer
+from focus_backdrop.core.render_scheduler import (DIRTY_SOURCE, DIRTY_SCALE, DIRTY_ALIGN,
+                                                    DIRTY_COLOR, DIRTY_HOLES, DIRTY_IMAGE,
+                                                    RenderScheduler)
+from focus_backdrop.core.snapshot import load_snapshot, save_snapshot
+from focus_backdrop.core.image_cache import (image_file_key, pixmap_bytes, shared_image_cache,
+                                            shared_scaled_cache)
+from focus_backdrop.gui.hole_editor import HoleEditor
+from focus_backdrop.gui.backdrop_widget import BackdropWidget
 
 from pathlib import Path
 
-from PySide6.QtCore import Qt, QRect, QSize, QEvent
+from PySide6.QtCore import Qt, QRect, QEvent, QPoint, QTimer, Signal
+
+from PySide6.QtGui import (QFont, QColor, QAction, QPixmap, QRegion, QScreen, QMoveEvent,
+                            QShortcut, QResizeEvent, QKeySequence)
 
-from PySide6.QtGui import QFont, QAction, QPixmap, QMoveEvent, QShortcut, QKeySequence
+from PySide6.QtWidgets import QMenu, QMainWindow
 
-from PySide6.QtWidgets import QMenu, QLabel, QWidget, QMainWindow, QGridLayout
 
+# how long scaling input must be idle before the smooth pass replaces a preview
+PROGRESSIVE_IDLE_MSECS = 150
 
 
 class MainWindow(QMainWindow):
-    def __init__(self, cnfg: Settings, parent=None):
+    sig_preferences_requested = Signal()
+    sig_close_requested = Signal()
+    sig_next_image_requested = Signal()
+    sig_previous_image_requested = Signal()
+    sig_preset_requested = Signal(str)
+    sig_hole_editing_requested = Signal(bool)
+    # every focus hole, in global coordinates, after an edit in this window
+    sig_focus_holes_edited = Signal(list)
+
+    def __init__(self, cnfg: Settings, screen: QScreen = None, parent=None):
         super().__init__(parent)
         self._cnfg = cnfg
+        # a pinned window stays on its screen (one window per screen mode),
+        # otherwise the window follows whichever screen it is moved to
+        self._pinned_screen = None
+        if screen is not None:
+            self.pin_to_screen(screen)
+        self._image_cache = shared_image_cache()
+        self._scaled_cache = shared_scaled_cache()
+        memory.apply_cache_budgets(self._cnfg)
+        self._pending_scaled_key = None
+        self._shown_scaled_key = None
+        # whether the result on screen (or on its way) is the smooth pass
+        self._smooth_shown = False
+        # the inputs of the next render, as requested by the last caller
+        self._render_inputs = (None, None, None)
+        self._render_amount = None
+        self._render_progressive = False
+        self._render_scheduler = RenderScheduler(self.run_render, self)
+        self._refine_args = None
+        self._refine_timer = QTimer(self)
+        self._refine_timer.setSingleShot(True)
+        self._refine_timer.setInterval(PROGRESSIVE_IDLE_MSECS)
+        self._refine_timer.timeout.connect(self.refine_now)
+        self._renderer = AsyncRenderer(self)
+        self._renderer.sig_render_finished.connect(self.on_render_finished)
+        self._renderer.sig_render_failed.connect(self.on_render_failed)
+        self._renderer.sig_header_read.connect(self.on_header_read)
+        self._animation_player = AnimationPlayer(self._cnfg.animation_max_fps, self)
+        self._animation_player.sig_frame_ready.connect(self.on_animation_frame_ready)
+        # focus holes in global coordinates, applied to the backdrop as a
+        # render stage (the window may not be in place yet)
+        self._focus_holes = parse_hole_rects(self._cnfg.focus_holes)
+        self._mask_state = None
+        self._hole_editor = None
         self.setup_ui()
-        self.update_theme()
         self.setAttribute(Qt.WA_TranslucentBackground)
         self.setAttribute(Qt.WA_NoSystemBackground)
         # self.setAttribute(Qt.WA_TransparentForMouseEvents) # doesn't work?
@@ -33,43 +87,71 @@ class MainWindow(QMainWindow):
         self.setWindowFlags(
             Qt.CustomizeWindowHint | Qt.WindowTitleHint | Qt.FramelessWindowHint)
 
-        self.widget = QWidget(self)
-        self.widget.setStyleSheet(f"background-color: {self._cnfg.bg_color};")
-        layout = QGridLayout()
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.setSpacing(0)
-        self.widget.setLayout(layout)
-        self.label = QLabel(self.widget)
+        # paints the color fill and the anchored image itself (no style sheet)
+        self.backdrop = BackdropWidget(self)
+        self.backdrop.set_color(QColor(self._cnfg.bg_color))
 
-        original_pixmap = QPixmap(str(self._cnfg.pixmap_path)) or ""
         self.update_image_and_scaling(
-            original_pixmap, 
+            self._cnfg.pixmap_path, 
             scaling_option=self._cnfg.scaling_option, 
             anchor_point=self._cnfg.anchor_point
         )
-        self.update_theme()
-
-        self.label.setGeometry(0, 0, self.widget.width(), self.widget.height())
+        if self._focus_holes:
+            self._render_scheduler.invalidate(DIRTY_HOLES)
+        # not deferred, so a stored snapshot is there for the first paint
+        self._render_scheduler.run_pending()
 
         # Bind Ctrl+W to close the main window
-        ctrlWShortcut = QShortcut(QKeySequence("Ctrl+W"), self.widget)
-        ctrlWShortcut.activated.connect(self.close)
-
-        layout.addWidget(self.label, 0, 0)
-        # label.setStyleSheet("border: 1px solid red;") # debugging border
-        self.setCentralWidget(self.widget)
+        ctrlWShortcut = QShortcut(QKeySequence("Ctrl+W"), self.backdrop)
+        ctrlWShortcut.activated.connect(self.sig_close_requested)
+
+        # Bind Ctrl+Right / Ctrl+Left to step through a rotating image folder
+        next_image_shortcut = QShortcut(QKeySequence("Ctrl+Right"), self.backdrop)
+        next_image_shortcut.activated.connect(self.sig_next_image_requested)
+        previous_image_shortcut = QShortcut(QKeySequence("Ctrl+Left"), self.backdrop)
+        previous_image_shortcut.activated.connect(self.sig_previous_image_requested)
+
+        # Bind Ctrl+1 .. Ctrl+9 to the presets, in the order of preset_names()
+        for preset_number in range(1, 10):
+            preset_shortcut = QShortcut(QKeySequence(f"Ctrl+{preset_number}"), self.backdrop)
+            preset_shortcut.activated.connect(
+                lambda preset_number=preset_number: self.request_preset_number(preset_number))
+
+        # Bind Ctrl+H to editing the focus holes, Escape to leave the editing
+        edit_holes_shortcut = QShortcut(QKeySequence("Ctrl+H"), self.backdrop)
+        edit_holes_shortcut.activated.connect(
+            lambda: self.sig_hole_editing_requested.emit(not self.is_editing_holes()))
+        end_editing_shortcut = QShortcut(QKeySequence(Qt.Key_Escape), self.backdrop)
+        end_editing_shortcut.activated.connect(self.request_end_hole_editing)
+
+        self.setCentralWidget(self.backdrop)
 
         self.setContextMenuPolicy(Qt.CustomContextMenu)
         self.customContextMenuRequested.connect(self.show_context_menu)
 
+    def pinned_screen(self):
+        return self._pinned_screen
+
+    def pin_to_screen(self, screen: QScreen):
+        self._pinned_screen = screen
+        if screen is not None:
+            self.setScreen(screen)
+            self.move(screen.availableGeometry().topLeft())
+
+    def target_screen(self) -> QScreen:
+        return self._pinned_screen or self.screen()
+
     def adjust_app_window(self, available_geometry: QRect):
         # available_size = available_geometry.size()
         # self.setFixedSize(available_size.width(), available_size.height())
         # self.move(available_geometry.topLeft())
+        # the move, screen and geometry signals of one change add up to one render
         self.update_image_and_scaling(
             self._cnfg.pixmap_path, 
             scaling_option=self._cnfg.scaling_option, 
-            anchor_point=self._cnfg.anchor_point
+            anchor_point=self._cnfg.anchor_point,
+            progressive=True,
+            dirty_stages=DIRTY_SCALE
         )
 
     def update_current_screen(self, new_screen):
@@ -79,18 +161,53 @@ class MainWindow(QMainWindow):
 
     def moveEvent(self, event: QMoveEvent):
         new_screen = self.screen()
-        if new_screen != self.windowHandle().screen():
+        if self._pinned_screen is None and new_screen != self.windowHandle().screen():
             self.update_current_screen(new_screen)
+        if self._focus_holes:
+            self._render_scheduler.invalidate(DIRTY_HOLES)
         super().moveEvent(event)
 
+    def resizeEvent(self, event: QResizeEvent):
+        if self._focus_holes:
+            self._render_scheduler.invalidate(DIRTY_HOLES)
+        super().resizeEvent(event)
+
+    def changeEvent(self, event: QEvent):
+        # the ratio of a screen can change without the window changing screen
+        # (Qt >= 6.6), a result cached for the new ratio is reused as is
+        if event.type() == getattr(QEvent.Type, 'DevicePixelRatioChange', None):
+            self.adjust_app_window(self.target_screen().availableGeometry())
+        if event.type() == QEvent.WindowStateChange:
+            self.update_animation_playback()
+        super().changeEvent(event)
+
     def showEvent(self, event: QEvent):
-        current_screen = self.screen()
+        current_screen = self.target_screen()
         available_size = current_screen.availableGeometry()
         self.setFixedSize(available_size.width(), available_size.height())
         current_screen.availableGeometryChanged.connect(self.adjust_app_window)
         self.windowHandle().screenChanged.connect(self.update_current_screen)
+        # expose events tell when the window is covered or uncovered
+        self.windowHandle().installEventFilter(self)
+        self.update_animation_playback()
         # QCoreApplication.instance().installEventFilter(self)
 
+    def hideEvent(self, event: QEvent):
+        self.update_animation_playback()
+        super().hideEvent(event)
+
+    def eventFilter(self, watched, event: QEvent):
+        if watched is self.windowHandle() and event.type() == QEvent.Expose:
+            self.update_animation_playback()
+        return super().eventFilter(watched, event)
+
+    def update_animation_playback(self):
+        """Play animated images only while the window can actually be seen."""
+        window_handle = self.windowHandle()
+        on_screen = (self.isVisible() and not self.isMinimized()
+                        and window_handle is not None and window_handle.isExposed())
+        self._animation_player.set_paused(not on_screen)
+
     def show_context_menu(self, point):
         context_menu_stylesheet = """
         QMenu {
@@ -123,6 +240,26 @@ class MainWindow(QMainWindow):
 
         open_preferences_action = context_menu.addAction("      Preferences      ")
 
+        if self.is_editing_holes():
+            edit_holes_action = context_menu.addAction("      Done Editing Holes      ")
+        else:
+            edit_holes_action = context_menu.addAction("      Edit Focus Holes      ")
+        edit_holes_action.triggered.connect(
+            lambda: self.sig_hole_editing_requested.emit(not self.is_editing_holes()))
+        if self._focus_holes:
+            clear_holes_action = context_menu.addAction("      Clear Focus Holes      ")
+            clear_holes_action.triggered.connect(lambda: self.sig_focus_holes_edited.emit([]))
+
+        preset_names = self._cnfg.preset_names()
+        if preset_names:
+            presets_menu = context_menu.addMenu("      Presets      ")
+            for preset_index, preset_name in enumerate(preset_names):
+                shortcut_text = f"\tCtrl+{preset_index + 1}" if preset_index < 9 else ""
+                preset_action = presets_menu.addAction(f"{preset_name}{shortcut_text}")
+                preset_action.triggered.connect(
+                    lambda checked=False, preset_name=preset_name:
+                        self.sig_preset_requested.emit(preset_name))
+
         # context_menu.addSeparator()
 
         # clear_image_action = context_menu.addAction("Clear Image")
@@ -133,88 +270,248 @@ class MainWindow(QMainWindow):
 
         context_menu.exec(self.mapToGlobal(point))
 
-    def update_image_and_scaling(self, pixmap_path=None, scaling_option=None, anchor_point=None):
-        if not pixmap_path or QPixmap(pixmap_path).isNull():
-            self.label.clear()
-            return
+    def update_image_and_scaling(self, pixmap_path=None, scaling_option=None, anchor_point=None,
+                                    progressive=False, dirty_stages=0):
+        """Show the image scaled for the current screen.
+
+        The work is queued, not done here: calls in the same event loop turn
+        are merged into one render (the last inputs win) that only reruns
+        the stages whose inputs changed, plus any forced by dirty_stages.
 
+        With progressive=True (slider drags, option toggles, screen geometry
+        changes) a cheap FastTransformation preview is shown first, and the
+        smooth render replaces it once the input has been idle for a moment.
+        A non-progressive call anywhere in the batch makes it smooth.
+        """
         if not scaling_option:
             scaling_option = self._cnfg.SCALE_FIT_NOCROP
-
-        pixmap = QPixmap(pixmap_path)
-        scaled_pixmap = pixmap
-
-        if scaling_option:
-            self.scaling_option = scaling_option
-
+        scaling_amount = self._cnfg.scaling_amount(scaling_option)
+        render_inputs = (pixmap_path, scaling_option, anchor_point)
+
+        previous_path, previous_option, previous_anchor = self._render_inputs
+        if pixmap_path != previous_path:
+            dirty_stages |= DIRTY_SOURCE
+        if scaling_option != previous_option or scaling_amount != self._render_amount:
+            dirty_stages |= DIRTY_SCALE
+        if anchor_point != previous_anchor:
+            dirty_stages |= DIRTY_ALIGN
+        if not progressive and not self._smooth_shown:
+            # the smooth pass replacing a preview has the same inputs
+            dirty_stages |= DIRTY_SCALE
+
+        if self._render_scheduler.dirty_flags() & DIRTY_IMAGE:
+            progressive = progressive and self._render_progressive
+        self._render_inputs = render_inputs
+        self._render_amount = scaling_amount
+        self._render_progressive = progressive
+        self._render_scheduler.invalidate(dirty_stages)
+
+    def render_transaction(self):
+        """Merge every change made inside `with window.render_transaction():` into one render."""
+        return self._render_scheduler.transaction()
+
+    def run_render(self, dirty_stages):
+        if dirty_stages & DIRTY_COLOR:
+            self.backdrop.set_color(QColor(self._cnfg.bg_color))
+        if dirty_stages & DIRTY_IMAGE:
+            self.render_image(dirty_stages)
+        if dirty_stages & DIRTY_HOLES:
+            self.apply_focus_holes()
+
+    def render_image(self, dirty_stages):
+        pixmap_path, scaling_option, anchor_point = self._render_inputs
+        progressive = self._render_progressive
+
+        image_key = image_file_key(pixmap_path)
+        if image_key is None:
+            self._animation_player.stop()
+            self.cancel_refine()
+            self._renderer.cancel_pending()
+            self._pending_scaled_key = None
+            self._shown_scaled_key = None
+            self._smooth_shown = False
+            self.set_backdrop_pixmap(None)
+            return
         # available_size = QGuiApplication.primaryScreen().availableGeometry()
-        current_screen = self.screen()
+        current_screen = self.target_screen()
         available_geometry = current_screen.availableGeometry()
         available_size = available_geometry.size()
         self.setFixedSize(available_size.width(), available_size.height())
         self.move(available_geometry.topLeft())
 
-        desired_size = QSize(available_size.width(), available_size.height())
-        original_size = QSize(pixmap.width(), pixmap.height())
-
-        ###############################################################################
-        ##### Show the image at the original size, no scaling
-        if self.scaling_option == self._cnfg.SCALE_NO_SCALE:
-            scaled_pixmap = pixmap.scaled(original_size, Qt.KeepAspectRatio)
-        ###############################################################################
-        ##### Scale to the size specified by custom scale slider, keep aspect ratio 
-        if self.scaling_option == self._cnfg.SCALE_CUSTOM:
-            if self._cnfg.custom_scaling < 0:
-                # Scaling down from 100% to 1%
-                scale_factor = 1 + (self._cnfg.custom_scaling / 999)
-            else:
-                # Scaling up from 100% to 200% (2 times the original size)
-                scale_factor = 1 + (2 * self._cnfg.custom_scaling / 999)
-
-            if scale_factor < 0.02:     # stop downscaling at 2% of original size
-                scale_factor = 0.02
-            scaled_pixmap = pixmap.scaled(
-                QSize(
-                    pixmap.width() * scale_factor,
-                    pixmap.height() * scale_factor
-                ), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        ###############################################################################
-        ##### Scale to the size of the window/widget/screen, ignoring aspect ratio 
-        ##### (fill screen by modifying both dimensions separately as needed)
-        if self.scaling_option == self._cnfg.SCALE_FILL_DISTORT:
-            scaled_pixmap = pixmap.scaled(
-                desired_size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
-        ###############################################################################
-        ##### Scale smaller dimension to the size of the window/widget/screen, 
-        ##### with cropping of spillover (fill screen by cropping, keep aspect)
-        if self.scaling_option == self._cnfg.SCALE_FILL_CROP:
-            scaled_pixmap = pixmap.scaled(
-                desired_size, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
-        ###############################################################################
-        ##### Fit within the window/widget/screen dimensions
-        ##### (no cropping, allow leaving blank bars in smaller dimension)
-        if self.scaling_option == self._cnfg.SCALE_FIT_NOCROP:
-            scaled_pixmap = pixmap.scaled(
-                desired_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        ###############################################################################
-        ##### Fit the width of the image to the size of the window/widget/screen, 
-        ##### ignoring whether the height would crop or leave blank bars
-        if self.scaling_option == self._cnfg.SCALE_FIT_WIDTH:
-            scaled_pixmap = pixmap.scaledToWidth(
-                desired_size.width(), Qt.SmoothTransformation)
-        ###############################################################################
-        ##### Fit the height of the image to the size of the window/widget/screen, 
-        ##### ignoring whether the width would crop or leave blank bars
-        if self.scaling_option == self._cnfg.SCALE_FIT_HEIGHT:
-            scaled_pixmap = pixmap.scaledToHeight(
-                desired_size.height(), Qt.SmoothTransformation)
+        desired_size, device_pixel_ratio = self.render_target()
 
         if not anchor_point:
-            self.label.setAlignment(Qt.Alignment(self._cnfg.ANCHOR_MID_CENTER))
+            self.backdrop.set_alignment(Qt.Alignment(self._cnfg.ANCHOR_MID_CENTER))
         else:
-            self.label.setAlignment(Qt.Alignment(anchor_point))
-            
-        self.label.setPixmap(scaled_pixmap)
+            self.backdrop.set_alignment(Qt.Alignment(anchor_point))
+        # the image is painted once, or repeated from the anchor as a texture
+        self.backdrop.set_tiled(scaling_option == self._cnfg.SCALE_TILE)
+        scaling_amount = self._render_amount
+
+        snapshot = None
+        snapshot_key = scaled_image_key(
+            image_key, scaling_option, desired_size, scaling_amount,
+            anchor_point, device_pixel_ratio, keep_anchor=True)
+        if not progressive and self._image_cache.known_header(image_key) is None:
+            # a stored snapshot carries the image header too, so the first
+            # paint needs no worker round trip
+            snapshot = load_snapshot(snapshot_key)
+            if snapshot is not None:
+                self._image_cache.store_header(image_key, *snapshot[1])
+        if self._image_cache.known_header(image_key) is None:
+            # the scaled key and the animation check need the image size and
+            # frame count, a worker reads them and on_header_read() renders
+            self.cancel_refine()
+            self._renderer.cancel_pending()
+            self._pending_scaled_key = None
+            self._renderer.request_header(image_key)
+            return
+
+        # a recently produced result (e.g. toggling back to a previous
+        # scaling option) only costs a setPixmap
+        scaled_key = scaled_image_key(
+            image_key, scaling_option, desired_size, scaling_amount,
+            anchor_point, device_pixel_ratio)
+
+        if (not dirty_stages & (DIRTY_SOURCE | DIRTY_SCALE)
+                and scaled_key in (self._shown_scaled_key, self._pending_scaled_key)):
+            # an image that fits on screen is anchored by the backdrop
+            # widget, moving it needs no decode or scale
+            return
+
+        if is_animated(image_key):
+            # frames are decoded and scaled by the player, one at a time
+            self.cancel_refine()
+            self._renderer.cancel_pending()
+            self._pending_scaled_key = None
+            self._shown_scaled_key = None
+            self._smooth_shown = True
+            self._animation_player.play(
+                image_key, scaled_key, scaling_option, desired_size, scaling_amount,
+                device_pixel_ratio)
+            return
+        self._animation_player.stop()
+
+        if scaled_key == self._shown_scaled_key and self._smooth_shown:
+            # e.g. a geometry signal that did not change the size after all
+            self.cancel_refine()
+            self._renderer.cancel_pending()
+            self._pending_scaled_key = None
+            return
+
+        scaled_pixmap = self._scaled_cache.lookup(scaled_key)
+        if scaled_pixmap is None and not progressive:
+            # unchanged inputs since the last run, show the stored result
+            # and skip the decode entirely
+            if snapshot is None:
+                snapshot = load_snapshot(snapshot_key)
+            if snapshot is not None:
+                scaled_pixmap = snapshot[0]
+                self._scaled_cache.store(scaled_key, scaled_pixmap)
+        if scaled_pixmap is not None:
+            self.cancel_refine()
+            self._renderer.cancel_pending()
+            self._pending_scaled_key = None
+            self._shown_scaled_key = scaled_key
+            self._smooth_shown = True
+            self.set_backdrop_pixmap(scaled_pixmap)
+            return
+
+        if progressive:
+            self._refine_args = self._render_inputs
+            self._refine_timer.start()
+            transform_mode = Qt.FastTransformation
+        else:
+            self.cancel_refine()
+            transform_mode = Qt.SmoothTransformation
+        self._smooth_shown = not progressive
+
+        # decode and scale on a worker thread, the backdrop keeps showing the
+        # previous pixmap until the newest result arrives
+        self._pending_scaled_key = scaled_key
+        self._renderer.request(
+            image_key, scaled_key, scaling_option, desired_size, scaling_amount,
+            transform_mode, device_pixel_ratio, anchor_point)
+
+    def render_target(self):
+        """Return the (size in device pixels, device pixel ratio) to render for."""
+        # render straight to device pixels, the pixmap is tagged with the
+        # ratio so HiDPI screens draw it without a second resampling pass
+        current_screen = self.target_screen()
+        device_pixel_ratio = current_screen.devicePixelRatio()
+        available_size = current_screen.availableGeometry().size()
+        return device_size(available_size, device_pixel_ratio), device_pixel_ratio
+
+    def update_image_and_scaling_progressive(self, pixmap_path=None, scaling_option=None,
+                                                anchor_point=None):
+        self.update_image_and_scaling(pixmap_path, scaling_option, anchor_point, progressive=True)
+
+    def cancel_refine(self):
+        self._refine_timer.stop()
+        self._refine_args = None
+
+    def refine_now(self):
+        """Replace a pending fast preview with the smooth render right away."""
+        self._refine_timer.stop()
+        if self._refine_args is not None:
+            refine_args, self._refine_args = self._refine_args, None
+            self.update_image_and_scaling(*refine_args)
+
+    def on_render_finished(self, scaled_key, scaled_pixmap: QPixmap):
+        if scaled_key == self._pending_scaled_key:
+            self._pending_scaled_key = None
+            self._shown_scaled_key = scaled_key
+            self.set_backdrop_pixmap(scaled_pixmap)
+
+    def on_header_read(self, image_key):
+        if image_key == image_file_key(self._render_inputs[0]):
+            # the render that was waiting for the header
+            self._render_scheduler.invalidate(DIRTY_SOURCE)
+
+    def set_backdrop_pixmap(self, pixmap: QPixmap):
+        """Swap the image on screen, trimming the heap after a large swap in low-memory mode."""
+        swapped_bytes = max(pixmap_bytes(self.backdrop.pixmap()), pixmap_bytes(pixmap))
+        self.backdrop.set_pixmap(pixmap)
+        if memory.LOW_MEMORY and swapped_bytes >= memory.TRIM_MIN_BYTES:
+            memory.schedule_trim()
+
+    def on_animation_frame_ready(self, frame_pixmap: QPixmap):
+        self.backdrop.set_pixmap(frame_pixmap)
+
+    def on_render_failed(self, scaled_key):
+        if scaled_key == self._pending_scaled_key:
+            self._pending_scaled_key = None
+            self._shown_scaled_key = None
+            self._smooth_shown = False
+            self.set_backdrop_pixmap(None)
+
+    def save_snapshot(self):
+        """Store the smooth result on screen, for an instant first paint next run."""
+        # only the scaled image layer is stored, color and alpha are painted
+        # on top of it at no cost and must not invalidate the snapshot
+        if self._shown_scaled_key is None:
+            return
+        image_key = self._shown_scaled_key[0]
+        source_header = self._image_cache.known_header(image_key)
+        pixmap_path, scaling_option, anchor_point = self._render_inputs
+        desired_size, device_pixel_ratio = self.render_target()
+        if source_header is None or self._shown_scaled_key != scaled_image_key(
+                image_key, scaling_option, desired_size, self._render_amount,
+                anchor_point, device_pixel_ratio):
+            # only a result for the current inputs is looked up next run
+            return
+        scaled_pixmap = self._scaled_cache.lookup(self._shown_scaled_key)
+        if (scaled_pixmap is None and memory.LOW_MEMORY
+                and self._pending_scaled_key is None and self._refine_args is None):
+            # nothing is cached in low-memory mode, but with no render or
+            # refine pending the pixmap on screen is the smooth result
+            scaled_pixmap = self.backdrop.pixmap()
+        if scaled_pixmap is not None and not scaled_pixmap.isNull():
+            snapshot_key = scaled_image_key(
+                image_key, scaling_option, desired_size, self._render_amount,
+                anchor_point, device_pixel_ratio, keep_anchor=True)
+            save_snapshot(snapshot_key, scaled_pixmap.toImage(), source_header)
 
     def on_emit_anchor_point_changed(self, pixmap_path, scaling_option, anchor_point):
         self.update_image_and_scaling(pixmap_path, scaling_option, anchor_point)
@@ -226,35 +523,101 @@ class MainWindow(QMainWindow):
 
     def update_image(self, image_path, scaling_option, anchor_point):
         self._cnfg.pixmap_path = str(Path(image_path))
-        pixmap = QPixmap(str(self._cnfg.pixmap_path)) or ""
-        self.update_image_and_scaling(pixmap, scaling_option, anchor_point)
+        # picked again on purpose, the file may have changed since
+        self.update_image_and_scaling(
+            self._cnfg.pixmap_path, scaling_option, anchor_point, dirty_stages=DIRTY_SOURCE)
         self._cnfg.save_settings()
 
     def update_bg_color(self, color: str):
         self._cnfg.bg_color = color
-        self.widget.setStyleSheet(f"background-color: {self._cnfg.bg_color};")
+        self._render_scheduler.invalidate(DIRTY_COLOR)
         self._cnfg.save_settings()
         
     def update_alpha_level(self, new_alpha_level: str):
+        alpha = int(new_alpha_level, 16)
         self._cnfg.alpha_level = new_alpha_level
-        self._cnfg.bg_color = re.sub(r'#[0-9A-F][0-9A-F]', '#' + new_alpha_level, self._cnfg.bg_color, re.I)
-        self.widget.setStyleSheet(f"background-color: {self._cnfg.bg_color};")
+        bg_color = QColor(self._cnfg.bg_color)
+        bg_color.setAlpha(alpha)
+        self._cnfg.bg_color = bg_color.name(QColor.HexArgb)
+        # only the alpha of the widget color changes, no color parsing or
+        # render run, and update() repaints once per event loop turn however
+        # fast the slider moves
+        self.backdrop.set_alpha(alpha)
         self._cnfg.save_settings()
 
-    def update_theme(self):
-        # from focus_backdrop.core.themes import apply_theme
-        apply_theme(self._cnfg)
+    ###############################################################################
+    ##### Focus holes
+
+    def set_focus_holes(self, hole_rects):
+        """Cut these rects (global coordinates) out of the backdrop."""
+        self._focus_holes = [QRect(hole_rect) for hole_rect in hole_rects]
+        self._render_scheduler.invalidate(DIRTY_HOLES)
+
+    def apply_focus_holes(self):
+        # only the holes over this window, in its own coordinates
+        window_origin = self.backdrop.mapToGlobal(QPoint(0, 0))
+        window_rect = QRect(window_origin, self.backdrop.size())
+        local_holes = [
+            hole_rect.translated(-window_origin)
+            for hole_rect in self._focus_holes if hole_rect.intersects(window_rect)
+        ]
+        self.backdrop.set_holes(local_holes)
+        self.update_input_mask()
+
+    def update_input_mask(self):
+        """Let clicks in the holes through to the windows below."""
+        # while editing the holes take the clicks themselves
+        local_holes = [] if self.is_editing_holes() else self.backdrop.holes()
+        mask_state = (local_holes, self.size())
+        if mask_state == self._mask_state:
+            return
+        self._mask_state = mask_state
+        if not local_holes:
+            self.clearMask()
+            return
+        self.setMask(QRegion(self.rect()).subtracted(self.backdrop.hole_region(local_holes)))
+
+    def is_editing_holes(self):
+        return self._hole_editor is not None
+
+    def set_hole_editing(self, enabled: bool):
+        if enabled == self.is_editing_holes():
+            return
+        if enabled:
+            self._hole_editor = HoleEditor(self.backdrop, self)
+            self._hole_editor.sig_holes_edited.connect(self.on_holes_edited)
+        else:
+            self._hole_editor.close()
+            self._hole_editor.deleteLater()
+            self._hole_editor = None
+        self.update_input_mask()
+
+    def request_end_hole_editing(self):
+        if self.is_editing_holes():
+            self.sig_hole_editing_requested.emit(False)
+
+    def on_holes_edited(self, local_holes):
+        window_origin = self.backdrop.mapToGlobal(QPoint(0, 0))
+        window_rect = QRect(window_origin, self.backdrop.size())
+        # the holes over other screens stay, the ones over this window are
+        # replaced by what the editor has now
+        focus_holes = [
+            hole_rect for hole_rect in self._focus_holes if not hole_rect.intersects(window_rect)]
+        focus_holes += [hole_rect.translated(window_origin) for hole_rect in local_holes]
+        self.sig_focus_holes_edited.emit(focus_holes)
+
+    def request_preset_number(self, preset_number):
+        preset_names = self._cnfg.preset_names()
+        if preset_number <= len(preset_names):
+            self.sig_preset_requested.emit(preset_names[preset_number - 1])
+
+    def reload_settings(self):
+        """Show what the settings hold now, e.g. after a preset was applied."""
+        self._render_scheduler.invalidate(DIRTY_COLOR)
+        self.update_image_and_scaling(
+            self._cnfg.pixmap_path, self._cnfg.scaling_option, self._cnfg.anchor_point)
 
     def show_preferences_dialog(self):
-        prefs_dialog = PreferencesDialog(self, cnfg=self._cnfg)
-        
-        prefs_dialog.sig_dark_theme_toggled.connect(self.update_theme)
-        prefs_dialog.sig_anchor_point_changed.connect(self.on_emit_anchor_point_changed)
-        prefs_dialog.sig_scaling_opt_changed.connect(self.update_image_and_scaling)
-        prefs_dialog.sig_custom_scaling_changed.connect(self.update_image_and_scaling)
-        prefs_dialog.sig_new_color_selected.connect(self.update_bg_color)
-        prefs_dialog.sig_clear_image_display.connect(self.clear_image)
-        prefs_dialog.sig_new_image_selected.connect(self.update_image)
-        prefs_dialog.sig_alpha_value_changed.connect(self.update_alpha_level)
-        
-        prefs_dialog.exec()
+        # the dialog is owned by the BackdropManager, which applies its
+        # changes to the backdrop windows on every screen
+        self.sig_preferences_requested.emit()
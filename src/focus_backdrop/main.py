@@ -6,21 +6,25 @@ import signal
 import argparse
 import platform
 
+# first, so the startup profile clock starts as early as possible
+from focus_backdrop.core import startup_profile
 from focus_backdrop._version import __version__
 from focus_backdrop.core import logger
-from focus_backdrop.core.config import Settings
-from focus_backdrop.gui.main_window import MainWindow
+from focus_backdrop.core import tracing
+from focus_backdrop.core.holes import parse_hole_rect, hole_rect_to_list
+from focus_backdrop.core.single_instance import (InstanceServer, instance_is_running,
+                                                    forward_to_running_instance)
 
 from pathlib import Path
 
-from PySide6.QtCore import qInstallMessageHandler
+from PySide6.QtCore import QEvent, QObject, QTimer, qInstallMessageHandler
 
-from PySide6.QtGui import QIcon
+# QtGui, QtWidgets and the GUI modules are imported in main(), only once it
+# is clear that no running instance will take the command instead
 
-from PySide6.QtWidgets import QApplication
 
+startup_profile.mark('imports')
 
-logger.VERBOSE = True
 
 def debug(*args, **kwargs):
     return logger.debug(*args, **kwargs)
@@ -33,6 +37,7 @@ def signal_handler(sig, frame):
     if sig in (signal.SIGINT, signal.SIGQUIT):
         # Perform any cleanup code here before exiting
         # traceback.print_stack(frame)
+        # (pending settings are flushed by the atexit hook in Settings)
         print(f'\nSIGINT or SIGQUIT received. Exiting.\n')
         sys.exit(0)
 
@@ -67,31 +72,249 @@ else:
 icon_file_path_str      = str(app_icon_file_path)
 
 
-def main(args: argparse.Namespace):
+def hole_argument(hole_text):
+    try:
+        return parse_hole_rect(hole_text)
+    except ValueError as hole_error:
+        raise argparse.ArgumentTypeError(str(hole_error))
+
+
+def interval_argument(interval_text):
+    try:
+        interval = int(interval_text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{interval_text}' is not a whole number of seconds")
+    if interval < 1:
+        raise argparse.ArgumentTypeError("the interval must be at least 1 second")
+    return interval
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Focus Backdrop")
+    parser.add_argument("--preferences", action="store_true", help="Open the preferences dialog")
+    parser.add_argument("--image", metavar="PATH", default=None, help="Show this image file")
+    parser.add_argument("--color", metavar="COLOR", default=None,
+                        help="Backdrop color, as #RRGGBB, #AARRGGBB or a color name")
+    parser.add_argument("--alpha", metavar="0-255", type=int, choices=range(256), default=None,
+                        help="Backdrop color opacity")
+    parser.add_argument("--preset", metavar="NAME", default=None,
+                        help="Switch to a preset saved in the preferences (bind this to "
+                                "a desktop hotkey for instant switching)")
+    parser.add_argument("--hole", metavar="X,Y,W,H", type=hole_argument, action="append",
+                        help="Cut a focus hole out of the backdrop, in screen coordinates; "
+                                "repeat for more holes (replaces the current holes, Ctrl+H "
+                                "edits them with the mouse)")
+    parser.add_argument("--clear-holes", dest="clear_holes", action="store_true",
+                        help="Remove all focus holes")
+    parser.add_argument("--next-image", dest="next_image", action="store_true",
+                        help="Step to the next image of the rotation")
+    parser.add_argument("--previous-image", dest="previous_image", action="store_true",
+                        help="Step to the previous image of the rotation")
+    parser.add_argument("--quit", action="store_true", help="Close the running instance")
+    parser.add_argument("--new-instance", dest="new_instance", action="store_true",
+                        help="Start a separate instance instead of handing the command "
+                                "to the running one")
+    parser.add_argument("--all-screens", dest="all_screens", action="store_true", default=None,
+                        help="Cover every screen with a backdrop window (this run only)")
+    parser.add_argument("--rotate", metavar="DIR", nargs="?", const="", default=None,
+                        help="Cycle through the images in DIR (default: the configured "
+                                "rotation folder, or the folders of the rotation schedule); "
+                                "Ctrl+Right/Ctrl+Left step manually")
+    parser.add_argument("--rotate-interval", metavar="SECONDS", type=interval_argument, default=None,
+                        help="Seconds between images when rotating")
+    parser.add_argument("--low-memory", dest="low_memory", action="store_true", default=None,
+                        help="Keep only the on-screen image buffer, decode again on every "
+                                "change (this run only)")
+    parser.add_argument("--memory-report", dest="memory_report", action="store_true",
+                        help="Log the bytes held in image buffers and caches")
+    parser.add_argument("--log-level", dest="log_level", choices=sorted(logger.LOG_LEVELS),
+                        default=None,
+                        help=f"Logging level (default: {logger.DEFAULT_LOG_LEVEL}, or "
+                                f"{logger.LOG_LEVEL_ENV_VAR})")
+    parser.add_argument("--log-file", dest="log_file", metavar="PATH", default=None,
+                        help=f"Also log to a rotating file (or {logger.LOG_FILE_ENV_VAR}=PATH)")
+    parser.add_argument("--trace", metavar="PATH", default=None,
+                        help="Record timing spans and counters, write them to PATH at exit "
+                                "(.json: Chrome trace format, otherwise JSON lines) and print "
+                                f"a summary; also enabled by {tracing.TRACE_ENV_VAR}=PATH")
+    parser.add_argument("--profile-startup", dest="profile_startup", action="store_true",
+                        help="Print how long each startup phase takes, up to the first paint")
+
+    # values are checked by the render command itself, its modules load QtGui
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND")
+    render_parser = subparsers.add_parser(
+        "render", help="Write the composed backdrop to PNG files, without a window",
+        description="Render the backdrop (color, alpha, image, scaling, anchor) for each "
+                    "size of each preset or image, spread over the CPU cores. Runs "
+                    "without a display (Qt's offscreen platform).")
+    render_parser.add_argument("--size", metavar="WxH[@RATIO]", action="append", required=True,
+                                help="PNG size in pixels, with an optional device pixel "
+                                        "ratio; repeat for more sizes")
+    render_parser.add_argument("--preset", metavar="NAME", action="append",
+                                help="Render a saved preset; repeat for more presets")
+    render_parser.add_argument("--image", metavar="PATH", action="append",
+                                help="Render an image with the current settings; repeat "
+                                        "for more images")
+    render_parser.add_argument("--color", metavar="COLOR", default=None,
+                                help="Override the color, as #RRGGBB, #AARRGGBB or a name")
+    render_parser.add_argument("--alpha", metavar="0-255", type=int, choices=range(256),
+                                default=None, help="Override the color opacity")
+    render_parser.add_argument("--scaling", metavar="OPTION", default=None,
+                                help="Override the scaling option (fit_nocrop, fill_crop, "
+                                        "tile, ...)")
+    render_parser.add_argument("--anchor", metavar="POSITION", default=None,
+                                help="Override the anchor point (top-left, middle-center, "
+                                        "bottom-right, ...)")
+    render_parser.add_argument("-o", "--output", metavar="DIR", default=".",
+                                help="Directory to write the PNG files to (default: .)")
+    render_parser.add_argument("-j", "--jobs", metavar="N", type=int, default=None,
+                                help="Worker processes (default: one per CPU core)")
+    return parser
+
+
+class FirstPaintWatcher(QObject):
+    """Ends the startup profile once the backdrop has painted for the first time."""
+
+    def eventFilter(self, watched, event: QEvent):
+        if event.type() == QEvent.Paint:
+            watched.removeEventFilter(self)
+            startup_profile.mark('first paint event')
+            # runs after the paint itself has been handled
+            QTimer.singleShot(0, self.finish)
+        return False
+
+    def finish(self):
+        startup_profile.mark('first paint done')
+        startup_profile.report()
+
+
+def forwarded_command(args: argparse.Namespace):
+    """The part of the command line that a running instance can act on."""
+    command = {}
+    if args.preset:
+        command['preset'] = args.preset
+    if args.preferences:
+        command['preferences'] = True
+    if args.image:
+        # the running instance has its own working directory
+        command['image'] = str(Path(args.image).resolve())
+    if args.color:
+        command['color'] = args.color
+    if args.alpha is not None:
+        command['alpha'] = args.alpha
+    if args.hole:
+        command['holes'] = [hole_rect_to_list(hole_rect) for hole_rect in args.hole]
+    elif args.clear_holes:
+        command['holes'] = []
+    if args.next_image:
+        command['next_image'] = True
+    if args.previous_image:
+        command['previous_image'] = True
+    if args.memory_report:
+        command['memory_report'] = True
+    if args.all_screens:
+        command['all_screens'] = True
+    if args.low_memory:
+        command['low_memory'] = True
+    if args.rotate is not None:
+        # '' is the configured rotation folder
+        command['rotate'] = str(Path(args.rotate).resolve()) if args.rotate else ''
+    if args.rotate_interval is not None:
+        command['rotate_interval'] = args.rotate_interval
+    if args.quit:
+        command['quit'] = True
+    return command
+
+
+def startup_only_options(args: argparse.Namespace):
+    """The options given that only act when this launch starts the overlay itself."""
+    option_names = []
+    if args.trace:
+        option_names.append('--trace')
+    if args.profile_startup:
+        option_names.append('--profile-startup')
+    return option_names
+
+
+def main(args: argparse.Namespace = None):
+    if args is None:
+        args = build_arg_parser().parse_args()
+
+    logger.configure(args.log_level, args.log_file)
+    if args.command == "render":
+        # no window and no single instance, just files
+        from focus_backdrop.core.batch_render import render_from_args
+        sys.exit(render_from_args(args))
+
+    command = forwarded_command(args)
+    if not args.new_instance:
+        # a second launch (e.g. from a hotkey) hands its command to the
+        # running overlay and exits without starting Qt's GUI, unless there
+        # is nothing the running overlay could do with it
+        if not command or startup_only_options(args):
+            if instance_is_running():
+                ignored_options = ', '.join(startup_only_options(args))
+                logger.error("Focus Backdrop is already running, use --new-instance"
+                                + (f" for {ignored_options}" if ignored_options else ""))
+                sys.exit(1)
+        elif forward_to_running_instance(command):
+            debug("Command handed to the running instance")
+            return
+        if args.quit:
+            return
+
+    from focus_backdrop.core.config import Settings
+    from focus_backdrop.gui.backdrop_manager import BackdropManager
+
+    from PySide6.QtGui import QIcon
+
+    from PySide6.QtWidgets import QApplication
+
+    tracing.configure(args.trace)
     cnfg = Settings()
+    startup_profile.mark('settings')
     app = QApplication(sys.argv)
+    startup_profile.mark('QApplication')
 
     app.setApplicationVersion('2023.0314')
     app.setApplicationName('Focus Backdrop')
     app.setDesktopFileName('Focus_Backdrop')
     app_icon = QIcon(icon_file_path_str)
     app.setWindowIcon(app_icon)
+    # write out any settings still waiting in the write-behind buffer
+    app.aboutToQuit.connect(cnfg.flush)
 
-    main_window = MainWindow(cnfg)
+    # one backdrop window, or one per screen with --all-screens
+    backdrop_manager = BackdropManager(
+        cnfg, all_screens=args.all_screens,
+        rotate_directory=args.rotate, rotate_interval=args.rotate_interval,
+        low_memory=args.low_memory)
+    startup_profile.mark('theme and backdrop windows')
     
-    # main_window.update_theme()
     # main_window.setAttribute(Qt.WA_TranslucentBackground)
     # main_window.setAttribute(Qt.WA_NoSystemBackground)
 
-    main_window.show()
+    if args.profile_startup:
+        first_paint_watcher = FirstPaintWatcher(app)
+        backdrop_manager.primary_window().backdrop.installEventFilter(first_paint_watcher)
 
-    if args.preferences:
-        main_window.show_preferences_dialog()
+    if not args.new_instance:
+        instance_server = InstanceServer(app)
+        instance_server.sig_command_received.connect(backdrop_manager.handle_command)
+        if not instance_server.listen() and instance_is_running():
+            # another launch got there first, hand the command over after all
+            if command and forward_to_running_instance(command):
+                debug("Command handed to the running instance")
+                return
+            logger.error("Focus Backdrop is already running, use --new-instance")
+            sys.exit(1)
+
+    backdrop_manager.show()
+    startup_profile.mark('show')
+
+    backdrop_manager.handle_command(command)
     sys.exit(app.exec())
 
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Focus Backdrop")
-    parser.add_argument("--preferences", action="store_true", help="Open the preferences dialog")
-    args = parser.parse_args()
-    main(args)
+    main()
@@ -0,0 +1,112 @@
+"""Parameter sets and helpers shared by the benchmark and golden modules."""
+
+import hashlib
+
+from focus_backdrop.core.config import (SCALE_NO_SCALE, SCALE_CUSTOM, SCALE_FILL_DISTORT,
+                                        SCALE_FILL_CROP, SCALE_FIT_NOCROP, SCALE_FIT_WIDTH,
+                                        SCALE_FIT_HEIGHT, SCALE_TILE)
+from focus_backdrop.core.render import device_size
+from focus_backdrop.core.image_cache import image_file_key
+from focus_backdrop.core.render_worker import render_scaled_image
+from focus_backdrop.gui.backdrop_widget import BackdropWidget
+
+from PySide6.QtCore import Qt, QSize
+
+from PySide6.QtGui import QColor, QImage, QPixmap
+
+
+SCALING_OPTIONS = [
+    SCALE_NO_SCALE,
+    SCALE_CUSTOM,
+    SCALE_FILL_DISTORT,
+    SCALE_FILL_CROP,
+    SCALE_FIT_NOCROP,
+    SCALE_FIT_WIDTH,
+    SCALE_FIT_HEIGHT,
+    SCALE_TILE,
+]
+
+# custom slider value used for SCALE_CUSTOM (about 75%)
+CUSTOM_SCALING = -250
+# tile scale (percent) used for SCALE_TILE
+TILE_SCALE = 30
+# custom slider value for the largest upscale (300%)
+CUSTOM_SCALING_MAX = 999
+
+ANCHORS = {
+    'top-left':         Qt.AlignTop     | Qt.AlignLeft,
+    'top-center':       Qt.AlignTop     | Qt.AlignHCenter,
+    'top-right':        Qt.AlignTop     | Qt.AlignRight,
+    'mid-left':         Qt.AlignVCenter | Qt.AlignLeft,
+    'mid-center':       Qt.AlignVCenter | Qt.AlignHCenter,
+    'mid-right':        Qt.AlignVCenter | Qt.AlignRight,
+    'bot-left':         Qt.AlignBottom  | Qt.AlignLeft,
+    'bot-center':       Qt.AlignBottom  | Qt.AlignHCenter,
+    'bot-right':        Qt.AlignBottom  | Qt.AlignRight,
+}
+
+IMAGE_SIZES = {
+    '640x480':      (640, 480),
+    '1920x1080':    (1920, 1080),
+    '3840x2160':    (3840, 2160),
+}
+
+# only with FOCUS_BACKDROP_BENCH_LARGE=1, these need several GB of RAM
+LARGE_IMAGE_SIZES = {
+    '7680x4320':    (7680, 4320),
+    '15360x8640':   (15360, 8640),
+}
+
+# (logical width, logical height, device pixel ratio)
+SCREEN_SIZES = {
+    '1366x768@1':   (1366, 768, 1.0),
+    '1920x1080@1':  (1920, 1080, 1.0),
+    '1280x720@2':   (1280, 720, 2.0),
+}
+
+BACKDROP_COLOR = QColor(32, 64, 96, 128)
+
+
+def render_for_screen(image_path, scaling_option, screen_size, anchor=None, custom_scaling=None):
+    """Decode and scale an image the way a backdrop window on this screen would."""
+    width, height, device_pixel_ratio = screen_size
+    desired_size = device_size(QSize(width, height), device_pixel_ratio)
+    if custom_scaling is None:
+        custom_scaling = {SCALE_CUSTOM: CUSTOM_SCALING, SCALE_TILE: TILE_SCALE}.get(scaling_option, 0)
+    return render_scaled_image(
+        image_file_key(image_path), scaling_option, desired_size, custom_scaling,
+        Qt.SmoothTransformation, device_pixel_ratio,
+        anchor_point=None if anchor is None else int(anchor))
+
+
+def compose_backdrop(scaled_image: QImage, anchor, screen_size, widget=None,
+                        scaling_option=None) -> QImage:
+    """Paint the backdrop (color plus anchored image) into an image of screen size."""
+    width, height, device_pixel_ratio = screen_size
+    if widget is None:
+        widget = BackdropWidget()
+    widget.resize(width, height)
+    widget.set_color(BACKDROP_COLOR)
+    widget.set_alignment(anchor)
+    widget.set_tiled(scaling_option == SCALE_TILE)
+    widget.set_pixmap(QPixmap.fromImage(scaled_image))
+    composed_image = QImage(
+        round(width * device_pixel_ratio), round(height * device_pixel_ratio),
+        QImage.Format_ARGB32_Premultiplied)
+    composed_image.setDevicePixelRatio(device_pixel_ratio)
+    composed_image.fill(0)
+    widget.render(composed_image)
+    return composed_image
+
+
+def image_hash(image: QImage):
+    """Hash only the visible pixels, not the padding at the end of each line."""
+    image = image.convertToFormat(QImage.Format_ARGB32)
+    row_bytes = image.width() * 4
+    pixel_data = memoryview(image.constBits())
+    image_digest = hashlib.sha256()
+    image_digest.update(f"{image.width()}x{image.height()}".encode('ascii'))
+    for row in range(image.height()):
+        row_start = row * image.bytesPerLine()
+        image_digest.update(pixel_data[row_start:row_start + row_bytes])
+    return image_digest.hexdigest()
@@ -0,0 +1,198 @@
+"""Fixtures for the render benchmarks and golden pixel checks.
+
+Environment variables:
+
+    FOCUS_BACKDROP_BENCH_LARGE=1        include the 8K and 16K source images
+    FOCUS_BACKDROP_BENCH_RESULTS=PATH   where to write the JSON results
+                                        (default: .benchmarks/latest.json)
+    FOCUS_BACKDROP_BENCH_BASELINE=PATH  results file to compare against, a
+                                        case fails when it regresses by more
+                                        than the threshold
+    FOCUS_BACKDROP_BENCH_THRESHOLD=0.25 allowed relative regression
+    FOCUS_BACKDROP_UPDATE_GOLDEN=1      rewrite golden.json from this run
+"""
+
+import os
+
+# must be set before the QApplication is created
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import json
+import platform
+
+from pathlib import Path
+
+import pytest
+
+from PySide6 import __version__ as pyside_version
+from PySide6.QtCore import qVersion, QPointF
+from PySide6.QtGui import QBrush, QColor, QImage, QPainter, QLinearGradient, QRadialGradient
+from PySide6.QtWidgets import QApplication
+
+
+BENCH_DIR_PATH          = Path(__file__).resolve().parent
+GOLDEN_FILE_PATH        = BENCH_DIR_PATH / 'golden.json'
+DEFAULT_RESULTS_PATH    = BENCH_DIR_PATH.parents[1] / '.benchmarks' / 'latest.json'
+
+DEFAULT_THRESHOLD       = 0.25
+# differences below these are noise, whatever the relative change
+WALL_NOISE_FLOOR_S      = 0.005
+RSS_NOISE_FLOOR_BYTES   = 16 * 1024 * 1024
+
+
+def large_images_enabled():
+    return os.environ.get('FOCUS_BACKDROP_BENCH_LARGE') == '1'
+
+
+def draw_synthetic_image(width, height) -> QImage:
+    """A deterministic test card: gradients, hard edges and fine detail.
+
+    Hard edges and a one-pixel checker make any change in the resampling
+    filter or the decode path show up in the golden hashes.
+    """
+    image = QImage(width, height, QImage.Format_RGB32)
+    painter = QPainter(image)
+    background = QLinearGradient(QPointF(0, 0), QPointF(width, height))
+    background.setColorAt(0.0, QColor(220, 40, 40))
+    background.setColorAt(0.5, QColor(40, 200, 60))
+    background.setColorAt(1.0, QColor(30, 60, 230))
+    painter.fillRect(image.rect(), background)
+    spot = QRadialGradient(QPointF(width * 0.3, height * 0.4), min(width, height) * 0.3)
+    spot.setColorAt(0.0, QColor(255, 255, 255, 200))
+    spot.setColorAt(1.0, QColor(255, 255, 255, 0))
+    painter.fillRect(image.rect(), spot)
+    stripe_width = max(1, width // 64)
+    for stripe_index in range(0, 64, 2):
+        painter.fillRect(stripe_index * stripe_width, 0, stripe_width, height // 8, QColor(0, 0, 0))
+    checker_tile = QImage(2, 2, QImage.Format_RGB32)
+    checker_tile.fill(QColor(0, 0, 0))
+    checker_tile.setPixelColor(0, 0, QColor(255, 255, 0))
+    checker_tile.setPixelColor(1, 1, QColor(255, 255, 0))
+    checker_size = min(width, height) // 8
+    painter.fillRect(
+        width - checker_size, height - checker_size, checker_size, checker_size,
+        QBrush(checker_tile))
+    painter.end()
+    return image
+
+
+@pytest.fixture(scope='session')
+def qt_app():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture(scope='session')
+def synthetic_image_dir(tmp_path_factory):
+    return tmp_path_factory.mktemp('synthetic_images')
+
+
+@pytest.fixture(scope='session')
+def synthetic_image(qt_app, synthetic_image_dir):
+    """Return a factory writing (once per session) a synthetic image file."""
+    def make_image(width, height, image_format='jpg'):
+        image_path = synthetic_image_dir / f"card_{width}x{height}.{image_format}"
+        if not image_path.exists():
+            quality = 90 if image_format == 'jpg' else -1
+            assert draw_synthetic_image(width, height).save(str(image_path), None, quality)
+        return str(image_path)
+    return make_image
+
+
+class BenchmarkResults:
+    """Collects the measurements of a session and checks them against a baseline."""
+
+    def __init__(self):
+        self.cases = {}
+        baseline_path = os.environ.get('FOCUS_BACKDROP_BENCH_BASELINE')
+        self.baseline = {}
+        if baseline_path:
+            self.baseline = json.loads(Path(baseline_path).read_text()).get('cases', {})
+        self.threshold = float(os.environ.get('FOCUS_BACKDROP_BENCH_THRESHOLD', DEFAULT_THRESHOLD))
+
+    def record(self, case_id, measurement):
+        self.cases[case_id] = measurement
+
+    def regressions(self, case_id):
+        """Return a description of every metric that got worse than allowed."""
+        baseline_case = self.baseline.get(case_id)
+        measured_case = self.cases.get(case_id)
+        if not baseline_case or not measured_case:
+            return []
+        found_regressions = []
+        checks = (
+            ('wall_median_s', WALL_NOISE_FLOOR_S),
+            ('peak_rss_bytes', RSS_NOISE_FLOOR_BYTES),
+        )
+        for metric, noise_floor in checks:
+            baseline_value, measured_value = baseline_case.get(metric), measured_case.get(metric)
+            if baseline_value is None or measured_value is None:
+                continue
+            if (measured_value > baseline_value * (1 + self.threshold)
+                    and measured_value - baseline_value > noise_floor):
+                found_regressions.append(
+                    f"{metric}: {measured_value:.4g} vs baseline {baseline_value:.4g}")
+        return found_regressions
+
+    def write(self, results_path):
+        results_path.parent.mkdir(parents=True, exist_ok=True)
+        results_path.write_text(json.dumps({
+            'environment': {
+                'python':           platform.python_version(),
+                'pyside':           pyside_version,
+                'qt':               qVersion(),
+                'machine':          platform.machine(),
+                'platform':         platform.platform(),
+                'qpa':              os.environ.get('QT_QPA_PLATFORM'),
+            },
+            'threshold':    self.threshold,
+            'cases':        self.cases,
+        }, indent=1, sort_keys=True))
+
+
+_session_results = BenchmarkResults()
+
+
+@pytest.fixture(scope='session')
+def bench_results():
+    return _session_results
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not _session_results.cases:
+        return
+    results_path = Path(os.environ.get('FOCUS_BACKDROP_BENCH_RESULTS') or DEFAULT_RESULTS_PATH)
+    _session_results.write(results_path)
+    print(f"\nBenchmark results written to {results_path}")
+
+
+class GoldenHashes:
+    """Pixel hashes of known-good output, rewritten with FOCUS_BACKDROP_UPDATE_GOLDEN=1."""
+
+    def __init__(self):
+        self.updating = os.environ.get('FOCUS_BACKDROP_UPDATE_GOLDEN') == '1'
+        self.qt_version = qVersion()
+        self.hashes = {}
+        self.golden_qt_version = None
+        if GOLDEN_FILE_PATH.exists():
+            golden_data = json.loads(GOLDEN_FILE_PATH.read_text())
+            self.hashes = golden_data.get('hashes', {})
+            self.golden_qt_version = golden_data.get('qt')
+        self.new_hashes = {}
+
+    def write(self):
+        GOLDEN_FILE_PATH.write_text(json.dumps(
+            {'qt': self.qt_version, 'hashes': dict(sorted({**self.hashes, **self.new_hashes}.items()))},
+            indent=1) + '\n')
+
+
+_golden_hashes = GoldenHashes()
+
+
+@pytest.fixture(scope='session')
+def golden_hashes():
+    return _golden_hashes
+
+
+def pytest_unconfigure(config):
+    if _golden_hashes.updating and _golden_hashes.new_hashes:
+        _golden_hashes.write()
@@ -0,0 +1,76 @@
+"""Wall time, peak RSS and allocation measurements for the benchmark suite."""
+
+import gc
+import sys
+import time
+import statistics
+import tracemalloc
+
+try:
+    import resource
+except ImportError:     # not available on Windows
+    resource = None
+
+
+def reset_peak_rss():
+    """Reset the kernel's peak RSS counter (Linux 4.0+), return False if unsupported."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_bytes():
+    try:
+        with open('/proc/self/status') as status_file:
+            for status_line in status_file:
+                if status_line.startswith('VmHWM:'):
+                    return int(status_line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, in kilobytes elsewhere
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def measure(run_once, rounds=3, setup=None):
+    """Time run_once() over several rounds, then trace one more for allocations.
+
+    setup() runs before every round, outside the timed part (e.g. to empty
+    the caches so every round is a cold render). The traced round is kept
+    separate so tracemalloc overhead does not end up in the wall time.
+    """
+    wall_times = []
+    peak_rss_is_per_case = reset_peak_rss()
+    for _ in range(rounds):
+        if setup is not None:
+            setup()
+        gc.collect()
+        start_time = time.perf_counter()
+        run_once()
+        wall_times.append(time.perf_counter() - start_time)
+    peak_rss = peak_rss_bytes()
+
+    if setup is not None:
+        setup()
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    run_once()
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    retained_blocks = sys.getallocatedblocks() - blocks_before
+
+    return {
+        'rounds':               rounds,
+        'wall_min_s':           min(wall_times),
+        'wall_median_s':        statistics.median(wall_times),
+        'peak_rss_bytes':       peak_rss,
+        'peak_rss_per_case':    peak_rss_is_per_case,
+        'py_alloc_peak_bytes':  traced_peak,
+        'py_retained_blocks':   retained_blocks,
+    }
@@ -0,0 +1,61 @@
+"""Pixel-exact checks of the rendered backdrop.
+
+Resampling results depend on the Qt version, so the hashes are only
+compared when golden.json was made with the Qt in use. After an intended
+output change, rewrite them with FOCUS_BACKDROP_UPDATE_GOLDEN=1.
+"""
+
+import pytest
+
+from focus_backdrop.core.image_cache import shared_image_cache, shared_scaled_cache
+
+from tests.benchmarks.cases import (SCALING_OPTIONS, ANCHORS, render_for_screen,
+                                    compose_backdrop, image_hash)
+
+
+# a small screen so the 640x480 card is scaled up and the 1920x1080 card
+# goes through a reduced decode, both paths are pinned down
+GOLDEN_SCREENS = {
+    '800x600@1':    (800, 600, 1.0),
+    '400x300@2':    (400, 300, 2.0),
+}
+
+
+def _check_golden(golden_hashes, case_id, composed_image):
+    output_hash = image_hash(composed_image)
+    if golden_hashes.updating:
+        golden_hashes.new_hashes[case_id] = output_hash
+        return
+    if golden_hashes.golden_qt_version != golden_hashes.qt_version:
+        pytest.skip(f"golden hashes were made with Qt {golden_hashes.golden_qt_version}, "
+                    f"this is Qt {golden_hashes.qt_version}")
+    assert case_id in golden_hashes.hashes, f"no golden hash for {case_id}"
+    assert output_hash == golden_hashes.hashes[case_id], f"output of {case_id} changed"
+
+
+@pytest.mark.parametrize('screen_name', list(GOLDEN_SCREENS))
+@pytest.mark.parametrize('anchor_name', list(ANCHORS))
+@pytest.mark.parametrize('scaling_option', SCALING_OPTIONS)
+def test_golden_upscale(qt_app, synthetic_image, golden_hashes, scaling_option, anchor_name,
+                        screen_name):
+    screen_size = GOLDEN_SCREENS[screen_name]
+    scaled_image = render_for_screen(
+        synthetic_image(640, 480, 'png'), scaling_option, screen_size, ANCHORS[anchor_name])
+    composed_image = compose_backdrop(
+        scaled_image, ANCHORS[anchor_name], screen_size, scaling_option=scaling_option)
+    _check_golden(
+        golden_hashes, f"upscale/{scaling_option}/{anchor_name}/{screen_name}", composed_image)
+
+
+@pytest.mark.parametrize('screen_name', list(GOLDEN_SCREENS))
+@pytest.mark.parametrize('scaling_option', SCALING_OPTIONS)
+def test_golden_reduced_decode(qt_app, synthetic_image, golden_hashes, scaling_option,
+                                screen_name):
+    shared_image_cache().clear()
+    shared_scaled_cache().clear()
+    screen_size = GOLDEN_SCREENS[screen_name]
+    scaled_image = render_for_screen(synthetic_image(1920, 1080, 'png'), scaling_option, screen_size)
+    composed_image = compose_backdrop(
+        scaled_image, ANCHORS['mid-center'], screen_size, scaling_option=scaling_option)
+    _check_golden(
+        golden_hashes, f"reduced/{scaling_option}/{screen_name}", composed_image)
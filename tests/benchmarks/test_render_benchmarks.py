@@ -0,0 +1,107 @@
+"""Wall time, peak RSS and allocations of the render path.
+
+Every case is a cold render (empty caches), the same work a backdrop
+window does for a new image or screen: header read, reduced decode,
+scale. The compose cases measure painting the result at every anchor.
+The viewport cases upscale 300%, where only the on-screen region may be
+decoded and scaled.
+"""
+
+import pytest
+
+from focus_backdrop.core.config import SCALE_CUSTOM
+from focus_backdrop.core.image_cache import shared_image_cache, shared_scaled_cache
+
+from tests.benchmarks.conftest import large_images_enabled
+from tests.benchmarks.measure import measure
+from tests.benchmarks.cases import (SCALING_OPTIONS, ANCHORS, IMAGE_SIZES, LARGE_IMAGE_SIZES,
+                                    SCREEN_SIZES, CUSTOM_SCALING_MAX, render_for_screen,
+                                    compose_backdrop)
+
+from focus_backdrop.gui.backdrop_widget import BackdropWidget
+
+
+pytestmark = pytest.mark.benchmark
+
+
+def _image_size_params():
+    params = [pytest.param(size_name, id=size_name) for size_name in IMAGE_SIZES]
+    for size_name in LARGE_IMAGE_SIZES:
+        params.append(pytest.param(size_name, id=size_name, marks=[
+            pytest.mark.slow,
+            pytest.mark.skipif(not large_images_enabled(),
+                                reason="set FOCUS_BACKDROP_BENCH_LARGE=1 for 8K/16K images"),
+        ]))
+    return params
+
+
+def _empty_caches():
+    shared_image_cache().clear()
+    shared_scaled_cache().clear()
+
+
+def _check_and_record(bench_results, case_id, measurement):
+    bench_results.record(case_id, measurement)
+    found_regressions = bench_results.regressions(case_id)
+    assert not found_regressions, f"{case_id} regressed: " + "; ".join(found_regressions)
+
+
+@pytest.mark.parametrize('screen_name', list(SCREEN_SIZES))
+@pytest.mark.parametrize('image_size_name', _image_size_params())
+@pytest.mark.parametrize('scaling_option', SCALING_OPTIONS)
+def test_render_cold(qt_app, synthetic_image, bench_results, scaling_option, image_size_name,
+                        screen_name):
+    image_size = {**IMAGE_SIZES, **LARGE_IMAGE_SIZES}[image_size_name]
+    image_path = synthetic_image(*image_size)
+    screen_size = SCREEN_SIZES[screen_name]
+
+    rendered = []
+    rounds = 1 if image_size_name in LARGE_IMAGE_SIZES else 3
+    measurement = measure(
+        lambda: rendered.append(render_for_screen(image_path, scaling_option, screen_size)),
+        rounds=rounds, setup=_empty_caches)
+    _empty_caches()
+
+    assert rendered and not rendered[-1].isNull()
+    _check_and_record(
+        bench_results, f"render/{scaling_option}/{image_size_name}/{screen_name}", measurement)
+
+
+@pytest.mark.parametrize('anchor_name', ['top-left', 'mid-center', 'bot-right'])
+@pytest.mark.parametrize('image_size_name', _image_size_params())
+def test_render_viewport(qt_app, synthetic_image, bench_results, image_size_name, anchor_name):
+    image_size = {**IMAGE_SIZES, **LARGE_IMAGE_SIZES}[image_size_name]
+    image_path = synthetic_image(*image_size)
+    screen_size = SCREEN_SIZES['1920x1080@1']
+
+    rendered = []
+    measurement = measure(
+        lambda: rendered.append(render_for_screen(
+            image_path, SCALE_CUSTOM, screen_size, ANCHORS[anchor_name], CUSTOM_SCALING_MAX)),
+        rounds=3, setup=_empty_caches)
+    _empty_caches()
+
+    # never larger than the screen, whatever the source size
+    assert rendered and rendered[-1].size().toTuple() == (1920, 1080)
+    _check_and_record(
+        bench_results, f"viewport/{image_size_name}/{anchor_name}", measurement)
+
+
+@pytest.mark.parametrize('screen_name', list(SCREEN_SIZES))
+@pytest.mark.parametrize('anchor_name', list(ANCHORS))
+@pytest.mark.parametrize('scaling_option', SCALING_OPTIONS)
+def test_compose(qt_app, synthetic_image, bench_results, scaling_option, anchor_name,
+                    screen_name):
+    screen_size = SCREEN_SIZES[screen_name]
+    scaled_image = render_for_screen(
+        synthetic_image(1920, 1080), scaling_option, screen_size, ANCHORS[anchor_name])
+    _empty_caches()
+    backdrop_widget = BackdropWidget()
+
+    measurement = measure(
+        lambda: compose_backdrop(
+            scaled_image, ANCHORS[anchor_name], screen_size, backdrop_widget, scaling_option),
+        rounds=3)
+
+    _check_and_record(
+        bench_results, f"compose/{scaling_option}/{anchor_name}/{screen_name}", measurement)
@@ -0,0 +1,11 @@
+"""Fixtures shared by the tests (the benchmarks have their own in benchmarks/)."""
+
+import os
+import tempfile
+
+# must be set before the QApplication is created, and before the first
+# QSettings or cache path lookup, so no test touches the user's files
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+_TEST_HOME_DIR = tempfile.mkdtemp(prefix='focus-backdrop-tests-')
+os.environ['XDG_CONFIG_HOME'] = os.path.join(_TEST_HOME_DIR, 'config')
+os.environ['XDG_CACHE_HOME'] = os.path.join(_TEST_HOME_DIR, 'cache')
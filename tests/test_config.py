@@ -0,0 +1,104 @@
+"""Write-behind settings: only changed keys, after a quiet period, and at exit."""
+
+import os
+import sys
+import subprocess
+
+from pathlib import Path
+
+import pytest
+
+from focus_backdrop.core.config import SETTINGS_FLUSH_DELAY_MSECS, Settings
+
+
+SRC_DIR_PATH = Path(__file__).resolve().parents[1] / 'src'
+
+
+class RecordingSettings:
+    """Passes QSettings writes through and remembers the keys written."""
+
+    def __init__(self, qsettings):
+        self.qsettings      = qsettings
+        self.written_keys   = []
+        self.sync_count     = 0
+
+    def setValue(self, key, value):
+        self.written_keys.append(key)
+        self.qsettings.setValue(key, value)
+
+    def sync(self):
+        self.sync_count += 1
+        self.qsettings.sync()
+
+    def __getattr__(self, name):
+        return getattr(self.qsettings, name)
+
+
+@pytest.fixture
+def cnfg(qapp):
+    cnfg = Settings()
+    original_values = (cnfg.alpha_level, cnfg.bg_color)
+    cnfg.qsettings = RecordingSettings(cnfg.qsettings)
+    yield cnfg
+    # leave the shared test settings as they were
+    cnfg.alpha_level, cnfg.bg_color = original_values
+    cnfg.save_settings()
+    cnfg.flush()
+
+
+def _next_alpha(cnfg):
+    # alpha_level is kept as text, like QSettings stores it
+    return str((int(cnfg.alpha_level) + 1) % 256)
+
+
+def test_only_dirty_keys_written(cnfg):
+    cnfg.alpha_level = _next_alpha(cnfg)
+    cnfg.save_settings()
+    cnfg.bg_color = '#123456' if cnfg.bg_color != '#123456' else '#654321'
+    cnfg.save_settings()
+    cnfg.flush()
+    assert sorted(cnfg.qsettings.written_keys) == ['alpha_level', 'bg_color']
+    assert cnfg.qsettings.sync_count == 1
+
+    # nothing changed since, nothing to write
+    cnfg.save_settings()
+    cnfg.flush()
+    assert len(cnfg.qsettings.written_keys) == 2
+
+
+def test_timer_flushes_after_quiet_period(qtbot, cnfg):
+    cnfg.alpha_level = _next_alpha(cnfg)
+    cnfg.save_settings()
+    cnfg.alpha_level = _next_alpha(cnfg)
+    cnfg.save_settings()
+    assert cnfg.qsettings.written_keys == []
+    qtbot.waitUntil(lambda: cnfg.qsettings.sync_count == 1,
+                    timeout=SETTINGS_FLUSH_DELAY_MSECS * 3)
+    # two saves, one write of the last value
+    assert cnfg.qsettings.written_keys == ['alpha_level']
+    assert Settings().alpha_level == cnfg.alpha_level
+
+
+def _run_settings_script(script, config_dir_path):
+    return subprocess.run(
+        [sys.executable, '-c', script], capture_output=True, text=True, timeout=60,
+        env=dict(os.environ, PYTHONPATH=str(SRC_DIR_PATH), XDG_CONFIG_HOME=str(config_dir_path)))
+
+
+@pytest.mark.integration
+def test_pending_change_written_at_exit(tmp_path):
+    # the change is still waiting for its timer when the process ends
+    save_result = _run_settings_script(
+        "from PySide6.QtCore import QCoreApplication\n"
+        "from focus_backdrop.core.config import Settings\n"
+        "app = QCoreApplication([])\n"
+        "cnfg = Settings()\n"
+        "cnfg.alpha_level = '77'\n"
+        "cnfg.save_settings()\n",
+        tmp_path)
+    assert save_result.returncode == 0, save_result.stderr
+    read_result = _run_settings_script(
+        "from focus_backdrop.core.config import Settings\n"
+        "print(Settings().alpha_level)\n",
+        tmp_path)
+    assert read_result.stdout.split()[-1] == '77'
@@ -0,0 +1,78 @@
+"""Focus holes: what a change repaints, and where clicks go through."""
+
+import pytest
+
+from focus_backdrop.core.config import Settings
+from focus_backdrop.gui.backdrop_widget import BackdropWidget
+from focus_backdrop.gui.main_window import MainWindow
+
+from PySide6.QtCore import QPoint, QRect
+
+from PySide6.QtGui import QRegion
+
+
+def test_hole_change_damages_only_the_difference(qtbot):
+    backdrop = BackdropWidget()
+    qtbot.addWidget(backdrop)
+    backdrop.resize(400, 300)
+    backdrop.set_holes([QRect(10, 10, 100, 80)])
+    damaged_regions = []
+    backdrop.update = damaged_regions.append
+
+    # the hole grows to the right and down
+    backdrop.set_holes([QRect(10, 10, 150, 100)])
+    assert damaged_regions == [
+        QRegion(QRect(10, 10, 100, 80)).xored(QRegion(QRect(10, 10, 150, 100)))]
+    assert not damaged_regions[0].contains(QPoint(50, 50))
+
+    # setting the same holes again repaints nothing
+    backdrop.set_holes([QRect(10, 10, 150, 100)])
+    assert len(damaged_regions) == 1
+
+
+@pytest.fixture
+def hole_window(qtbot):
+    cnfg = Settings()
+    cnfg.pixmap_path = ''
+    hole_window = MainWindow(cnfg)
+    qtbot.addWidget(hole_window)
+    hole_window.resize(400, 300)
+    hole_window.show()
+    qtbot.waitExposed(hole_window)
+    # the backdrop covers the whole window once it is laid out
+    assert hole_window.backdrop.size() == hole_window.size()
+    return hole_window
+
+
+def _set_holes(hole_window, local_holes):
+    window_origin = hole_window.backdrop.mapToGlobal(QPoint(0, 0))
+    hole_window.set_focus_holes([hole_rect.translated(window_origin) for hole_rect in local_holes])
+    hole_window._render_scheduler.run_pending()
+
+
+@pytest.mark.integration
+def test_window_mask_follows_holes(hole_window):
+    _set_holes(hole_window, [QRect(20, 20, 100, 50), QRect(200, 100, 60, 60)])
+    expected_mask = (QRegion(hole_window.rect())
+                     .subtracted(QRegion(QRect(20, 20, 100, 50)))
+                     .subtracted(QRegion(QRect(200, 100, 60, 60))))
+    assert hole_window.mask() == expected_mask
+
+    _set_holes(hole_window, [QRect(40, 40, 10, 10)])
+    assert hole_window.mask() == QRegion(hole_window.rect()).subtracted(
+        QRegion(QRect(40, 40, 10, 10)))
+
+    # no holes, no mask: the whole window takes the clicks
+    _set_holes(hole_window, [])
+    assert hole_window.mask().isEmpty()
+
+
+@pytest.mark.integration
+def test_window_mask_cleared_while_editing_holes(hole_window):
+    _set_holes(hole_window, [QRect(20, 20, 100, 50)])
+    assert not hole_window.mask().isEmpty()
+    hole_window.set_hole_editing(True)
+    assert hole_window.mask().isEmpty()
+    hole_window.set_hole_editing(False)
+    assert hole_window.mask() == QRegion(hole_window.rect()).subtracted(
+        QRegion(QRect(20, 20, 100, 50)))
@@ -0,0 +1,71 @@
+"""Thumbnails for the image picker, made on worker threads."""
+
+import time
+import threading
+
+import pytest
+
+from focus_backdrop.core import thumbnails
+from focus_backdrop.gui.image_browser import ImageBrowserDialog
+
+from PySide6.QtGui import QImage
+
+
+@pytest.fixture
+def image_dir(tmp_path):
+    for image_name in ['a.png', 'b.png', 'c.png']:
+        card_image = QImage(300, 200, QImage.Format_RGB32)
+        card_image.fill(0x336699)
+        assert card_image.save(str(tmp_path / image_name))
+    return tmp_path
+
+
+@pytest.mark.integration
+def test_close_does_not_wait_for_running_workers(qtbot, image_dir, monkeypatch):
+    decode_started = threading.Event()
+    decode_may_finish = threading.Event()
+    create_thumbnail = thumbnails.create_thumbnail
+
+    def blocking_create_thumbnail(*args):
+        decode_started.set()
+        decode_may_finish.wait(10)
+        return create_thumbnail(*args)
+
+    monkeypatch.setattr(thumbnails, 'create_thumbnail', blocking_create_thumbnail)
+    image_browser = ImageBrowserDialog(None, image_dir)
+    shown_paths = []
+    image_browser._loader.sig_thumbnail_ready.connect(
+        lambda image_path, _thumbnail: shown_paths.append(image_path))
+    assert decode_started.wait(10)
+
+    close_start = time.monotonic()
+    image_browser.done(0)
+    assert time.monotonic() - close_start < 1.0
+
+    decode_may_finish.set()
+    loader = thumbnails.shared_thumbnail_loader()
+    assert loader.wait_for_done(10000)
+    qtbot.wait(50)
+    # results of the closed picker are dropped, not delivered
+    assert shown_paths == []
+
+
+def test_failed_decode_recorded_and_not_retried(qtbot, tmp_path, monkeypatch):
+    broken_path = tmp_path / 'broken.png'
+    broken_path.write_bytes(b'not a png at all')
+    image_index = thumbnails.ImageIndex(tmp_path / 'index.json')
+    records, changed_paths = image_index.scan(tmp_path)
+    loader = thumbnails.ThumbnailLoader(image_index)
+
+    loader.request(records, changed_paths)
+    assert loader.wait_for_done(10000)
+    fail_record_path = thumbnails.fail_record_path_for(broken_path)
+    assert fail_record_path.parent.parts[-3:] == ('thumbnails', 'fail', 'focus-backdrop')
+    assert thumbnails.has_fail_record(broken_path, records[0]['mtime'])
+
+    decoded_paths = []
+    monkeypatch.setattr(thumbnails, 'create_thumbnail',
+                        lambda image_path, *args: decoded_paths.append(image_path))
+    loader.request(records, changed_paths)
+    assert loader.wait_for_done(10000)
+    assert decoded_paths == []
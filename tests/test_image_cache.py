@@ -0,0 +1,83 @@
+"""Decoding and reusing images in the shared image cache."""
+
+import time
+import threading
+
+import pytest
+
+from focus_backdrop.core import tracing
+from focus_backdrop.core.image_cache import ImageCache
+
+from collections import deque
+
+from PySide6.QtCore import QRect, QSize
+
+from PySide6.QtGui import QImage
+
+
+IMAGE_KEY = ('/images/card.png', 1, 100)
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def _red_decode(image_path, decode_size=None, clip_rect=None):
+    image = QImage(40, 30, QImage.Format_RGB32)
+    image.fill(0xff0000)
+    return image
+
+
+def test_get_by_key_counts_in_trace(monkeypatch):
+    monkeypatch.setattr(tracing, 'ENABLED', True)
+    monkeypatch.setattr(tracing, '_events', deque())
+    image_cache = ImageCache()
+    monkeypatch.setattr(image_cache, '_decode', _red_decode)
+    image_cache.get_by_key(IMAGE_KEY)
+    image_cache.get_by_key(IMAGE_KEY)
+    assert tracing.counter_totals() == {'ImageCache.miss': 1, 'ImageCache.hit': 1}
+    assert (image_cache.misses, image_cache.hits) == (1, 1)
+
+
+def test_concurrent_requests_share_one_decode(monkeypatch):
+    image_cache = ImageCache()
+    decode_calls = []
+    decode_may_finish = threading.Event()
+
+    def blocking_decode(image_path, decode_size=None, clip_rect=None):
+        decode_calls.append(image_path)
+        decode_may_finish.wait(5)
+        return _red_decode(image_path)
+
+    monkeypatch.setattr(image_cache, '_decode', blocking_decode)
+    images = []
+    threads = [threading.Thread(target=lambda: images.append(image_cache.get_by_key(IMAGE_KEY)))
+               for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    # one decoding, two waiting on the same lock
+    _wait_for(lambda: image_cache._decode_locks.get(IMAGE_KEY, [None, 0])[1] == 3)
+    decode_may_finish.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert decode_calls == ['/images/card.png']
+    assert [image.size().toTuple() for image in images] == [(40, 30)] * 3
+    assert image_cache._decode_locks == {}
+
+
+def test_clip_cut_from_full_decode_at_decode_size(monkeypatch):
+    image_cache = ImageCache()
+    full_image = QImage(200, 100, QImage.Format_RGB32)
+    full_image.fill(0x00ff00)
+    image_cache.store(image_cache._entry_key(IMAGE_KEY), full_image)
+    monkeypatch.setattr(image_cache, '_decode', lambda *args: pytest.fail("decoded again"))
+
+    region_image = image_cache.get_by_key(IMAGE_KEY, QSize(25, 20), QRect(50, 20, 100, 80))
+    assert region_image.size().toTuple() == (25, 20)
+    assert region_image.pixel(12, 10) == full_image.pixel(0, 0)
+    region_image = image_cache.get_by_key(IMAGE_KEY, None, QRect(50, 20, 100, 80))
+    assert region_image.size().toTuple() == (100, 80)
@@ -0,0 +1,43 @@
+"""Log calls build their text on the calling thread and write it in the background."""
+
+import threading
+
+import pytest
+
+from focus_backdrop.core import logger
+
+
+class ThreadRecordingArg:
+    """Remembers the threads its text was built on."""
+
+    def __init__(self):
+        self.str_threads = []
+
+    def __str__(self):
+        self.str_threads.append(threading.current_thread())
+        return 'arg'
+
+
+@pytest.fixture
+def log_file_path(tmp_path):
+    log_file_path = tmp_path / 'focus-backdrop.log'
+    logger.configure('debug', str(log_file_path))
+    yield log_file_path
+    logger.configure()
+
+
+def test_message_built_on_calling_thread(log_file_path):
+    message_arg = ThreadRecordingArg()
+    logger.debug("built from", message_arg, 3)
+    logger.shutdown()
+    assert message_arg.str_threads == [threading.current_thread()]
+    assert log_file_path.read_text().rstrip().endswith("(DD) built from arg 3")
+
+
+def test_disabled_level_builds_nothing(log_file_path):
+    logger.configure('warning', str(log_file_path))
+    message_arg = ThreadRecordingArg()
+    logger.debug("never written", message_arg)
+    logger.shutdown()
+    assert message_arg.str_threads == []
+    assert "never written" not in log_file_path.read_text()
@@ -0,0 +1,163 @@
+"""One backdrop window per screen, on Qt's offscreen platform with three virtual screens.
+
+The screens come from an offscreen platform configuration file, which is
+read when the QGuiApplication starts, so the checks run in a child
+process of their own (the benchmarks share one single-screen app).
+Screens cannot be plugged in or out of the offscreen platform at run
+time, the manager's screenAdded/screenRemoved handlers are called directly.
+"""
+
+import os
+import sys
+import json
+import time
+import subprocess
+
+from pathlib import Path
+
+import pytest
+
+
+REPO_DIR_PATH = Path(__file__).resolve().parents[1]
+
+VIRTUAL_SCREENS = [
+    {'name': 'screen-a', 'x': 0,    'y': 0, 'width': 1920, 'height': 1080},
+    {'name': 'screen-b', 'x': 1920, 'y': 0, 'width': 1280, 'height': 720},
+    {'name': 'screen-c', 'x': 3200, 'y': 0, 'width': 1024, 'height': 768},
+]
+
+# the 640x480 test card fitted (no crop) to each screen
+FIT_NOCROP_SIZES = {
+    'screen-a': [1440, 1080],
+    'screen-b': [960, 720],
+    'screen-c': [1024, 768],
+}
+
+RENDER_TIMEOUT_S = 20
+
+
+@pytest.fixture(scope='module')
+def probe_results(tmp_path_factory):
+    probe_dir = tmp_path_factory.mktemp('multi_screen')
+    config_path = probe_dir / 'offscreen.json'
+    config_path.write_text(json.dumps({
+        'screens': [
+            dict(screen, logicalDpi=96, logicalBaseDpi=96, dpr=1) for screen in VIRTUAL_SCREENS
+        ],
+    }))
+    results_path = probe_dir / 'results.json'
+    probe_env = dict(
+        os.environ,
+        QT_QPA_PLATFORM=f"offscreen:configfile={config_path}",
+        XDG_CONFIG_HOME=str(probe_dir / 'config'),
+        XDG_CACHE_HOME=str(probe_dir / 'cache'),
+        PYTHONPATH=os.pathsep.join([str(REPO_DIR_PATH / 'src'), str(REPO_DIR_PATH)]),
+    )
+    probe_run = subprocess.run(
+        [sys.executable, __file__, str(probe_dir / 'card.png'), str(results_path)],
+        env=probe_env, capture_output=True, text=True, timeout=RENDER_TIMEOUT_S * 3)
+    assert probe_run.returncode == 0, probe_run.stdout + probe_run.stderr
+    return json.loads(results_path.read_text())
+
+
+@pytest.mark.integration
+def test_one_window_per_screen(probe_results):
+    assert probe_results['screens'] == [screen['name'] for screen in VIRTUAL_SCREENS]
+    assert sorted(probe_results['window_screens']) == sorted(probe_results['screens'])
+    for screen in VIRTUAL_SCREENS:
+        assert probe_results['window_sizes'][screen['name']] == [screen['width'], screen['height']]
+
+
+@pytest.mark.integration
+def test_screen_removed_drops_only_its_window(probe_results):
+    removed = probe_results['after_remove']
+    assert sorted(removed['window_screens']) == ['screen-a', 'screen-c']
+    assert removed['kept_same_windows']
+
+
+@pytest.mark.integration
+def test_screen_added_creates_only_its_window(probe_results):
+    added = probe_results['after_add']
+    assert sorted(added['window_screens']) == ['screen-a', 'screen-b', 'screen-c']
+    assert added['kept_same_windows']
+    assert added['new_window_shown']
+
+
+@pytest.mark.integration
+def test_windows_share_one_decoded_source(probe_results):
+    # every window has its own scaled result, from a single decode
+    assert probe_results['pixmap_sizes'] == FIT_NOCROP_SIZES
+    assert probe_results['decoded_entries'] == 1
+
+
+def _wait_until(app, condition):
+    deadline = time.monotonic() + RENDER_TIMEOUT_S
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError("backdrop windows did not render in time")
+        app.processEvents()
+        time.sleep(0.01)
+
+
+def run_probe(image_path, results_path):
+    from focus_backdrop.core.config import SCALE_FIT_NOCROP, Settings
+    from focus_backdrop.core.image_cache import shared_image_cache
+    from focus_backdrop.gui.backdrop_manager import BackdropManager
+
+    from PySide6.QtGui import QColor, QImage, QGuiApplication
+
+    from PySide6.QtWidgets import QApplication
+
+    app = QApplication([])
+    # 4:3 and smaller than every screen, decoded once at full size
+    card_image = QImage(640, 480, QImage.Format_RGB32)
+    card_image.fill(QColor(200, 80, 40))
+    assert card_image.save(image_path)
+
+    cnfg = Settings()
+    cnfg.pixmap_path = image_path
+    cnfg.scaling_option = SCALE_FIT_NOCROP
+    manager = BackdropManager(cnfg, all_screens=True)
+    manager.show()
+    screens = {screen.name(): screen for screen in QGuiApplication.screens()}
+
+    def window_screens():
+        return [window.pinned_screen().name() for window in manager.windows()]
+
+    _wait_until(app, lambda: all(
+        not window.backdrop.pixmap().isNull() for window in manager.windows()))
+    results = {
+        'screens':          list(screens),
+        'window_screens':   window_screens(),
+        'window_sizes':     {window.pinned_screen().name(): list(window.size().toTuple())
+                                for window in manager.windows()},
+        'pixmap_sizes':     {window.pinned_screen().name():
+                                list(window.backdrop.pixmap().size().toTuple())
+                                for window in manager.windows()},
+        'decoded_entries':  shared_image_cache().stats()['entries'],
+    }
+
+    windows_before = {window.pinned_screen().name(): window for window in manager.windows()}
+    manager.on_screen_removed(screens['screen-b'])
+    results['after_remove'] = {
+        'window_screens':       window_screens(),
+        'kept_same_windows':    all(window is windows_before[window.pinned_screen().name()]
+                                    for window in manager.windows()),
+    }
+
+    windows_before = {window.pinned_screen().name(): window for window in manager.windows()}
+    manager.on_screen_added(screens['screen-b'])
+    new_window = manager.window_for_screen(screens['screen-b'])
+    results['after_add'] = {
+        'window_screens':       window_screens(),
+        'kept_same_windows':    all(window is windows_before[window.pinned_screen().name()]
+                                    for window in manager.windows() if window is not new_window),
+        'new_window_shown':     new_window is not None and new_window.isVisible(),
+    }
+
+    Path(results_path).write_text(json.dumps(results))
+    manager.close_all()
+
+
+if __name__ == '__main__':
+    run_probe(sys.argv[1], sys.argv[2])
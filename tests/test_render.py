@@ -0,0 +1,35 @@
+"""Placement of cropped renders, against the placement of the whole image."""
+
+import pytest
+
+from focus_backdrop.core.render import aligned_image_rect, visible_output_rect
+
+from PySide6.QtCore import Qt, QRect, QSize, QSizeF
+
+
+ALIGNMENTS = [
+    Qt.AlignTop     | Qt.AlignLeft,
+    Qt.AlignVCenter | Qt.AlignHCenter,
+    Qt.AlignBottom  | Qt.AlignRight,
+]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('device_pixel_ratio', [1.0, 2.0])
+@pytest.mark.parametrize('alignment', ALIGNMENTS)
+@pytest.mark.parametrize('output_size', [(1001, 701), (1002, 702), (1003, 601)])
+@pytest.mark.parametrize('desired_size', [(800, 600), (801, 599)])
+def test_visible_rect_matches_widget_placement(desired_size, output_size, alignment,
+                                                device_pixel_ratio):
+    # every parity of area and image, where // 2 of the overflow is one off
+    output_size, desired_size = QSize(*output_size), QSize(*desired_size)
+    visible_rect = visible_output_rect(output_size, desired_size, alignment, device_pixel_ratio)
+    image_rect = aligned_image_rect(
+        (QSizeF(output_size) / device_pixel_ratio).toSize(), alignment,
+        QRect(0, 0, *(QSizeF(desired_size) / device_pixel_ratio).toSize().toTuple()))
+    # an odd device size has a logical size rounded up, never past the end
+    overflow_x = output_size.width() - desired_size.width()
+    overflow_y = output_size.height() - desired_size.height()
+    assert visible_rect.x() == min(round(-image_rect.x() * device_pixel_ratio), overflow_x)
+    assert visible_rect.y() == min(round(-image_rect.y() * device_pixel_ratio), overflow_y)
+    assert visible_rect.size() == desired_size
@@ -0,0 +1,67 @@
+"""The headless `render` subcommand, writing PNG files from worker processes."""
+
+import argparse
+
+from pathlib import Path
+
+import pytest
+
+from focus_backdrop.core.batch_render import render_from_args, unique_file_stems
+
+from PySide6.QtGui import QColor, QImage
+
+
+BG_COLOR        = QColor('#102030')
+CARD_COLORS     = {'a': QColor(255, 0, 0), 'b': QColor(0, 0, 255)}
+
+# a square card fitted (no crop) to 2:1 covers the middle half, at both ratios
+RENDER_SIZES    = ['80x40', '80x40@2']
+
+
+def render_args(image_paths, output_dir, **overrides):
+    args = dict(
+        size=list(RENDER_SIZES), preset=None, image=[str(path) for path in image_paths],
+        color=BG_COLOR.name(), alpha=255, scaling='fit_nocrop', anchor='middle-center',
+        output=str(output_dir), jobs=2,
+    )
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+
+def test_unique_file_stems():
+    assert unique_file_stems(['bg', 'bg', 'BG', 'my look', 'bg-2']) == [
+        'bg', 'bg-2', 'BG-3', 'my_look', 'bg-2-2']
+
+
+@pytest.mark.integration
+def test_render_same_stem_images(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CONFIG_HOME', str(tmp_path / 'config'))
+    image_paths = []
+    for dir_name, card_color in CARD_COLORS.items():
+        (tmp_path / dir_name).mkdir()
+        card_image = QImage(40, 40, QImage.Format_RGB32)
+        card_image.fill(card_color)
+        image_path = tmp_path / dir_name / 'card.png'
+        assert card_image.save(str(image_path))
+        image_paths.append(image_path)
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+
+    assert render_from_args(render_args(image_paths, output_dir)) == 0
+
+    written_names = sorted(path.name for path in Path(output_dir).iterdir())
+    assert written_names == [
+        'card-2-80x40.png', 'card-2-80x40@2.png', 'card-80x40.png', 'card-80x40@2.png']
+    for file_stem, card_color in zip(['card', 'card-2'], CARD_COLORS.values()):
+        for size_suffix in ['80x40', '80x40@2']:
+            written_image = QImage(str(output_dir / f"{file_stem}-{size_suffix}.png"))
+            assert written_image.size().toTuple() == (80, 40)
+            assert written_image.pixelColor(40, 20).rgb() == card_color.rgb()
+            assert written_image.pixelColor(5, 20).rgb() == BG_COLOR.rgb()
+
+
+@pytest.mark.integration
+def test_render_bad_size_fails_up_front(tmp_path):
+    args = render_args([], tmp_path, size=['80by40'])
+    assert render_from_args(args) == 2
+    assert list(tmp_path.iterdir()) == []
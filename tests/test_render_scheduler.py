@@ -0,0 +1,45 @@
+"""Invalidated render stages collected into a single render."""
+
+from focus_backdrop.core.render_scheduler import (DIRTY_SOURCE, DIRTY_SCALE, DIRTY_COLOR,
+                                                    DIRTY_HOLES, RenderScheduler)
+
+
+def _scheduler():
+    renders = []
+    return RenderScheduler(renders.append), renders
+
+
+def test_marks_in_one_event_loop_pass_render_once(qtbot):
+    scheduler, renders = _scheduler()
+    scheduler.invalidate(DIRTY_COLOR)
+    scheduler.invalidate(DIRTY_HOLES)
+    scheduler.invalidate(DIRTY_COLOR)
+    assert renders == []
+    qtbot.waitUntil(lambda: bool(renders))
+    qtbot.wait(20)
+    assert renders == [DIRTY_COLOR | DIRTY_HOLES]
+    assert not scheduler.is_pending()
+
+
+def test_marks_in_transaction_render_once(qtbot):
+    scheduler, renders = _scheduler()
+    with scheduler.transaction():
+        scheduler.invalidate(DIRTY_SOURCE)
+        with scheduler.transaction():
+            scheduler.invalidate(DIRTY_SCALE)
+        # the inner transaction ending queues nothing
+        qtbot.wait(20)
+        assert renders == []
+        scheduler.invalidate(DIRTY_HOLES)
+    qtbot.waitUntil(lambda: bool(renders))
+    qtbot.wait(20)
+    assert renders == [DIRTY_SOURCE | DIRTY_SCALE | DIRTY_HOLES]
+
+
+def test_run_pending_renders_now_and_only_once(qtbot):
+    scheduler, renders = _scheduler()
+    scheduler.invalidate(DIRTY_COLOR)
+    scheduler.run_pending()
+    assert renders == [DIRTY_COLOR]
+    qtbot.wait(20)
+    assert renders == [DIRTY_COLOR]
@@ -0,0 +1,51 @@
+"""Which directory a rotation cycles through: --rotate DIR, the schedule or the setting."""
+
+from pathlib import Path
+
+import pytest
+
+from focus_backdrop.core.config import Settings
+from focus_backdrop.core.rotation import RotationEngine
+
+from PySide6.QtGui import QImage
+
+
+@pytest.fixture
+def image_dirs(tmp_path):
+    image_dirs = {}
+    for dir_name in ['configured', 'scheduled', 'explicit']:
+        image_dir = tmp_path / dir_name
+        image_dir.mkdir()
+        card_image = QImage(20, 20, QImage.Format_RGB32)
+        card_image.fill(0x808080)
+        assert card_image.save(str(image_dir / 'card.png'))
+        image_dirs[dir_name] = str(image_dir)
+    return image_dirs
+
+
+@pytest.fixture
+def cnfg(image_dirs):
+    cnfg = Settings()
+    cnfg.pixmap_path = ''
+    cnfg.rotation_directory = image_dirs['configured']
+    # the whole day long
+    cnfg.rotation_schedule = f"00:00={image_dirs['scheduled']}"
+    return cnfg
+
+
+def _rotated_directory(cnfg, directory):
+    rotation = RotationEngine(cnfg, lambda: [], directory=directory)
+    try:
+        rotation.start()
+        return str(Path(rotation.current_image()).parent)
+    finally:
+        rotation.stop()
+
+
+def test_explicit_directory_wins_over_schedule(qapp, cnfg, image_dirs):
+    assert _rotated_directory(cnfg, image_dirs['explicit']) == image_dirs['explicit']
+
+
+@pytest.mark.parametrize('directory', [None, ''])
+def test_schedule_wins_over_configured_directory(qapp, cnfg, image_dirs, directory):
+    assert _rotated_directory(cnfg, directory) == image_dirs['scheduled']
@@ -0,0 +1,79 @@
+"""Handing commands from a later launch to the running instance."""
+
+import os
+import sys
+import json
+import subprocess
+
+from pathlib import Path
+
+import pytest
+
+from focus_backdrop.core.single_instance import (InstanceServer, instance_is_running,
+                                                    forward_to_running_instance)
+
+
+SRC_DIR_PATH = Path(__file__).resolve().parents[1] / 'src'
+
+# the second launch: forward a command, exit 0 if the instance took it
+FORWARD_SCRIPT = """
+import sys, json
+from focus_backdrop.core.single_instance import forward_to_running_instance
+sys.exit(0 if forward_to_running_instance(json.loads(sys.argv[1])) else 3)
+"""
+
+
+@pytest.fixture
+def display_name(monkeypatch):
+    # a server name of its own, apart from any real overlay of this user
+    display_name = f":test-{os.getpid()}"
+    monkeypatch.delenv('WAYLAND_DISPLAY', raising=False)
+    monkeypatch.setenv('DISPLAY', display_name)
+    return display_name
+
+
+@pytest.fixture
+def instance_server(qapp, display_name):
+    server = InstanceServer()
+    assert server.listen()
+    yield server
+    server.close()
+
+
+def _second_launch(command):
+    """Forward from another process, which blocks without an event loop."""
+    return subprocess.Popen(
+        [sys.executable, '-c', FORWARD_SCRIPT, json.dumps(command)],
+        env=dict(os.environ, PYTHONPATH=str(SRC_DIR_PATH)))
+
+
+@pytest.mark.integration
+def test_command_handed_to_running_instance(qtbot, instance_server):
+    received = []
+    instance_server.sig_command_received.connect(received.append)
+    second_launch = _second_launch({'image': '/tmp/card.png', 'alpha': 128})
+    qtbot.waitUntil(lambda: second_launch.poll() is not None, timeout=10000)
+    assert second_launch.returncode == 0
+    assert received == [{'image': '/tmp/card.png', 'alpha': 128}]
+
+
+@pytest.mark.integration
+def test_second_server_keeps_the_running_socket(qtbot, instance_server):
+    second_server = InstanceServer()
+    try:
+        assert not second_server.listen()
+    finally:
+        second_server.close()
+    # the running instance is still the one that answers
+    received = []
+    instance_server.sig_command_received.connect(received.append)
+    second_launch = _second_launch({'next_image': True})
+    qtbot.waitUntil(lambda: second_launch.poll() is not None, timeout=10000)
+    assert second_launch.returncode == 0
+    assert received == [{'next_image': True}]
+
+
+@pytest.mark.integration
+def test_no_running_instance(qapp, display_name):
+    assert not instance_is_running()
+    assert not forward_to_running_instance({'next_image': True})
@@ -0,0 +1,62 @@
+"""The render snapshot stored at quit and shown on the next first paint."""
+
+import pytest
+
+from focus_backdrop.core.config import SCALE_FIT_NOCROP, Settings
+from focus_backdrop.core.image_cache import shared_image_cache, shared_scaled_cache
+from focus_backdrop.core.snapshot import load_snapshot, save_snapshot
+from focus_backdrop.gui.main_window import MainWindow
+
+from PySide6.QtCore import QSize
+
+from PySide6.QtGui import QColor, QImage
+
+
+@pytest.fixture
+def card_settings(qapp, tmp_path):
+    card_image = QImage(640, 480, QImage.Format_RGB32)
+    card_image.fill(QColor(200, 80, 40))
+    card_path = tmp_path / 'card.png'
+    assert card_image.save(str(card_path))
+    cnfg = Settings()
+    cnfg.pixmap_path = str(card_path)
+    cnfg.scaling_option = SCALE_FIT_NOCROP
+    return cnfg
+
+
+@pytest.mark.integration
+def test_snapshot_shows_on_first_paint(qtbot, card_settings):
+    first_window = MainWindow(card_settings)
+    qtbot.addWidget(first_window)
+    qtbot.waitUntil(lambda: not first_window.backdrop.pixmap().isNull(), timeout=10000)
+    first_window.save_snapshot()
+    shown_size = first_window.backdrop.pixmap().size()
+
+    # a new run: nothing decoded, no header read yet
+    shared_image_cache().clear()
+    shared_scaled_cache().clear()
+    second_window = MainWindow(card_settings)
+    qtbot.addWidget(second_window)
+    # no events processed, so no worker result can have arrived
+    assert not second_window.backdrop.pixmap().isNull()
+    assert second_window.backdrop.pixmap().size() == shown_size
+    assert shared_image_cache().stats()['entries'] == 0
+
+
+@pytest.mark.parametrize('image_format', [QImage.Format_RGB32, QImage.Format_RGB888])
+def test_snapshot_round_trip(qapp, image_format):
+    # an odd width, so RGB888 rows are padded
+    image = QImage(33, 20, image_format)
+    image.fill(QColor(10, 20, 30))
+    image.setPixelColor(32, 19, QColor(250, 0, 5))
+    image.setDevicePixelRatio(2.0)
+    scaled_key = (('/images/card.png', 1, 100), SCALE_FIT_NOCROP, (33, 20), 1.0, None, 2.0)
+    save_snapshot(scaled_key, image, (QSize(640, 480), 1))
+
+    snapshot_pixmap, source_header = load_snapshot(scaled_key)
+    assert source_header == (QSize(640, 480), 1)
+    assert snapshot_pixmap.devicePixelRatio() == 2.0
+    snapshot_image = snapshot_pixmap.toImage().convertToFormat(image_format)
+    assert snapshot_image.size() == image.size()
+    assert snapshot_image.pixelColor(32, 19) == QColor(250, 0, 5)
+    assert snapshot_image.pixelColor(0, 0) == QColor(10, 20, 30)